@@ -2,7 +2,9 @@ import dash
 import pandas as pd
 import os
 import sys
-from data.parsers import parse_xml_scores
+from data.snapshot import load_results
+from data import watch
+from data.cache import dataset_key, put_dataset, get_dataset
 from presentation.layouts import create_main_layout
 from presentation.callbacks import register_callbacks
 
@@ -22,27 +24,43 @@ with open(os.path.join(base_path, 'assets/index.html'), 'r', encoding='utf-8') a
 
 # Load initial data
 try:
-    xml_path = os.path.join(base_path, 'samples/2025_anonymized.xmlx')
-    with open(xml_path, 'r', encoding='utf-8') as f:
-        initial_df, initial_race_info, initial_incidents = parse_xml_scores(f.read())
+    # In watch mode the page opens on the watched results file, when it already exists
+    initial_dataset_key = watch.refresh() if watch.enabled() else None
+    if initial_dataset_key is not None:
+        initial_df, initial_race_info, initial_incidents = get_dataset(initial_dataset_key)
+        put_dataset(initial_dataset_key, initial_df, initial_race_info, initial_incidents, pin=True)
+    else:
+        # Uses the prebuilt snapshot when it matches the sample, parsing it otherwise.
+        # The standalone build extracts to a temporary directory, so it never rewrites it.
+        xml_path = os.path.join(base_path, 'samples/2025_anonymized.xmlx')
+        xml_content, initial_df, initial_race_info, initial_incidents = load_results(xml_path, write=not getattr(sys, 'frozen', False))
+        # Pinned: every new page load opens on it, however many races are uploaded after it
+        initial_dataset_key = put_dataset(dataset_key(xml_content), initial_df, initial_race_info, initial_incidents,
+                                          pin=True)
 except:
     initial_df = pd.DataFrame()
     initial_race_info = {}
     initial_incidents = {'chat': [], 'incident': [], 'penalty': []}
+    initial_dataset_key = None
 
 # Create layout
-app.layout = create_main_layout(initial_df, initial_race_info, initial_incidents)
+app.layout = create_main_layout(initial_df, initial_race_info, initial_incidents, initial_dataset_key)
 
 # Register callbacks
-register_callbacks(app, initial_df, initial_race_info, initial_incidents)
+register_callbacks(app, initial_df, initial_race_info, initial_incidents, initial_dataset_key)
 
 if __name__ == '__main__':
     
     debug_mode = os.environ.get('DEBUG', 'False') == 'True'
+    port = int(os.environ.get('PORT', '7860'))
+    threads = int(os.environ.get('THREADS', '4'))
     
     if debug_mode:
-        app.run(debug=True, host='0.0.0.0', port=7860, dev_tools_hot_reload=True)
+        app.run(debug=True, host='0.0.0.0', port=port, dev_tools_hot_reload=True)
     else:
         from waitress import serve
-        print('Dash is running on http://0.0.0.0:7860/')
-        serve(app.server, host='0.0.0.0', port=7860, threads=4, channel_timeout=120)
\ No newline at end of file
+        from presentation.upload_limits import MAX_REQUEST_MB
+        print(f'Dash is running on http://0.0.0.0:{port}/')
+        # waitress buffers request bodies before calling the app, so it enforces the size limit itself
+        serve(app.server, host='0.0.0.0', port=port, threads=threads, channel_timeout=120,
+              max_request_body_size=int(MAX_REQUEST_MB * 1024 * 1024))
\ No newline at end of file
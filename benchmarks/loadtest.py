@@ -0,0 +1,470 @@
+"""Load test for the Dash callback endpoint.
+
+Replays browser sessions against /_dash-update-component: each simulated
+user uploads a results file (or takes the bundled one from the layout),
+fills the filters and then, until the run ends, switches tabs, changes the
+class filter and scrubs the standings lap selector, sending the same
+payloads the browser does (tab renders send the dataset key and filters).
+Callback specs are read from /_dash-dependencies, so payloads follow the
+callbacks as they change, and background jobs are polled like the browser.
+
+Reports throughput, latency percentiles and error rates per action, and the
+resident memory of the server processes (read from /proc, Linux only).
+
+    # start a local server and drive it
+    python benchmarks/loadtest.py --server waitress --threads 4 --users 8 --duration 60
+    python benchmarks/loadtest.py --server gunicorn --workers 5 --users 16 --duration 60
+
+    # drive a running server (pass its pid to sample memory)
+    python benchmarks/loadtest.py --url http://127.0.0.1:7860 --pid 1234 --users 8
+"""
+import argparse
+import base64
+import http.client
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+from startup import ROOT, _free_port, _wait_for
+
+SAMPLE_PATH = os.path.join(ROOT, 'samples', '2025_anonymized.xmlx')
+DISPATCH = '/_dash-update-component'
+TABS = ['tab-standings', 'tab-position', 'tab-gap', 'tab-laptimes', 'tab-fuel', 'tab-tires', 'tab-incidents']
+DEFAULT_MIX = 'tab=5,filter=3,standings=2'
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Connection:
+    """Keep-alive HTTP connection of one simulated user"""
+
+    def __init__(self, url, timeout):
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        """Returns (status, response bytes); reconnects once if the kept-alive socket was closed"""
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def callback_specs(url, timeout=30):
+    """Returns {output: spec} from /_dash-dependencies"""
+    conn = Connection(url, timeout)
+    try:
+        status, body = conn.request('GET', '/_dash-dependencies')
+    finally:
+        conn.close()
+    if status != 200:
+        raise RuntimeError(f'/_dash-dependencies returned {status}')
+    return {spec['output']: spec for spec in json.loads(body)}
+
+
+def find_spec(specs, output):
+    """Returns the callback spec that has output ('component.property') among its outputs"""
+    for key, spec in specs.items():
+        if output in key.strip('.').split('...'):
+            return spec
+    raise KeyError(output)
+
+
+def callback_payload(spec, values, changed):
+    """Builds the /_dash-update-component body the browser sends for spec"""
+    def items(deps):
+        return [{'id': d['id'], 'property': d['property'], 'value': values.get(f"{d['id']}.{d['property']}")}
+                for d in deps]
+
+    output = spec['output']
+    if output.startswith('..'):
+        outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in output[2:-2].split('...')]
+    else:
+        outputs = dict(zip(('id', 'property'), output.rsplit('.', 1)))
+    return {'output': output, 'outputs': outputs, 'inputs': items(spec['inputs']),
+            'state': items(spec.get('state', [])), 'changedPropIds': changed}
+
+
+def find_component(tree, component_id):
+    """Returns the props of the component with component_id in a serialized layout"""
+    if isinstance(tree, list):
+        for child in tree:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+    elif isinstance(tree, dict):
+        props = tree.get('props', {})
+        if props.get('id') == component_id:
+            return props
+        return find_component(props.get('children'), component_id)
+    return None
+
+
+def parse_mix(text):
+    """'tab=5,filter=3' -> {'tab': 5.0, 'filter': 3.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('tab', 'filter', 'standings'):
+            raise ValueError(f'Unknown action {name}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Stats:
+    """Latencies, errors and payload sizes per action, shared by all users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sent = defaultdict(int)
+        self.received = defaultdict(int)
+
+    def add(self, action, seconds, sent, received, ok):
+        with self.lock:
+            self.latencies[action].append(seconds)
+            self.sent[action] += sent
+            self.received[action] += received
+            if not ok:
+                self.errors[action] += 1
+
+    def summary(self, elapsed):
+        rows = {}
+        with self.lock:
+            actions = sorted(self.latencies) + ['all']
+            for action in actions:
+                if action == 'all':
+                    latencies = [v for values in self.latencies.values() for v in values]
+                    errors, sent, received = (sum(d.values()) for d in (self.errors, self.sent, self.received))
+                else:
+                    latencies = self.latencies[action]
+                    errors, sent, received = self.errors[action], self.sent[action], self.received[action]
+                if not latencies:
+                    continue
+                rows[action] = {
+                    'requests': len(latencies),
+                    'errors': errors,
+                    'error_rate': errors / len(latencies),
+                    'throughput_rps': len(latencies) / elapsed,
+                    'mean_ms': statistics.fmean(latencies) * 1000,
+                    **{f'p{p}_ms': percentile(latencies, p) * 1000 for p in PERCENTILES},
+                    'max_ms': max(latencies) * 1000,
+                    'sent_kb': sent / len(latencies) / 1024,
+                    'received_kb': received / len(latencies) / 1024
+                }
+        return rows
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Session:
+    """One simulated browser: keeps the component values the browser would hold"""
+
+    def __init__(self, url, specs, stats, upload, rng, timeout):
+        self.conn = Connection(url, timeout)
+        self.specs = specs
+        self.stats = stats
+        self.upload = upload
+        self.rng = rng
+        self.values = {'tabs.value': 'tab-standings'}
+        self.classes = []
+
+    def call(self, action, output, changed):
+        spec = find_spec(self.specs, output)
+        body = json.dumps(callback_payload(spec, self.values, changed)).encode('utf-8')
+        start = time.perf_counter()
+        try:
+            status, data = self.conn.request('POST', DISPATCH, body)
+            received = len(data)
+            job = json.loads(data) if status == 200 else {}
+            # Background callbacks answer with a job, polled like the browser does until it has a result
+            while 'cacheKey' in job:
+                time.sleep(spec.get('background', {}).get('interval', 1000) / 1000)
+                query = urllib.parse.urlencode({'cacheKey': job['cacheKey'], 'job': job['job']})
+                status, data = self.conn.request('POST', f'{DISPATCH}?{query}', body)
+                received += len(data)
+                if status != 200 or 'response' in json.loads(data):
+                    break
+        except (OSError, http.client.HTTPException):
+            self.stats.add(action, time.perf_counter() - start, len(body), 0, False)
+            return None
+        # 204 is a PreventUpdate, a normal answer
+        self.stats.add(action, time.perf_counter() - start, len(body), received, status in (200, 204))
+        if status != 200:
+            return None
+        response = json.loads(data).get('response', {})
+        for component_id, props in response.items():
+            for prop, value in props.items():
+                self.values[f'{component_id}.{prop}'] = value
+        return response
+
+    def start(self):
+        """Upload and filter population, as after the browser loads a file"""
+        if self.upload is not None:
+            name, contents = self.upload
+            self.values['upload-data.contents'] = contents
+            self.values['upload-data.filename'] = name
+            self.call('upload', 'dataset-key.data', ['upload-data.contents'])
+        else:
+            self.load_layout()
+        self.call('filters', 'class-filter.options', ['dataset-meta.data'])
+        self.classes = [option['value'] for option in self.values.get('class-filter.options') or []]
+        self.render('tab', ['dataset-key.data'])
+
+    def load_layout(self):
+        """Stores of the page layout, which carries the dataset loaded at startup"""
+        start = time.perf_counter()
+        try:
+            status, data = self.conn.request('GET', '/_dash-layout')
+        except (OSError, http.client.HTTPException):
+            self.stats.add('layout', time.perf_counter() - start, 0, 0, False)
+            return
+        self.stats.add('layout', time.perf_counter() - start, 0, len(data), status == 200)
+        if status != 200:
+            return
+        layout = json.loads(data)
+        for store in ('stored-race-info', 'stored-incidents', 'dataset-key', 'dataset-meta', 'session-races'):
+            props = find_component(layout, store)
+            if props is not None:
+                self.values[f'{store}.data'] = props.get('data')
+
+    def render(self, action, changed):
+        response = self.call(action, 'tabs-content.children', changed)
+        if response and self.values['tabs.value'] == 'tab-standings':
+            selector = find_component(self.values.get('tabs-content.children'), 'standings-lap-selector')
+            if selector is not None:
+                self.values['standings-lap-selector.value'] = selector.get('value')
+                self.values['standings-lap-selector.options'] = selector.get('options')
+                self.call('standings', 'standings-table.children', ['standings-lap-selector.value'])
+
+    def step(self, action):
+        if action == 'tab':
+            self.values['tabs.value'] = self.rng.choice([t for t in TABS if t != self.values['tabs.value']])
+            self.render('tab', ['tabs.value'])
+        elif action == 'filter':
+            choice = self.rng.choice(self.classes + [None]) if self.classes else None
+            self.values['class-filter.value'] = [choice] if choice else None
+            self.render('filter', ['class-filter.value'])
+        elif action == 'standings':
+            if self.values['tabs.value'] != 'tab-standings':
+                self.values['tabs.value'] = 'tab-standings'
+                self.render('tab', ['tabs.value'])
+                return
+            options = self.values.get('standings-lap-selector.options') or []
+            if options:
+                self.values['standings-lap-selector.value'] = self.rng.choice(options)['value']
+                self.call('standings', 'standings-table.children', ['standings-lap-selector.value'])
+
+
+def run_users(url, users, duration, mix, upload, think, seed, timeout):
+    """Runs the simulated users for duration seconds, returns (Stats, elapsed seconds)"""
+    specs = callback_specs(url, timeout)
+    stats = Stats()
+    actions, weights = zip(*mix.items())
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def user(index):
+        rng = random.Random(seed + index)
+        session = Session(url, specs, stats, upload, rng, timeout)
+        try:
+            session.start()
+            while time.perf_counter() < deadline:
+                session.step(rng.choices(actions, weights)[0])
+                if think:
+                    time.sleep(rng.uniform(0, 2 * think))
+        finally:
+            session.conn.close()
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.perf_counter() - start
+
+
+def process_tree(pid):
+    """Returns [pid] of the process and its descendants, read from /proc"""
+    parents = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command may contain spaces, the fields after ')' do not
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents[ppid].append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(parents.get(current, []))
+    return tree
+
+
+def rss_mb(pid):
+    """Returns (VmRSS, VmHWM) in MB of a process, None when it is gone"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class MemorySampler(threading.Thread):
+    """Samples the resident memory of a process tree while the load runs"""
+
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = {}
+        self.done = threading.Event()
+
+    def sample(self):
+        for pid in process_tree(self.pid):
+            usage = rss_mb(pid)
+            if usage is None:
+                continue
+            rss, hwm = usage
+            entry = self.samples.setdefault(pid, {'start_mb': rss, 'peak_mb': rss, 'end_mb': rss, 'hwm_mb': hwm})
+            entry['peak_mb'] = max(entry['peak_mb'], rss)
+            entry['end_mb'] = rss
+            entry['hwm_mb'] = hwm
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        self.sample()
+        return {pid: {'role': 'main' if pid == self.pid else 'worker', **entry} for pid, entry in self.samples.items()}
+
+
+def start_server(kind, workers, threads, timeout=120):
+    """Starts app.py (waitress) or gunicorn on a free port, returns (process, url)"""
+    port = _free_port()
+    env = {**os.environ, 'PORT': str(port), 'THREADS': str(threads), 'DEBUG': 'False'}
+    if kind == 'waitress':
+        command = [sys.executable, 'app.py']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads), '--preload',
+                   '-b', f'127.0.0.1:{port}', '--timeout', '120', 'server:server']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    if not _wait_for(f'{url}/_dash-layout', time.perf_counter() + timeout):
+        process.terminate()
+        raise RuntimeError('Server did not start in time')
+    return process, url
+
+
+def load_upload(path):
+    """Returns (filename, data URL) as dcc.Upload sends it"""
+    with open(path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('ascii')
+    return os.path.basename(path), 'data:application/octet-stream;base64,' + encoded
+
+
+def print_report(rows, memory, elapsed, users):
+    total = rows.get('all', {})
+    print(f"\n{total.get('requests', 0)} requests in {elapsed:.1f}s by {users} users: "
+          f"{total.get('throughput_rps', 0):.1f} req/s, {total.get('error_rate', 0):.1%} errors\n")
+    header = ''.join(f'{f"p{p}":>9s}' for p in PERCENTILES)
+    print(f'{"action":12s}{"requests":>9s}{"errors":>8s}{"req/s":>8s}{"mean":>9s}{header}{"max":>9s}{"sent KB":>10s}{"recv KB":>10s}')
+    for action, row in rows.items():
+        percentiles = ''.join(f'{row[f"p{p}_ms"]:9.0f}' for p in PERCENTILES)
+        print(f'{action:12s}{row["requests"]:9d}{row["errors"]:8d}{row["throughput_rps"]:8.1f}{row["mean_ms"]:9.0f}'
+              f'{percentiles}{row["max_ms"]:9.0f}{row["sent_kb"]:10.1f}{row["received_kb"]:10.1f}')
+    print('(latencies in ms)')
+    if memory:
+        print(f'\n{"pid":>8s}  {"role":8s}{"start MB":>10s}{"peak MB":>10s}{"end MB":>10s}{"HWM MB":>10s}')
+        for pid, entry in sorted(memory.items()):
+            print(f'{pid:8d}  {entry["role"]:8s}{entry["start_mb"]:10.1f}{entry["peak_mb"]:10.1f}'
+                  f'{entry["end_mb"]:10.1f}{entry["hwm_mb"]:10.1f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test for the Dash callbacks')
+    parser.add_argument('--url', help='server to drive (default: start one with --server)')
+    parser.add_argument('--pid', type=int, help='server pid to sample memory from when using --url')
+    parser.add_argument('--server', choices=['waitress', 'gunicorn'], default='waitress', help='server to start')
+    parser.add_argument('--workers', type=int, default=5, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='waitress threads / gunicorn threads per worker')
+    parser.add_argument('--users', type=int, default=8, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='action weights (tab, filter, standings)')
+    parser.add_argument('--think', type=float, default=0.0, help='mean think time between actions (s)')
+    parser.add_argument('--upload', default=SAMPLE_PATH, help='results file each user uploads')
+    parser.add_argument('--no-upload', action='store_true', help='use the dataset loaded at startup')
+    parser.add_argument('--timeout', type=float, default=120, help='request timeout (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sample-interval', type=float, default=0.5, help='memory sampling interval (s)')
+    parser.add_argument('--output', help='write the report as JSON here')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    upload = None if args.no_upload else load_upload(args.upload)
+    process = None
+    url, pid = args.url, args.pid
+    if url is None:
+        process, url = start_server(args.server, args.workers, args.threads)
+        pid = process.pid
+    sampler = None
+    if pid is not None and os.path.isdir('/proc'):
+        sampler = MemorySampler(pid, args.sample_interval)
+        sampler.sample()
+        sampler.start()
+    try:
+        stats, elapsed = run_users(url, args.users, args.duration, mix, upload, args.think, args.seed, args.timeout)
+    finally:
+        memory = sampler.stop() if sampler else {}
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    rows = stats.summary(elapsed)
+    print_report(rows, memory, elapsed, args.users)
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != 'output'}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'elapsed_s': elapsed, 'actions': rows,
+                       'memory': {str(pid): entry for pid, entry in memory.items()}}, f, indent=2)
+    return 1 if rows.get('all', {}).get('errors') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Startup benchmarks.
+
+Time to first served page (default): starts ``python app.py`` on a free port
+and measures how long it takes until the index and the Dash layout are
+served.
+
+    python benchmarks/startup.py --runs 5
+
+Import-time profile: runs ``python -X importtime -c "import app"`` and prints
+the slowest modules (cumulative and self time) and the self time grouped by
+top-level package.
+
+    python benchmarks/startup.py --imports --top 25
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    response.read()
+                    return True
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.01)
+    return False
+
+
+def time_to_first_page(timeout=60):
+    """Starts the server and returns (seconds until '/' is served, seconds until the layout is served)"""
+    port = _free_port()
+    env = {**os.environ, 'PORT': str(port), 'DEBUG': 'False'}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        base = f'http://127.0.0.1:{port}'
+        if not _wait_for(f'{base}/', deadline):
+            raise RuntimeError('Server did not answer in time')
+        index = time.perf_counter() - start
+        if not _wait_for(f'{base}/_dash-layout', deadline):
+            raise RuntimeError('Layout was not served in time')
+        layout = time.perf_counter() - start
+        return index, layout
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_profile(module='app'):
+    """Returns [(module, self_us, cumulative_us, depth)] from ``-X importtime``"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def print_import_report(entries, top):
+    total = max(cumulative for _, _, cumulative, _ in entries)
+    print(f'Total import time: {total / 1000:.1f} ms\n')
+
+    print(f'Top {top} modules by cumulative time')
+    for name, self_us, cumulative_us, _ in sorted(entries, key=lambda e: -e[2])[:top]:
+        print(f'  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name}')
+
+    print(f'\nTop {top} modules by self time')
+    for name, self_us, _, _ in sorted(entries, key=lambda e: -e[1])[:top]:
+        print(f'  {self_us / 1000:9.1f} ms  {name}')
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        packages[name.split('.')[0]] += self_us
+    print(f'\nSelf time by top-level package')
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f'  {self_us / 1000:9.1f} ms  {self_us / total:6.1%}  {package}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup benchmarks')
+    parser.add_argument('--imports', action='store_true', help='print an import-time profile of app.py')
+    parser.add_argument('--top', type=int, default=20, help='rows per import report section')
+    parser.add_argument('--runs', type=int, default=5, help='server starts to measure')
+    args = parser.parse_args()
+
+    if args.imports:
+        print_import_report(import_profile(), args.top)
+        return
+
+    runs = [time_to_first_page() for _ in range(args.runs)]
+    for label, values in [('index', [r[0] for r in runs]), ('layout', [r[1] for r in runs])]:
+        print(f'Time to first {label}: median {statistics.median(values):.3f}s '
+              f'min {min(values):.3f}s max {max(values):.3f}s ({args.runs} runs)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Benchmark suite for the parser, chart builders and table callbacks.
+
+Times every benchmark on three datasets (small: a synthetic sprint, medium:
+the bundled sample, 24h: a synthetic 60-car 24h race), records the peak
+memory allocated by one extra run under tracemalloc and writes the results
+as JSON. Datasets are cached in a temporary directory, never in the
+server's dataset cache. With --baseline the run is compared against a saved result file
+and the command exits with status 1 when a benchmark got slower than the
+threshold.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --datasets small,medium --baseline results.json --threshold 0.2
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+import business.analytics as analytics  # noqa: E402
+from business.battles import detect_battles  # noqa: E402
+from business.lap_matrix import LapMatrix  # noqa: E402
+from data import cache  # noqa: E402
+from data.parsers import parse_xml_scores  # noqa: E402
+from data.synthetic import race_xml, PRESETS  # noqa: E402
+from presentation.callbacks import _create_laptimes_table  # noqa: E402
+from presentation.components import create_standings_table, build_laptimes_view, create_laptimes_page  # noqa: E402
+
+SAMPLE_PATH = os.path.join(ROOT, 'samples', '2025_anonymized.xmlx')
+DATASETS = ['small', 'medium', '24h']
+
+
+def load_dataset(name):
+    """Returns the XML text of a benchmark dataset"""
+    if name == 'small':
+        return race_xml(drivers=20, classes=['Hyper', 'GT3'], laps=20, seed=1)
+    if name == 'medium':
+        with open(SAMPLE_PATH, encoding='utf-8') as f:
+            return f.read()
+    if name == '24h':
+        return race_xml(**PRESETS['24h'], seed=1)
+    raise ValueError(f'Unknown dataset {name}')
+
+
+def chart_builders():
+    """Returns {name: builder} of every tab chart builder, builder(data, drivers, classes), in business.analytics"""
+    return {
+        name: func for name, func in inspect.getmembers(analytics, inspect.isfunction)
+        if name.startswith('update_') and func.__module__ == analytics.__name__
+    }
+
+
+def benchmarks(xml):
+    """Returns [(name, callable)] for a dataset"""
+    df, race_info, incidents = parse_xml_scores(xml)
+    key = cache.put_dataset(cache.dataset_key(xml), df, race_info, incidents)
+    max_lap = int(df['Lap'].max())
+    laptimes_view = build_laptimes_view(df)
+
+    cases = [
+        ('parse_xml_scores', lambda: parse_xml_scores(xml)),
+        ('get_dataframe_memory', lambda: cache.get_dataframe(key)),
+        ('get_dataframe_disk', lambda: _disk_hit(key)),
+        ('lap_matrix', lambda: LapMatrix(df)),
+        ('detect_battles', lambda: detect_battles(df)),
+        ('create_standings_table', lambda: create_standings_table(max_lap, df)),
+        ('_create_laptimes_table', lambda: _create_laptimes_table(df)),
+        ('laptimes_view', lambda: build_laptimes_view(df)),
+        ('laptimes_page', lambda: create_laptimes_page(laptimes_view, 0, 100)),
+    ]
+    for name, builder in sorted(chart_builders().items()):
+        cases.append((name, lambda builder=builder: builder(df, None, None)))
+    return cases
+
+
+def _disk_hit(key):
+    # What another worker process pays on its first request for a key
+    cache.clear_memory()
+    return cache.get_dataframe(key)
+
+
+def measure(func, repeat):
+    """Returns timing (ms) and peak traced memory (MB) of func"""
+    func()  # warm up caches such as the lap matrix
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(times), 3),
+        'min_ms': round(min(times), 3),
+        'runs': repeat,
+        'peak_mb': round(peak / 1e6, 3)
+    }
+
+
+def run(datasets, repeat, pattern=None):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='rf2-benchmarks-') as cache_dir:
+        cache.CACHE_DIR = cache_dir
+        for dataset in datasets:
+            xml = load_dataset(dataset)
+            for name, func in benchmarks(xml):
+                key = f'{dataset}/{name}'
+                if pattern and not re.search(pattern, key):
+                    continue
+                # Expensive cases on large data get fewer runs
+                results[key] = measure(func, repeat if dataset != '24h' else max(1, repeat // 3))
+                print(f'{key:55s} {results[key]["median_ms"]:10.2f} ms  {results[key]["peak_mb"]:8.2f} MB', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Prints the change of every benchmark against the baseline, returns the slower ones"""
+    slower = []
+    print(f'\n{"benchmark":55s} {"baseline":>10s} {"current":>10s} {"change":>8s}')
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            print(f'{key:55s} {"-":>10s} {current["median_ms"]:10.2f} {"new":>8s}')
+            continue
+        change = current['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0.0
+        flag = ''
+        if change > threshold and current['median_ms'] - previous['median_ms'] >= min_ms:
+            flag = '  SLOWER'
+            slower.append(key)
+        print(f'{key:55s} {previous["median_ms"]:10.2f} {current["median_ms"]:10.2f} {change:+8.1%}{flag}')
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite')
+    parser.add_argument('--datasets', default=','.join(DATASETS), help='comma separated: ' + ','.join(DATASETS))
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--filter', help='regex on dataset/benchmark names')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown that fails the comparison')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='ignore slowdowns smaller than this (ms)')
+    args = parser.parse_args(argv)
+
+    results = run([d for d in args.datasets.split(',') if d], args.repeat, args.filter)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        slower = compare(results, baseline, args.threshold, args.min_ms)
+        if slower:
+            print(f'\n{len(slower)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
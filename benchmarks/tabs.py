@@ -0,0 +1,89 @@
+"""Tab latency with the chart process pool.
+
+Builds the figures of every multi-chart tab (Position, Gap, Fuel, Tires) on
+a large race, serially and with the chart pool at several worker counts,
+and prints the median latency of each tab and the speedup over serial.
+Worker start-up and the first dataset load of each worker are excluded by
+warm-up passes.
+
+    python benchmarks/tabs.py --preset 24h --workers 0,2,4,8
+    python benchmarks/tabs.py --xml results.xml --repeat 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data.cache import dataset_key, put_dataset, get_dataframe  # noqa: E402
+from data.parsers import parse_xml_scores  # noqa: E402
+from data.synthetic import race_xml, PRESETS  # noqa: E402
+from presentation import chart_executor  # noqa: E402
+from presentation.callbacks import TAB_CHARTS, POSITION_VIEW_CHARTS, LAP_CHART_HEATMAP_MIN_DRIVERS  # noqa: E402
+
+
+def tab_builders(df):
+    """Returns {tab: [builder names]} as the tabs callback builds them"""
+    view = 'heatmap' if df['Driver'].nunique() > LAP_CHART_HEATMAP_MIN_DRIVERS else 'lines'
+    tabs = {'tab-position': [POSITION_VIEW_CHARTS[view], 'update_strategy_gantt_chart']}
+    tabs.update({tab: [builder for _, builder in charts] for tab, charts in TAB_CHARTS.items()})
+    return tabs
+
+
+def time_tabs(tabs, key, repeat, warmup=2):
+    """Returns {tab: median seconds} of build_charts with the current CHART_WORKERS"""
+    df = get_dataframe(key)
+    for _ in range(warmup):
+        for names in tabs.values():
+            chart_executor.build_charts(names, key, df, None)
+    results = {}
+    for tab, names in tabs.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chart_executor.build_charts(names, key, df, None)
+            times.append(time.perf_counter() - start)
+        results[tab] = statistics.median(times)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tab latency with the chart process pool')
+    parser.add_argument('--preset', default='24h', choices=sorted(PRESETS), help='synthetic race to use')
+    parser.add_argument('--xml', help='results file to use instead of a synthetic race')
+    parser.add_argument('--workers', default=f'0,2,4,{os.cpu_count()}', help='comma separated CHART_WORKERS values (0 = serial)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed builds per tab')
+    args = parser.parse_args()
+
+    if args.xml:
+        with open(args.xml, encoding='utf-8') as f:
+            content = f.read()
+    else:
+        content = race_xml(**PRESETS[args.preset], seed=1)
+    df, race_info, incidents = parse_xml_scores(content)
+    # Workers resolve the key from the shared disk cache, as in the server
+    key = put_dataset(dataset_key(content), df, race_info, incidents)
+    tabs = tab_builders(df)
+    print(f'{df["Driver"].nunique()} drivers, {int(df["Lap"].max())} laps, {os.cpu_count()} CPUs\n')
+
+    counts = sorted({int(n) for n in args.workers.split(',') if n})
+    results = {}
+    for workers in counts:
+        chart_executor.shutdown()
+        chart_executor.CHART_WORKERS = workers
+        results[workers] = time_tabs(tabs, key, args.repeat)
+    chart_executor.shutdown()
+
+    header = ''.join(f'{("serial" if n == 0 else f"{n} workers"):>18s}' for n in counts)
+    print(f'{"tab":14s}{"charts":>7s}{header}')
+    for tab, names in tabs.items():
+        base = results[counts[0]][tab]
+        cells = ''.join(f'{results[n][tab] * 1000:9.0f} ms {base / results[n][tab]:4.1f}x' for n in counts)
+        print(f'{tab:14s}{len(names):7d}{cells}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,13 @@
 import plotly.graph_objs as go
+import numpy as np
 import pandas as pd
+from plotly.colors import qualitative
+from business.lap_matrix import get_lap_matrix
+from business.battles import detect_battles
+from business.degradation import assign_stints, fit_stint_degradation, trend_line
 
+# Palette cycled by driver in the heatmap lap chart
+LAP_CHART_COLORS = qualitative.Dark24 + qualitative.Light24
 
 def update_strategy_gantt_chart(data, selected_drivers, selected_classes):
     """Creates a Gantt chart showing tire strategy by driver"""
@@ -30,7 +37,7 @@ def update_strategy_gantt_chart(data, selected_drivers, selected_classes):
     
     # Get finishing order from final positions
     # Get each driver's last lap and their position at that moment
-    final_positions = df.groupby('Driver')['Lap'].idxmax()
+    final_positions = df.groupby('Driver', observed=True)['Lap'].idxmax()
     final_data = df.loc[final_positions]
     # Sort by: laps completed (descending), then position (ascending)
     final_data = final_data.sort_values(['Lap', 'Position'], ascending=[False, True])
@@ -156,30 +163,24 @@ def update_strategy_gantt_chart(data, selected_drivers, selected_classes):
 
 
 def update_position_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df_pos = df.copy()
+    matrix = get_lap_matrix(data)
+    rows = matrix.rows(selected_drivers, selected_classes)
     
-    if df_pos.empty:
+    if len(rows) == 0:
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
     fig = go.Figure()
     
-    for driver in df_pos['Driver'].unique():
-        driver_data = df_pos[df_pos['Driver'] == driver].sort_values('Lap')
+    for row in rows:
+        laps, positions = matrix.series('Position', row)
         fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['Position'],
+            x=laps,
+            y=positions.astype(int),
             mode='lines+markers',
-            name=driver,
+            name=matrix.drivers[row],
             hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Position: %{y}<extra></extra>'
         ))
     
@@ -195,110 +196,113 @@ def update_position_chart(data, selected_drivers, selected_classes):
     return fig
 
 
-def update_gap_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+def update_lap_chart_heatmap(data, selected_drivers, selected_classes):
+    """Classic lap chart: a single heatmap with one cell per (position, lap) colored by the driver holding it"""
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
+    matrix = get_lap_matrix(data)
+    rows = matrix.rows(selected_drivers, selected_classes)
+    positions = matrix.values('Position')
     
-    if df.empty:
+    if len(rows) == 0 or not (positions[rows] > 0).any():
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    fig = go.Figure()
-    
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        
-        # Format gap times as mm:ss.sss
-        formatted_gaps = []
-        for gap in driver_data['GapToLeader']:
-            minutes = int(gap // 60)
-            seconds = gap % 60
-            formatted_gaps.append(f"{minutes}:{seconds:06.3f}")
-        
-        fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['GapToLeader'],
-            mode='lines+markers',
-            name=driver,
-            text=formatted_gaps,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Gap: %{text}<extra></extra>'
-        ))
-    
-    # Format y-axis ticks as mm:ss
-    min_gap = df['GapToLeader'].min()
-    max_gap = df['GapToLeader'].max()
-    tick_interval = 30  # 30 seconds
-    tick_vals = list(range(int(min_gap), int(max_gap) + tick_interval, tick_interval))
-    tick_texts = [f"{int(t//60):01d}:{int(t%60):02d}" for t in tick_vals]
+    # Pivot drivers x laps positions into positions x laps driver rows
+    driver_rows, lap_cols = np.nonzero(positions[rows] > 0)
+    driver_rows = rows[driver_rows]
+    grid_rows = positions[driver_rows, lap_cols].astype(int) - 1
+    n_positions = int(np.nanmax(positions))
+    
+    colors = LAP_CHART_COLORS
+    z = np.full((n_positions, len(matrix.laps)), np.nan)
+    z[grid_rows, lap_cols] = driver_rows % len(colors)
+    names = np.full(z.shape, '', dtype=object)
+    names[grid_rows, lap_cols] = matrix.drivers[driver_rows]
+    
+    # One color band per palette entry, drivers cycle through the palette
+    colorscale = []
+    for i, color in enumerate(colors):
+        colorscale.append([i / len(colors), color])
+        colorscale.append([(i + 1) / len(colors), color])
+    
+    fig = go.Figure(go.Heatmap(
+        x=matrix.laps,
+        y=np.arange(1, n_positions + 1),
+        z=z,
+        text=names,
+        zmin=-0.5,
+        zmax=len(colors) - 0.5,
+        colorscale=colorscale,
+        showscale=False,
+        hoverongaps=False,
+        xgap=1,
+        ygap=1,
+        hovertemplate='Lap: %{x}<br>Position: %{y}<br>%{text}<extra></extra>'
+    ))
     
     fig.update_layout(
-        title='Gap to Leader by Lap',
+        title='Lap Chart - Position by Lap',
         xaxis_title='Lap',
-        yaxis_title='Gap to Leader',
+        yaxis_title='Position',
+        yaxis=dict(autorange='reversed'),
         hovermode='closest',
-        height=600,
-        yaxis=dict(
-            tickmode='array',
-            tickvals=tick_vals,
-            ticktext=tick_texts
-        )
+        height=600
     )
     
     return fig
 
 
+def update_gap_chart(data, selected_drivers, selected_classes):
+    return _gap_chart(data, selected_drivers, selected_classes, 'GapToLeader', 'Gap to Leader')
+
+
 def update_class_gap_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+    return _gap_chart(data, selected_drivers, selected_classes, 'GapToClassLeader', 'Gap to Class Leader')
+
+
+def update_interval_chart(data, selected_drivers, selected_classes):
+    return _gap_chart(data, selected_drivers, selected_classes, 'IntervalAhead', 'Interval to Car Ahead', 5)
+
+
+def update_class_interval_chart(data, selected_drivers, selected_classes):
+    return _gap_chart(data, selected_drivers, selected_classes, 'ClassIntervalAhead', 'Interval to Class Car Ahead', 5)
+
+
+def _gap_chart(data, selected_drivers, selected_classes, field, label, tick_interval=30):
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
+    matrix = get_lap_matrix(data)
+    rows = matrix.rows(selected_drivers, selected_classes)
     
-    if df.empty:
+    if len(rows) == 0:
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
     fig = go.Figure()
     
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        
-        # Format gap times as mm:ss.sss
-        formatted_gaps = []
-        for gap in driver_data['GapToClassLeader']:
-            minutes = int(gap // 60)
-            seconds = gap % 60
-            formatted_gaps.append(f"{minutes}:{seconds:06.3f}")
-        
+    for row in rows:
+        laps, gaps = matrix.series(field, row)
         fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['GapToClassLeader'],
+            x=laps,
+            y=gaps,
             mode='lines+markers',
-            name=driver,
-            text=formatted_gaps,
+            name=matrix.drivers[row],
+            text=_format_minutes(gaps, '%d'),
             hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Gap: %{text}<extra></extra>'
         ))
     
     # Format y-axis ticks as mm:ss
-    min_gap = df['GapToClassLeader'].min()
-    max_gap = df['GapToClassLeader'].max()
-    tick_interval = 30  # 30 seconds
+    gaps = matrix.values(field)[rows][matrix.present[rows]]
+    min_gap = gaps.min()
+    max_gap = gaps.max()
     tick_vals = list(range(int(min_gap), int(max_gap) + tick_interval, tick_interval))
     tick_texts = [f"{int(t//60):01d}:{int(t%60):02d}" for t in tick_vals]
     
     fig.update_layout(
-        title='Gap to Class Leader by Lap',
+        title=f'{label} by Lap',
         xaxis_title='Lap',
-        yaxis_title='Gap to Class Leader',
+        yaxis_title=label,
         hovermode='closest',
         height=600,
         yaxis=dict(
@@ -311,389 +315,222 @@ def update_class_gap_chart(data, selected_drivers, selected_classes):
     return fig
 
 
-def update_laptime_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+def update_battle_chart(data, selected_drivers, selected_classes):
+    """Battles: pairs of cars running within a second of each other for several consecutive laps"""
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    battles = detect_battles(df)
+    
     if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
+        battles = battles[battles['Driver'].isin(selected_drivers) | battles['Rival'].isin(selected_drivers)]
     if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['LapTime'] > 0]
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No lap time data available", showarrow=False)
-    
-    fig = go.Figure()
-    
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        minutes = (driver_data['LapTime'] // 60).astype(int)
-        seconds = driver_data['LapTime'] % 60
-        formatted_times = [f"{int(m):02d}:{s:06.3f}" for m, s in zip(minutes, seconds)]
-        
-        fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['LapTime'],
-            mode='lines+markers',
-            name=driver,
-            text=formatted_times,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Time: %{text}<extra></extra>'
-        ))
+        battles = battles[battles['Class'].isin(selected_classes)]
+    
+    if battles.empty:
+        return go.Figure().add_annotation(text="No battles found", showarrow=False)
+    
+    labels = battles['Driver'] + ' vs ' + battles['Rival']
+    
+    fig = go.Figure(go.Bar(
+        x=battles['Laps'],
+        y=labels,
+        base=battles['StartLap'],
+        orientation='h',
+        marker=dict(
+            color=battles['MinInterval'],
+            colorscale='Reds_r',
+            colorbar=dict(title='Closest (s)')
+        ),
+        customdata=battles[['StartLap', 'EndLap', 'Laps', 'MinInterval', 'MeanInterval']].to_numpy(),
+        hovertemplate='<b>%{y}</b><br>' +
+                     'Laps %{customdata[0]} - %{customdata[1]} (%{customdata[2]} laps)<br>' +
+                     'Closest: %{customdata[3]:.3f}s<br>' +
+                     'Average: %{customdata[4]:.3f}s<extra></extra>'
+    ))
     
     fig.update_layout(
-        title='Lap Times',
+        title='Battles - Cars Within 1s for 3+ Consecutive Laps',
         xaxis_title='Lap',
-        yaxis_title='Lap Time (seconds)',
+        yaxis_title='Battle',
         hovermode='closest',
-        height=600,
-        yaxis=dict(
-            tickmode='array',
-            tickvals=[i*10 for i in range(int(df['LapTime'].min()//10), int(df['LapTime'].max()//10)+2)],
-            ticktext=[f"{int(t//60):02d}:{int(t%60):02d}" for t in [i*10 for i in range(int(df['LapTime'].min()//10), int(df['LapTime'].max()//10)+2)]]
-        )
+        height=max(400, labels.nunique() * 25 + 100),
+        yaxis=dict(autorange='reversed')
     )
     
     return fig
 
 
-def update_laptime_no_pit_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+def update_laptime_chart(data, selected_drivers, selected_classes):
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    all_data = pd.DataFrame(data)
-    exclude_set = set()
-    for driver in all_data['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver]
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        for pit_lap in pit_laps:
-            exclude_set.add((driver, pit_lap))
-            exclude_set.add((driver, pit_lap + 1))
+    matrix = get_lap_matrix(data)
+    rows = matrix.rows(selected_drivers, selected_classes)
+    valid = matrix.values('LapTime') > 0
     
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
+    return _laptime_figure(matrix, rows, valid, 'Lap Times', False)
+
+
+def update_laptime_no_pit_chart(data, selected_drivers, selected_classes):
+    if _is_empty(data):
+        return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    df = df[df['LapTime'] > 0].copy()
-    df = df.sort_values(['Driver', 'Lap'])
-    df = df[~df.apply(lambda row: (row['Driver'], row['Lap']) in exclude_set, axis=1)]
+    matrix = get_lap_matrix(data)
+    rows = matrix.rows(selected_drivers, selected_classes)
+    valid = (matrix.values('LapTime') > 0) & ~matrix.pit & ~matrix.after_pit()
     
-    if df.empty:
+    # Drivers are listed alphabetically in this chart
+    return _laptime_figure(matrix, rows, valid, 'Lap Times (Excluding Pit Laps)', True)
+
+
+def _laptime_figure(matrix, rows, valid, title, sort_by_name):
+    rows = matrix.ordered(rows, valid)
+    
+    if len(rows) == 0:
         return go.Figure().add_annotation(text="No lap time data available", showarrow=False)
     
+    if sort_by_name:
+        rows = sorted(rows, key=lambda row: matrix.drivers[row])
+    
     fig = go.Figure()
     
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        minutes = (driver_data['LapTime'] // 60).astype(int)
-        seconds = driver_data['LapTime'] % 60
-        formatted_times = [f"{int(m):02d}:{s:06.3f}" for m, s in zip(minutes, seconds)]
-        
+    for row in rows:
+        laps, lap_times = matrix.series('LapTime', row, valid)
         fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['LapTime'],
+            x=laps,
+            y=lap_times,
             mode='lines+markers',
-            name=driver,
-            text=formatted_times,
+            name=matrix.drivers[row],
+            text=_format_minutes(lap_times, '%02d'),
             hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Time: %{text}<extra></extra>'
         ))
     
+    lap_times = matrix.values('LapTime')[rows][valid[rows]]
+    tick_vals = [i*10 for i in range(int(lap_times.min()//10), int(lap_times.max()//10)+2)]
+    
     fig.update_layout(
-        title='Lap Times (Excluding Pit Laps)',
+        title=title,
         xaxis_title='Lap',
         yaxis_title='Lap Time (seconds)',
         hovermode='closest',
         height=600,
         yaxis=dict(
             tickmode='array',
-            tickvals=[i*10 for i in range(int(df['LapTime'].min()//10), int(df['LapTime'].max()//10)+2)],
-            ticktext=[f"{int(t//60):02d}:{int(t%60):02d}" for t in [i*10 for i in range(int(df['LapTime'].min()//10), int(df['LapTime'].max()//10)+2)]]
+            tickvals=tick_vals,
+            ticktext=[f"{int(t//60):02d}:{int(t%60):02d}" for t in tick_vals]
         )
     )
     
     return fig
 
 
-def update_fuel_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+def _level_chart(data, selected_drivers, selected_classes, field, exclude_after_pit, empty_text, hovertemplate, layout):
+    """Plots field * 100 per lap for every driver, skipping zero values"""
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    all_data = pd.DataFrame(data)
-    exclude_set = set()
-    for driver in all_data['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver]
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        for pit_lap in pit_laps:
-            exclude_set.add((driver, pit_lap + 1))
-    
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
+    matrix = get_lap_matrix(data)
+    valid = matrix.values(field) > 0
+    if exclude_after_pit:
+        valid &= ~matrix.after_pit()
+    rows = matrix.ordered(matrix.rows(selected_drivers, selected_classes), valid)
     
-    df = df[df['FuelUsed'] > 0]
-    df = df[~df.apply(lambda row: (row['Driver'], row['Lap']) in exclude_set, axis=1)]
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No fuel data available", showarrow=False)
+    if len(rows) == 0:
+        return go.Figure().add_annotation(text=empty_text, showarrow=False)
     
     fig = go.Figure()
     
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
+    for row in rows:
+        laps, values = matrix.series(field, row, valid)
         fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['FuelUsed'] * 100,
+            x=laps,
+            y=values * 100,
             mode='lines+markers',
-            name=driver,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Fuel: %{y:.2f}L<extra></extra>'
+            name=matrix.drivers[row],
+            hovertemplate=hovertemplate
         ))
     
     fig.update_layout(
-        title='Fuel Used per Lap',
         xaxis_title='Lap',
-        yaxis_title='Fuel Used (Liters)',
         hovermode='closest',
-        height=600
+        height=600,
+        **layout
     )
     
     return fig
 
 
-def update_ve_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No data available", showarrow=False)
-    
-    all_data = pd.DataFrame(data)
-    exclude_set = set()
-    for driver in all_data['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver]
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        for pit_lap in pit_laps:
-            exclude_set.add((driver, pit_lap + 1))
-    
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['VE'] > 0]
-    df = df[~df.apply(lambda row: (row['Driver'], row['Lap']) in exclude_set, axis=1)]
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No virtual energy data available", showarrow=False)
-    
-    fig = go.Figure()
-    
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['VE'] * 100,
-            mode='lines+markers',
-            name=driver,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>VE: %{y:.2f}%<extra></extra>'
-        ))
-    
-    fig.update_layout(
-        title='Virtual Energy per Lap',
-        xaxis_title='Lap',
-        yaxis_title='Virtual Energy (%)',
-        hovermode='closest',
-        height=600
+def update_fuel_chart(data, selected_drivers, selected_classes):
+    return _level_chart(
+        data, selected_drivers, selected_classes, 'FuelUsed', True, "No fuel data available",
+        '%{fullData.name}<br>Lap: %{x}<br>Fuel: %{y:.2f}L<extra></extra>',
+        dict(title='Fuel Used per Lap', yaxis_title='Fuel Used (Liters)')
     )
-    
-    return fig
 
 
+def update_ve_chart(data, selected_drivers, selected_classes):
+    return _level_chart(
+        data, selected_drivers, selected_classes, 'VE', True, "No virtual energy data available",
+        '%{fullData.name}<br>Lap: %{x}<br>VE: %{y:.2f}%<extra></extra>',
+        dict(title='Virtual Energy per Lap', yaxis_title='Virtual Energy (%)')
+    )
+
 
 def update_tire_wear_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No data available", showarrow=False)
-    
-    all_data = pd.DataFrame(data)
-    exclude_set = set()
-    for driver in all_data['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver]
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        for pit_lap in pit_laps:
-            exclude_set.add((driver, pit_lap + 1))
-    
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['TireWear'] > 0]
-    df = df[~df.apply(lambda row: (row['Driver'], row['Lap']) in exclude_set, axis=1)]
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No tire wear data available", showarrow=False)
-    
-    fig = go.Figure()
-    
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['TireWear'] * 100,
-            mode='lines+markers',
-            name=driver,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Tire Wear: %{y:.2f}%<extra></extra>'
-        ))
-    
-    fig.update_layout(
-        title='Tire Condition',
-        xaxis_title='Lap',
-        yaxis_title='Tire Wear (%)',
-        hovermode='closest',
-        height=600
+    return _level_chart(
+        data, selected_drivers, selected_classes, 'TireWear', True, "No tire wear data available",
+        '%{fullData.name}<br>Lap: %{x}<br>Tire Wear: %{y:.2f}%<extra></extra>',
+        dict(title='Tire Condition', yaxis_title='Tire Wear (%)')
     )
-    
-    return fig
-
 
 
 def update_fuel_level_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No data available", showarrow=False)
-    
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['FuelLevel'] > 0]
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No fuel level data available", showarrow=False)
-    
-    fig = go.Figure()
-    
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['FuelLevel'] * 100,
-            mode='lines+markers',
-            name=driver,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Fuel: %{y:.2f}L<extra></extra>'
-        ))
-    
-    fig.update_layout(
-        title='Fuel Level',
-        xaxis_title='Lap',
-        yaxis_title='Fuel Level (Liters)',
-        hovermode='closest',
-        height=600
+    return _level_chart(
+        data, selected_drivers, selected_classes, 'FuelLevel', False, "No fuel level data available",
+        '%{fullData.name}<br>Lap: %{x}<br>Fuel: %{y:.2f}L<extra></extra>',
+        dict(title='Fuel Level', yaxis_title='Fuel Level (Liters)')
     )
-    
-    return fig
 
 
 def update_ve_level_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No data available", showarrow=False)
-    
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['VELevel'] > 0]
-    
-    if df.empty:
-        return go.Figure().add_annotation(text="No virtual energy level data available", showarrow=False)
-    
-    fig = go.Figure()
-    
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap')
-        fig.add_trace(go.Scatter(
-            x=driver_data['Lap'],
-            y=driver_data['VELevel'] * 100,
-            mode='lines+markers',
-            name=driver,
-            hovertemplate='%{fullData.name}<br>Lap: %{x}<br>VE: %{y:.2f}%<extra></extra>'
-        ))
-    
-    fig.update_layout(
-        title='Virtual Energy Level',
-        xaxis_title='Lap',
-        yaxis_title='Virtual Energy Level (%)',
-        hovermode='closest',
-        height=600
+    return _level_chart(
+        data, selected_drivers, selected_classes, 'VELevel', False, "No virtual energy level data available",
+        '%{fullData.name}<br>Lap: %{x}<br>VE: %{y:.2f}%<extra></extra>',
+        dict(title='Virtual Energy Level', yaxis_title='Virtual Energy Level (%)')
     )
-    
-    return fig
 
 
 def update_tire_consumption_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    all_data = pd.DataFrame(data)
-    exclude_set = set()
-    for driver in all_data['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver]
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        for pit_lap in pit_laps:
-            exclude_set.add((driver, pit_lap + 1))
-    
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['TireWear'] > 0]
-    df = df[~df.apply(lambda row: (row['Driver'], row['Lap']) in exclude_set, axis=1)]
+    matrix = get_lap_matrix(data)
+    valid = (matrix.values('TireWear') > 0) & ~matrix.after_pit()
+    rows = matrix.ordered(matrix.rows(selected_drivers, selected_classes), valid)
     
-    if df.empty:
+    if len(rows) == 0:
         return go.Figure().add_annotation(text="No tire data available", showarrow=False)
     
     fig = go.Figure()
     
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver].sort_values('Lap').reset_index(drop=True)
+    for row in rows:
+        laps, wear = matrix.series('TireWear', row, valid)
         
-        if len(driver_data) < 2:
+        if len(wear) < 2:
             continue
         
-        consumption = []
-        laps = []
-        
-        for i in range(len(driver_data) - 1):
-            wear_n = driver_data.loc[i, 'TireWear']
-            wear_n1 = driver_data.loc[i + 1, 'TireWear']
-            cons = (wear_n - wear_n1) * 100
-            if cons >= 0:
-                consumption.append(cons)
-                laps.append(driver_data.loc[i, 'Lap'])
+        # Wear lost between consecutive valid laps, credited to the first lap
+        consumption = (wear[:-1] - wear[1:]) * 100
+        keep = consumption >= 0
         
-        if consumption:
+        if keep.any():
             fig.add_trace(go.Scatter(
-                x=laps,
-                y=consumption,
+                x=laps[:-1][keep],
+                y=consumption[keep],
                 mode='lines+markers',
-                name=driver,
+                name=matrix.drivers[row],
                 hovertemplate='%{fullData.name}<br>Lap: %{x}<br>Consumption: %{y:.3f}%<extra></extra>'
             ))
     
@@ -714,61 +551,37 @@ def update_tire_degradation_chart(data, selected_drivers, selected_classes):
     if df.empty:
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    all_data = pd.DataFrame(data)
+    all_data = df
     
     if selected_drivers:
         df = df[df['Driver'].isin(selected_drivers)]
     if selected_classes:
         df = df[df['Class'].isin(selected_classes)]
     
-    df = df[(df['TireWear'] > 0) & (df['LapTime'] > 0)].copy()
+    df = df[(df['TireWear'] > 0) & (df['LapTime'] > 0)]
     
     if df.empty:
         return go.Figure().add_annotation(text="No tire or lap time data available", showarrow=False)
     
     fig = go.Figure()
+    stints, fits = _stint_fits(all_data, df['Driver'].unique())
     
     for driver in df['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver].sort_values('Lap')
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        
-        exclude_laps = set()
-        for pit_lap in pit_laps:
-            exclude_laps.add(pit_lap)
-            exclude_laps.add(pit_lap + 1)
-        
-        stints = []
-        current_stint = []
-        
-        for idx, row in driver_data.iterrows():
-            if row['Lap'] in pit_laps:
-                if current_stint:
-                    stints.append(pd.DataFrame(current_stint))
-                current_stint = []
-            elif row['Lap'] not in exclude_laps and row['TireWear'] > 0 and row['LapTime'] > 0:
-                current_stint.append(row)
-        
-        if current_stint:
-            stints.append(pd.DataFrame(current_stint))
-        
-        for stint_idx, stint_df in enumerate(stints):
+        for stint, stint_df in stints.get(driver, []):
             if len(stint_df) < 2:
                 continue
             
-            if driver not in [d for d in (selected_drivers or [])] and selected_drivers:
-                continue
-            
+            name = f"{driver} - Stint {stint}"
             best_lap = stint_df['LapTime'].min()
-            stint_df['Delta'] = stint_df['LapTime'] - best_lap
-            stint_df['TireDeg'] = (1 - stint_df['TireWear']) * 100
-            
             fig.add_trace(go.Scatter(
                 x=stint_df['TireDeg'],
-                y=stint_df['Delta'],
+                y=stint_df['LapTime'] - best_lap,
                 mode='markers+lines',
-                name=f"{driver} - Stint {stint_idx + 1}",
+                name=name,
+                legendgroup=name,
                 hovertemplate='%{fullData.name}<br>Tire Deg: %{x:.1f}%<br>Delta: +%{y:.3f}s<extra></extra>'
             ))
+            _add_trend_line(fig, fits.get((driver, stint)), stint_df, name, showlegend=False, legendgroup=name)
     
     fig.update_layout(
         title='Lap Time Delta vs Tire Degradation',
@@ -788,70 +601,43 @@ def update_pace_decay_chart(data, selected_drivers, selected_classes):
     if df.empty:
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    all_data = pd.DataFrame(data)
+    all_data = df
     
     if selected_drivers:
         df = df[df['Driver'].isin(selected_drivers)]
     if selected_classes:
         df = df[df['Class'].isin(selected_classes)]
     
-    df = df[(df['TireWear'] > 0) & (df['LapTime'] > 0)].copy()
+    df = df[(df['TireWear'] > 0) & (df['LapTime'] > 0)]
     
     if df.empty:
         return go.Figure().add_annotation(text="No tire or lap time data available", showarrow=False)
     
     fig = go.Figure()
+    stints, fits = _stint_fits(all_data, df['Driver'].unique())
     
     # Cores para cada piloto
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
     
     for driver_idx, driver in enumerate(df['Driver'].unique()):
-        driver_data = all_data[all_data['Driver'] == driver].sort_values('Lap')
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        
-        exclude_laps = set()
-        for pit_lap in pit_laps:
-            exclude_laps.add(pit_lap)
-            exclude_laps.add(pit_lap + 1)
-        
-        # Separar por stints
-        stints = []
-        current_stint = []
-        
-        for idx, row in driver_data.iterrows():
-            if row['Lap'] in pit_laps:
-                if current_stint:
-                    stints.append(pd.DataFrame(current_stint))
-                current_stint = []
-            elif row['Lap'] not in exclude_laps and row['TireWear'] > 0 and row['LapTime'] > 0:
-                current_stint.append(row)
-        
-        if current_stint:
-            stints.append(pd.DataFrame(current_stint))
-        
         driver_color = colors[driver_idx % len(colors)]
         
-        for stint_idx, stint_df in enumerate(stints):
+        for stint, stint_df in stints.get(driver, []):
             if len(stint_df) < 3:  # Precisa de pelo menos 3 pontos para mostrar degradação
                 continue
             
-            if driver not in [d for d in (selected_drivers or [])] and selected_drivers:
-                continue
-            
             # Calcular degradação baseada no melhor tempo do stint
             best_lap = stint_df['LapTime'].min()
-            stint_df = stint_df.copy()
-            stint_df['Delta'] = stint_df['LapTime'] - best_lap
-            stint_df['TireDeg'] = (1 - stint_df['TireWear']) * 100
+            delta = stint_df['LapTime'] - best_lap
             
             # Criar gradiente de cor baseado na degradação do pneu
             tire_deg_normalized = stint_df['TireDeg'] / stint_df['TireDeg'].max() if stint_df['TireDeg'].max() > 0 else [0] * len(stint_df)
             
             fig.add_trace(go.Scatter(
                 x=stint_df['TireDeg'],
-                y=stint_df['Delta'],
+                y=delta,
                 mode='markers',
-                name=f"{driver}" if stint_idx == 0 else f"{driver} - S{stint_idx + 1}",
+                name=f"{driver}" if stint == 1 else f"{driver} - S{stint}",
                 marker=dict(
                     color=tire_deg_normalized,
                     colorscale=[[0, driver_color], [1, driver_color]],
@@ -859,13 +645,15 @@ def update_pace_decay_chart(data, selected_drivers, selected_classes):
                     size=8,
                     line=dict(width=1, color='white')
                 ),
-                showlegend=(stint_idx == 0),  # Só mostrar na legenda o primeiro stint
+                showlegend=bool(stint == 1),  # Só mostrar na legenda o primeiro stint
                 legendgroup=driver,  # Agrupar todos os stints do mesmo piloto
                 hovertemplate=f'<b>{driver}</b><br>' +
                              'Stint: %{fullData.name}<br>' +
                              'Tire Deg: %{x:.1f}%<br>' +
                              'Delta: +%{y:.3f}s<extra></extra>'
             ))
+            _add_trend_line(fig, fits.get((driver, stint)), stint_df, f"{driver} - S{stint} trend",
+                            showlegend=False, legendgroup=driver, color=driver_color)
     
     fig.update_layout(
         title='Pace Decay - Degradation by Driver',
@@ -878,52 +666,64 @@ def update_pace_decay_chart(data, selected_drivers, selected_classes):
     return fig
 
 
+def _stint_fits(df, drivers):
+    """Splits the drivers' laps into stints and fits the degradation trend of all stints at once"""
+    laps = assign_stints(df[df['Driver'].isin(drivers)])
+    if laps.empty:
+        return {}, {}
+    stints = {}
+    for (driver, stint), stint_df in laps.groupby(['Driver', 'Stint'], sort=True, observed=True):
+        stints.setdefault(driver, []).append((stint, stint_df))
+    fits = {(fit['Driver'], fit['Stint']): fit for fit in fit_stint_degradation(laps).to_dict('records')}
+    return stints, fits
+
+
+def _add_trend_line(fig, fit, stint_df, name, color=None, **kwargs):
+    """Adiciona a reta de regressão do stint (delta vs desgaste) ao gráfico"""
+    if fit is None or pd.isna(fit['WearSlope']):
+        return
+    x = np.array([stint_df['TireDeg'].min(), stint_df['TireDeg'].max()])
+    fig.add_trace(go.Scatter(
+        x=x,
+        y=trend_line(fit, x),
+        mode='lines',
+        name=name,
+        line=dict(dash='dash', width=1, color=color),
+        hovertemplate=f'{name}<br>{fit["WearSlope"]:+.3f}s per % wear<br>{fit["LapSlope"]:+.3f}s per lap<extra></extra>',
+        **kwargs
+    ))
+
+
 def update_consistency_chart(data, selected_drivers, selected_classes):
-    df = pd.DataFrame(data)
-    
-    if df.empty:
+    if _is_empty(data):
         return go.Figure().add_annotation(text="No data available", showarrow=False)
     
-    all_data = pd.DataFrame(data)
-    exclude_set = set()
-    for driver in all_data['Driver'].unique():
-        driver_data = all_data[all_data['Driver'] == driver]
-        pit_laps = driver_data[driver_data['IsPit'] == True]['Lap'].values
-        for pit_lap in pit_laps:
-            exclude_set.add((driver, pit_lap))
-            exclude_set.add((driver, pit_lap + 1))
+    matrix = get_lap_matrix(data)
+    valid = (matrix.values('LapTime') > 0) & ~matrix.pit & ~matrix.after_pit()
+    rows = matrix.ordered(matrix.rows(selected_drivers, selected_classes), valid)
     
-    if selected_drivers:
-        df = df[df['Driver'].isin(selected_drivers)]
-    if selected_classes:
-        df = df[df['Class'].isin(selected_classes)]
-    
-    df = df[df['LapTime'] > 0].copy()
-    df = df[~df.apply(lambda row: (row['Driver'], row['Lap']) in exclude_set, axis=1)]
-    
-    if df.empty:
+    if len(rows) == 0:
         return go.Figure().add_annotation(text="No lap time data available", showarrow=False)
     
     fig = go.Figure()
     
-    for driver in df['Driver'].unique():
-        driver_data = df[df['Driver'] == driver]['LapTime']
+    for row in rows:
+        _, lap_times = matrix.series('LapTime', row, valid)
         
-        if len(driver_data) < 2:
+        if len(lap_times) < 2:
             continue
         
-        formatted_times = [f"{int(t//60):01d}:{int(t%60):02d}.{int((t%1)*1000):03d}" for t in driver_data]
-        
         fig.add_trace(go.Box(
-            y=driver_data,
-            name=driver,
+            y=lap_times,
+            name=matrix.drivers[row],
             boxmean='sd',
-            text=formatted_times,
+            text=_format_lap_time(lap_times),
             hovertemplate='%{text}<extra></extra>'
         ))
     
-    min_time = df['LapTime'].min()
-    max_time = df['LapTime'].max()
+    lap_times = matrix.values('LapTime')[rows][valid[rows]]
+    min_time = lap_times.min()
+    max_time = lap_times.max()
     tick_interval = 5
     tick_vals = list(range(int(min_time), int(max_time) + tick_interval, tick_interval))
     tick_texts = [f"{int(t//60):01d}:{int(t%60):02d}.{int((t%1)*1000):03d}" for t in tick_vals]
@@ -942,3 +742,120 @@ def update_consistency_chart(data, selected_drivers, selected_classes):
     )
     
     return fig
+
+
+# Multi-race comparison charts. They take the tables of business.comparison
+# instead of a lap table, so they are not update_* tab chart builders
+def build_race_laptime_comparison_chart(laps, driver=None):
+    """Distribution of green-flag lap times per race (laps from business.comparison.combine_races)"""
+    laps = _comparison_rows(laps, driver, 'LapTime')
+    if laps.empty:
+        return go.Figure().add_annotation(text="No lap time data available", showarrow=False)
+
+    lap_times = laps['LapTime'].to_numpy(dtype=float)
+    fig = go.Figure(go.Box(
+        x=laps['Race'].astype(str),
+        y=lap_times,
+        boxmean='sd',
+        text=_format_lap_time(lap_times),
+        hovertemplate='%{x}<br>%{text}<extra></extra>'
+    ))
+    tick_vals = list(range(int(lap_times.min()), int(lap_times.max()) + 5, 5))
+    fig.update_layout(
+        title=f'Lap Times by Race - {driver}' if driver else 'Lap Times by Race',
+        xaxis=dict(title='Race', categoryorder='array', categoryarray=list(laps['Race'].cat.categories)),
+        yaxis=dict(title='Lap Time', tickmode='array', tickvals=tick_vals,
+                   ticktext=list(_format_lap_time(np.array(tick_vals, dtype=float)))),
+        hovermode='closest',
+        height=500
+    )
+    return fig
+
+
+def build_race_fuel_comparison_chart(laps, driver=None):
+    """Distribution of fuel used per green-flag lap per race"""
+    laps = _comparison_rows(laps, driver, 'FuelUsed')
+    if laps.empty:
+        return go.Figure().add_annotation(text="No fuel data available", showarrow=False)
+
+    fig = go.Figure(go.Box(
+        x=laps['Race'].astype(str),
+        y=laps['FuelUsed'],
+        boxmean=True,
+        hovertemplate='%{x}<br>Fuel: %{y:.2f}L<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f'Fuel Used per Lap by Race - {driver}' if driver else 'Fuel Used per Lap by Race',
+        xaxis=dict(title='Race', categoryorder='array', categoryarray=list(laps['Race'].cat.categories)),
+        yaxis_title='Fuel Used (Liters)',
+        hovermode='closest',
+        height=500
+    )
+    return fig
+
+
+def build_race_degradation_comparison_chart(fits, driver=None):
+    """Lap time trend (s/lap) of every stint per race, with the laps-weighted race average"""
+    fits = _comparison_rows(fits, driver, 'LapSlope', positive=False)
+    if fits.empty:
+        return go.Figure().add_annotation(text="No stint degradation data available", showarrow=False)
+
+    races = fits['Race'].astype(str)
+    fig = go.Figure(go.Scatter(
+        x=races,
+        y=fits['LapSlope'],
+        mode='markers',
+        name='Stints',
+        marker=dict(size=(fits['Laps'] ** 0.5 * 3).clip(upper=30), opacity=0.5),
+        customdata=np.stack([fits['Driver'], fits['Stint'], fits['Laps']], axis=-1),
+        hovertemplate='%{customdata[0]} - S%{customdata[1]}<br>%{customdata[2]} laps<br>%{y:+.3f}s per lap<extra></extra>'
+    ))
+    weighted = fits.assign(Weighted=fits['LapSlope'] * fits['Laps']).groupby('Race', observed=True)[['Weighted', 'Laps']].sum()
+    fig.add_trace(go.Scatter(
+        x=weighted.index.astype(str),
+        y=weighted['Weighted'] / weighted['Laps'],
+        mode='lines+markers',
+        name='Average',
+        line=dict(dash='dash'),
+        hovertemplate='%{x}<br>Average: %{y:+.3f}s per lap<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f'Stint Degradation by Race - {driver}' if driver else 'Stint Degradation by Race',
+        xaxis=dict(title='Race', categoryorder='array', categoryarray=list(fits['Race'].cat.categories)),
+        yaxis_title='Lap Time Trend (s per lap)',
+        hovermode='closest',
+        height=500
+    )
+    return fig
+
+
+def _comparison_rows(table, driver, field, positive=True):
+    """Rows of a combined comparison table for one driver (or all drivers) where field is known"""
+    if table is None or table.empty:
+        return pd.DataFrame()
+    if driver:
+        table = table[table['Driver'] == driver]
+    keep = table[field].notna()
+    if positive:
+        keep &= table[field] > 0
+    return table[keep]
+
+
+def _is_empty(data):
+    if isinstance(data, pd.DataFrame):
+        return data.empty
+    return not data
+
+
+def _format_minutes(seconds, minutes_format):
+    """Formats seconds as m:ss.sss for a whole array at once"""
+    minutes = np.char.mod(minutes_format, (seconds // 60).astype(int))
+    return np.char.add(np.char.add(minutes, ':'), np.char.mod('%06.3f', seconds % 60))
+
+
+def _format_lap_time(seconds):
+    """Formats seconds as m:ss.mmm (milliseconds truncated) for a whole array at once"""
+    minutes = np.char.mod('%01d', (seconds // 60).astype(int))
+    whole = np.char.mod('%02d', (seconds % 60).astype(int))
+    millis = np.char.mod('%03d', ((seconds % 1) * 1000).astype(int))
+    return np.char.add(np.char.add(np.char.add(np.char.add(minutes, ':'), whole), '.'), millis)
@@ -0,0 +1,61 @@
+import pandas as pd
+
+# Defaults for what counts as a battle
+BATTLE_THRESHOLD = 1.0
+BATTLE_MIN_LAPS = 3
+
+BATTLE_COLUMNS = ['Driver', 'Rival', 'Class', 'StartLap', 'EndLap', 'Laps', 'MinInterval', 'MeanInterval']
+
+
+def detect_battles(df, threshold=BATTLE_THRESHOLD, min_laps=BATTLE_MIN_LAPS, by_class=False):
+    """Finds pairs of cars running within threshold seconds of each other for at least min_laps consecutive laps.
+
+    For every lap the cars are ordered by ET and each one is paired with the car
+    directly ahead (overall or in class). Consecutive close laps of the same pair,
+    in either order, form one battle. Returns one row per battle, longest first.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BATTLE_COLUMNS)
+    
+    laps = df[(df['Lap'] > 0) & (df['ET'] > 0)]
+    keys = ['Lap', 'Class'] if by_class else ['Lap']
+    ordered = laps.sort_values(keys + ['ET'], kind='mergesort')
+    groups = ordered.groupby(keys, sort=False, observed=True)
+    
+    pairs = pd.DataFrame({
+        'Lap': ordered['Lap'].to_numpy(),
+        'Class': ordered['Class'].to_numpy(),
+        'Behind': ordered['Driver'].to_numpy(),
+        'Ahead': groups['Driver'].shift().to_numpy(),
+        'Interval': groups['ET'].diff().to_numpy()
+    })
+    pairs = pairs[pairs['Ahead'].notna() & (pairs['Interval'] <= threshold)]
+    
+    if pairs.empty:
+        return pd.DataFrame(columns=BATTLE_COLUMNS)
+    
+    # Same two cars regardless of who is ahead, so position swaps keep the battle going
+    swap = pairs['Behind'] > pairs['Ahead']
+    pairs['Driver'] = pairs['Behind'].where(~swap, pairs['Ahead'])
+    pairs['Rival'] = pairs['Ahead'].where(~swap, pairs['Behind'])
+    pairs = pairs.sort_values(['Driver', 'Rival', 'Lap'], kind='mergesort')
+    
+    # A new run starts whenever the pair changes or a lap is skipped
+    previous = pairs.shift()
+    new_run = (
+        (pairs['Driver'] != previous['Driver']) |
+        (pairs['Rival'] != previous['Rival']) |
+        (pairs['Lap'] != previous['Lap'] + 1)
+    )
+    runs = pairs.groupby(new_run.cumsum()).agg(
+        Driver=('Driver', 'first'),
+        Rival=('Rival', 'first'),
+        Class=('Class', 'first'),
+        StartLap=('Lap', 'min'),
+        EndLap=('Lap', 'max'),
+        Laps=('Lap', 'size'),
+        MinInterval=('Interval', 'min'),
+        MeanInterval=('Interval', 'mean')
+    )
+    battles = runs[runs['Laps'] >= min_laps]
+    return battles.sort_values(['Laps', 'MinInterval'], ascending=[False, True]).reset_index(drop=True)
@@ -0,0 +1,111 @@
+import os
+import re
+import pandas as pd
+from data.schema import map_values
+
+# Points for 1st, 2nd, ... in class; finishers beyond the table score 0.
+# CHAMPIONSHIP_POINTS overrides it as a comma separated list.
+DEFAULT_POINTS = (25, 18, 15, 12, 10, 8, 6, 4, 2, 1)
+
+RESULT_COLUMNS = ['Driver', 'Class', 'Car', 'Position', 'ClassPosition', 'Laps', 'LapsLed', 'BestLap',
+                  'Incidents', 'Penalties']
+# Season totals are sums (BestFinish is a min), so a new race is added to them without the others
+TOTAL_COLUMNS = ['Races', 'Points', 'Wins', 'Podiums', 'FinishSum', 'BestFinish', 'Laps', 'LapsLed',
+                 'Incidents', 'Penalties']
+STANDINGS_COLUMNS = ['Rank', 'Driver', 'Class', 'Races', 'Points', 'Wins', 'Podiums', 'AvgFinish', 'BestFinish',
+                     'Laps', 'LapsLed', 'Incidents', 'Penalties']
+
+
+def points_table(spec=None):
+    """Returns the points table from a comma separated spec (default: CHAMPIONSHIP_POINTS or DEFAULT_POINTS)"""
+    spec = spec if spec is not None else os.environ.get('CHAMPIONSHIP_POINTS', '')
+    if not spec.strip():
+        return DEFAULT_POINTS
+    return tuple(float(value) if '.' in value else int(value) for value in (v.strip() for v in spec.split(',')) if value)
+
+
+def race_results(df, incidents=None):
+    """Returns the final classification of a race, one row per driver (RESULT_COLUMNS).
+
+    Drivers are ordered by laps completed, then by elapsed time at their last
+    lap, as in the standings table. Incidents and penalties are counted per
+    driver from the messages that start with the driver's name.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    last = df.sort_values(['Driver', 'Lap'], kind='mergesort').groupby('Driver', sort=False, observed=True).tail(1)
+    results = last.sort_values(['Lap', 'ET'], ascending=[False, True], kind='mergesort').reset_index(drop=True)
+    results['Position'] = range(1, len(results) + 1)
+    results['ClassPosition'] = results.groupby('Class', observed=True).cumcount() + 1
+    results['Laps'] = results['Lap']
+
+    laps = df[df['Lap'] > 0]
+    led = laps[laps['Position'] == 1].groupby('Driver', observed=True).size()
+    best = laps[laps['LapTime'] > 0].groupby('Driver', observed=True)['LapTime'].min()
+    results['LapsLed'] = map_values(results['Driver'], led).fillna(0).astype(int)
+    results['BestLap'] = map_values(results['Driver'], best)
+
+    incidents = incidents or {}
+    for column, kind in (('Incidents', 'incident'), ('Penalties', 'penalty')):
+        counts = _count_by_driver(incidents.get(kind, []), results['Driver'])
+        results[column] = map_values(results['Driver'], counts).fillna(0).astype(int)
+    # One row per driver: plain text, so results of different races concatenate
+    return results[RESULT_COLUMNS].astype({'Driver': object, 'Class': object, 'Car': object})
+
+
+def _count_by_driver(messages, drivers):
+    """Counts the messages that start with each driver's name (longest name wins)"""
+    if not messages or drivers.empty:
+        return {}
+    names = sorted(drivers.unique(), key=len, reverse=True)
+    pattern = '^(' + '|'.join(map(re.escape, names)) + ')'
+    found = pd.Series([message.get('message') or '' for message in messages]).str.extract(pattern, expand=False)
+    return found.value_counts().to_dict()
+
+
+def score_results(results, points=None):
+    """Adds the Points of each class finishing position to race results"""
+    points = points_table() if points is None else tuple(points)
+    table = pd.Series(points, index=range(1, len(points) + 1), dtype=float)
+    return results.assign(Points=results['ClassPosition'].map(table).fillna(0))
+
+
+def accumulate(totals, results, points=None):
+    """Adds the results of one or more races to season totals (None for an empty season).
+
+    Only the new results are scored and merged into one row per driver, so
+    adding a race does not revisit the races already counted. Drivers are
+    counted per class.
+    """
+    scored = score_results(results, points)
+    position = scored['ClassPosition']
+    race_totals = pd.DataFrame({
+        'Driver': scored['Driver'], 'Class': scored['Class'], 'Races': 1, 'Points': scored['Points'],
+        'Wins': (position == 1).astype(int), 'Podiums': (position <= 3).astype(int), 'FinishSum': position,
+        'BestFinish': position, 'Laps': scored['Laps'], 'LapsLed': scored['LapsLed'],
+        'Incidents': scored['Incidents'], 'Penalties': scored['Penalties']
+    })
+    if totals is not None and not totals.empty:
+        race_totals = pd.concat([totals.reset_index(), race_totals], ignore_index=True)
+    if race_totals.empty:
+        return pd.DataFrame(columns=TOTAL_COLUMNS, index=pd.MultiIndex.from_arrays([[], []], names=['Class', 'Driver']))
+    aggregations = {column: 'sum' for column in TOTAL_COLUMNS}
+    aggregations['BestFinish'] = 'min'
+    return race_totals.groupby(['Class', 'Driver'], observed=True).agg(aggregations)[TOTAL_COLUMNS]
+
+
+def season_standings(totals):
+    """Returns the season standings per class from accumulated totals (STANDINGS_COLUMNS).
+
+    Drivers are ranked within their class by points, then wins, podiums and
+    average finishing position.
+    """
+    if totals is None or totals.empty:
+        return pd.DataFrame(columns=STANDINGS_COLUMNS)
+    standings = totals.reset_index()
+    standings['AvgFinish'] = standings['FinishSum'] / standings['Races']
+    standings = standings.sort_values(['Class', 'Points', 'Wins', 'Podiums', 'AvgFinish', 'Driver'],
+                                      ascending=[True, False, False, False, True, True], kind='mergesort')
+    standings['Rank'] = standings.groupby('Class', observed=True).cumcount() + 1
+    return standings[STANDINGS_COLUMNS].reset_index(drop=True)
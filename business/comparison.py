@@ -0,0 +1,48 @@
+import pandas as pd
+from business.degradation import assign_stints, fit_stint_degradation
+
+LAP_COLUMNS = ['Race', 'Driver', 'Class', 'Lap', 'LapTime', 'FuelUsed']
+
+
+def race_tables(df):
+    """Returns the per-race tables compared across races: (laps, stint fits).
+
+    laps holds the green-flag laps (no pit laps or out-laps) with a lap
+    time; stint fits are fit_stint_degradation of the race. Both are computed
+    once per race and concatenated by combine_races.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=LAP_COLUMNS[1:]), fit_stint_degradation(None)
+
+    df = df.sort_values(['Driver', 'Lap'], kind='mergesort')
+    pit = df['IsPit'].astype(bool)
+    previous_pit = pit.groupby(df['Driver'], observed=True).shift(fill_value=False).astype(bool)
+    valid = ~pit & ~previous_pit & (df['Lap'] > 0) & (df['LapTime'] > 0)
+    laps = df.loc[valid, LAP_COLUMNS[1:]].reset_index(drop=True)
+    return laps, fit_stint_degradation(assign_stints(df))
+
+
+def combine_races(races):
+    """Concatenates the race_tables of several races into (laps, fits) with a Race column.
+
+    races is a list of (label, (laps, fits)). Race is categorical in the
+    given order, so grouping by it keeps that order. Repeated labels get a
+    numbered suffix.
+    """
+    labels, seen = [], {}
+    for label, _ in races:
+        seen[label] = seen.get(label, 0) + 1
+        labels.append(label if seen[label] == 1 else f'{label} ({seen[label]})')
+
+    def concat(index, columns):
+        frames = [tables[index].assign(Race=label) for label, (_, tables) in zip(labels, races)]
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        combined['Race'] = pd.Categorical(combined['Race'], categories=labels)
+        return combined[['Race'] + [column for column in combined.columns if column != 'Race']]
+
+    return concat(0, LAP_COLUMNS), concat(1, ['Race'] + list(fit_stint_degradation(None).columns))
+
+
+def race_comparison_drivers(laps):
+    """Returns the drivers present in the compared races, sorted"""
+    return sorted(laps['Driver'].unique()) if not laps.empty else []
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# Minimum number of laps in a stint to fit a degradation trend
+MIN_FIT_LAPS = 3
+
+STINT_FIT_COLUMNS = [
+    'Driver', 'Stint', 'Class', 'Compound', 'StartLap', 'EndLap', 'Laps', 'BestLap',
+    'WearSlope', 'WearIntercept', 'LapSlope', 'LapIntercept'
+]
+RATE_COLUMNS = ['Class', 'Compound', 'Stints', 'Laps', 'LapSlope', 'WearSlope']
+
+
+def assign_stints(df):
+    """Returns the laps usable for degradation analysis, labelled by stint.
+
+    Pit laps split stints and are dropped together with the lap that follows
+    them (out-lap), as are laps without tire wear or lap time. Adds Stint
+    (1-based per driver), StintLap (laps since the first lap of the stint),
+    TireDeg (tire wear used, %) and Compound (front compound).
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    df = df.sort_values(['Driver', 'Lap'], kind='mergesort')
+    pit = df['IsPit'].astype(bool)
+    by_driver = df['Driver']
+    previous_pit = pit.groupby(by_driver, observed=True).shift(fill_value=False).astype(bool)
+    previous_lap = df['Lap'].groupby(by_driver, observed=True).shift()
+    after_pit = previous_pit & (df['Lap'] == previous_lap + 1)
+    stint_id = pit.groupby(by_driver, observed=True).cumsum()
+
+    valid = ~pit & ~after_pit & (df['TireWear'] > 0) & (df['LapTime'] > 0)
+    laps = df[valid].copy()
+    if laps.empty:
+        return laps
+
+    # Stints are numbered among the ones that kept at least one valid lap
+    laps['Stint'] = stint_id[valid].groupby(laps['Driver'], observed=True).rank(method='dense').astype(int)
+    laps['StintLap'] = laps['Lap'] - laps.groupby(['Driver', 'Stint'], observed=True)['Lap'].transform('min')
+    laps['TireDeg'] = (1 - laps['TireWear']) * 100
+    compound = laps['FCompound'].astype(str).str.split(',').str[1].str.strip() if 'FCompound' in laps.columns else None
+    laps['Compound'] = compound.fillna('Unknown').replace('', 'Unknown') if compound is not None else 'Unknown'
+    return laps
+
+
+def fit_stint_degradation(laps, min_laps=MIN_FIT_LAPS):
+    """Fits lap time vs tire wear and lap time vs stint lap for every (driver, stint) at once.
+
+    Uses the closed-form least squares solution from grouped sums, so the
+    cost is a single groupby regardless of the number of stints. Slopes are
+    in seconds per % of tire wear and seconds per lap.
+    """
+    if laps is None or laps.empty:
+        return pd.DataFrame(columns=STINT_FIT_COLUMNS)
+
+    x_wear = laps['TireDeg'].to_numpy(dtype=float)
+    x_lap = laps['StintLap'].to_numpy(dtype=float)
+    y = laps['LapTime'].to_numpy(dtype=float)
+    terms = pd.DataFrame({
+        'Driver': laps['Driver'].to_numpy(),
+        'Stint': laps['Stint'].to_numpy(),
+        'n': 1.0,
+        'w': x_wear, 'ww': x_wear * x_wear, 'wy': x_wear * y,
+        'l': x_lap, 'll': x_lap * x_lap, 'ly': x_lap * y,
+        'y': y
+    })
+    sums = terms.groupby(['Driver', 'Stint'], sort=False).sum()
+
+    fits = laps.groupby(['Driver', 'Stint'], sort=False, observed=True).agg(
+        Class=('Class', 'first'),
+        Compound=('Compound', 'first'),
+        StartLap=('Lap', 'min'),
+        EndLap=('Lap', 'max'),
+        Laps=('Lap', 'size'),
+        BestLap=('LapTime', 'min')
+    )
+    n = sums['n']
+    for name, x, xx, xy in [('Wear', 'w', 'ww', 'wy'), ('Lap', 'l', 'll', 'ly')]:
+        denominator = n * sums[xx] - sums[x] ** 2
+        slope = (n * sums[xy] - sums[x] * sums['y']) / denominator.where(denominator.abs() > 1e-12)
+        fits[f'{name}Slope'] = slope
+        fits[f'{name}Intercept'] = (sums['y'] - slope * sums[x]) / n
+
+    fits = fits[fits['Laps'] >= min_laps].reset_index()
+    return fits[STINT_FIT_COLUMNS]
+
+
+def degradation_rates(fits):
+    """Aggregates stint fits into a degradation rate per class and compound (weighted by laps)"""
+    fits = fits.dropna(subset=['LapSlope', 'WearSlope']) if fits is not None and not fits.empty else None
+    if fits is None or fits.empty:
+        return pd.DataFrame(columns=RATE_COLUMNS)
+
+    weighted = fits.assign(
+        LapSlope=fits['LapSlope'] * fits['Laps'],
+        WearSlope=fits['WearSlope'] * fits['Laps']
+    )
+    rates = weighted.groupby(['Class', 'Compound'], observed=True).agg(
+        Stints=('Stint', 'size'),
+        Laps=('Laps', 'sum'),
+        LapSlope=('LapSlope', 'sum'),
+        WearSlope=('WearSlope', 'sum')
+    )
+    rates['LapSlope'] /= rates['Laps']
+    rates['WearSlope'] /= rates['Laps']
+    return rates.reset_index()[RATE_COLUMNS]
+
+
+def trend_line(fit, x, field='Wear'):
+    """Returns the fitted lap time delta to the stint's best lap at x"""
+    x = np.asarray(x, dtype=float)
+    return fit[f'{field}Intercept'] + fit[f'{field}Slope'] * x - fit['BestLap']
@@ -0,0 +1,112 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+# Numeric lap fields stored as dense drivers x laps arrays
+MATRIX_FIELDS = [
+    'Position', 'ET', 'LapTime', 'FuelUsed', 'FuelLevel', 'VE', 'VELevel', 'TireWear',
+    'GapToLeader', 'GapToClassLeader', 'IntervalAhead', 'ClassIntervalAhead'
+]
+
+# Per-driver attributes used to translate the global filters into driver rows
+DRIVER_ATTRIBUTES = ['Class', 'Car', 'VehName', 'CarType']
+
+_matrices = {}
+
+
+class LapMatrix:
+    """Dense drivers x laps view of the lap table.
+
+    Rows follow the order in which drivers appear in the lap table and
+    columns cover every lap number from the first to the last one, so lap
+    ``n`` of a driver is ``values(field)[row, n - first_lap]``. Missing laps
+    are NaN.
+    """
+
+    def __init__(self, df):
+        # Plain values in table order (unique() of a categorical is a Categorical)
+        self.drivers = np.asarray(df['Driver'].unique(), dtype=object)
+        self.driver_index = {driver: i for i, driver in enumerate(self.drivers)}
+
+        laps = df['Lap'].to_numpy(dtype=int)
+        self.first_lap = int(laps.min())
+        self.laps = np.arange(self.first_lap, int(laps.max()) + 1)
+
+        rows = pd.Categorical(df['Driver'], categories=self.drivers).codes
+        cols = laps - self.first_lap
+        shape = (len(self.drivers), len(self.laps))
+
+        self._values = {}
+        for field in MATRIX_FIELDS:
+            if field in df.columns:
+                values = np.full(shape, np.nan)
+                values[rows, cols] = df[field].to_numpy(dtype=float)
+                self._values[field] = values
+
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[rows, cols] = True
+        # Position of each lap in the lap table, used to keep the table's driver order
+        self.order = np.full(shape, np.inf)
+        self.order[rows, cols] = np.arange(len(df))
+        self.pit = np.zeros(shape, dtype=bool)
+        if 'IsPit' in df.columns:
+            self.pit[rows, cols] = df['IsPit'].to_numpy(dtype=bool)
+
+        # First value of each attribute per driver, aligned with the rows
+        first_rows = df.drop_duplicates('Driver').set_index('Driver')
+        self.attributes = {
+            column: first_rows[column].reindex(self.drivers).to_numpy()
+            for column in DRIVER_ATTRIBUTES if column in df.columns
+        }
+
+    def values(self, field):
+        """Returns the full drivers x laps array of a field"""
+        if field not in self._values:
+            raise KeyError(field)
+        return self._values[field]
+
+    def rows(self, selected_drivers=None, selected_classes=None, selected_cars=None,
+             selected_veh=None, selected_cartype=None):
+        """Returns the row indexes of the drivers that pass the filters, in table order"""
+        keep = np.ones(len(self.drivers), dtype=bool)
+        if selected_drivers:
+            keep &= np.isin(self.drivers, list(selected_drivers))
+        for column, selected in zip(DRIVER_ATTRIBUTES, [selected_classes, selected_cars, selected_veh, selected_cartype]):
+            if selected and column in self.attributes:
+                keep &= np.isin(self.attributes[column], list(selected))
+        return np.flatnonzero(keep)
+
+    def ordered(self, rows, mask):
+        """Returns the rows that have at least one lap in mask, ordered by their first such lap in the table"""
+        rows = np.asarray(rows, dtype=int)
+        first = np.where(mask[rows], self.order[rows], np.inf).min(axis=1)
+        keep = np.isfinite(first)
+        return rows[keep][np.argsort(first[keep], kind='stable')]
+
+    def after_pit(self):
+        """Returns a mask of laps that follow a pit lap (lap n + 1 of each pit stop)"""
+        mask = np.zeros_like(self.pit)
+        mask[:, 1:] = self.pit[:, :-1]
+        return mask
+
+    def series(self, field, row, mask=None):
+        """Returns (laps, values) of one driver row where the lap exists and mask is set"""
+        keep = self.present[row]
+        if mask is not None:
+            keep = keep & mask[row]
+        return self.laps[keep], self._values[field][row, keep]
+
+
+def get_lap_matrix(data):
+    """Returns the lap matrix of a dataset, building it only once per DataFrame"""
+    if not isinstance(data, pd.DataFrame):
+        return LapMatrix(pd.DataFrame(data))
+
+    entry = _matrices.get(id(data))
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+
+    matrix = LapMatrix(data)
+    _matrices[id(data)] = (weakref.ref(data), matrix)
+    weakref.finalize(data, _matrices.pop, id(data), None)
+    return matrix
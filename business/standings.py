@@ -0,0 +1,65 @@
+import pandas as pd
+from data.schema import map_values
+
+
+def compute_standings(df, selected_lap):
+    """Returns the running order at selected_lap, one row per driver.
+
+    Each row is the driver's latest lap up to selected_lap plus
+    OriginalPosition (order by laps completed, then elapsed time), Up
+    (positions gained since the start), BestLap, Pits, Led (laps led) and Gap
+    (text, to the leader). Returns an empty DataFrame when there is no data.
+    """
+    if df is None or df.empty or selected_lap is None:
+        return pd.DataFrame()
+
+    # Latest lap of each driver up to selected_lap (drivers in order of appearance)
+    upto = df[df['Lap'] <= selected_lap]
+    if upto.empty:
+        return pd.DataFrame()
+    lap_df = upto.loc[upto.groupby('Driver', sort=False, observed=True)['Lap'].idxmax()]
+
+    # Sort by laps completed (descending) then by ET (ascending); ties (the
+    # start, where every ET is 0) keep the position reported by the game
+    lap_df = lap_df.sort_values(['Lap', 'ET', 'Position'], ascending=[False, True, True], kind='mergesort')
+
+    # Assign positions based on correct order
+    lap_df['OriginalPosition'] = range(1, len(lap_df) + 1)
+
+    # Calculate positions gained/lost using the corrected position
+    initial_pos = df[df['Lap'] == 0].set_index('Driver')['Position']
+    initial_pos = initial_pos[~initial_pos.index.duplicated(keep='last')]
+    lap_df['Up'] = (map_values(lap_df['Driver'], initial_pos).fillna(lap_df['OriginalPosition']) - lap_df['OriginalPosition']).astype(int)
+
+    # Calculate best lap per driver up to selected lap
+    best_laps = upto[upto['LapTime'] > 0].groupby('Driver', observed=True)['LapTime'].min()
+    lap_df['BestLap'] = map_values(lap_df['Driver'], best_laps)
+
+    # Count pit stops up to selected lap
+    pit_counts = upto[upto['IsPit'] == True].groupby('Driver', observed=True).size()
+    lap_df['Pits'] = map_values(lap_df['Driver'], pit_counts).fillna(0).astype(int)
+
+    # Count laps led up to selected lap
+    laps_led = upto[(upto['Position'] == 1) & (upto['Lap'] > 0)].groupby('Driver', observed=True).size()
+    lap_df['Led'] = map_values(lap_df['Driver'], laps_led).fillna(0).astype(int)
+
+    # Calculate gap to leader
+    leader_lap = lap_df.iloc[0]['Lap']
+    leader_et = lap_df.iloc[0]['ET']
+    # Only use lap format on the last lap of the race
+    last_lap = selected_lap == df['Lap'].max()
+
+    def calculate_gap(row):
+        if row.name == lap_df.index[0]:  # First row is leader
+            return 'Leader'
+        laps_behind = leader_lap - row['Lap']
+        time_gap = row['ET'] - leader_et
+        minutes = int(abs(time_gap) // 60)
+        seconds = abs(time_gap) % 60
+        if last_lap and laps_behind >= 1:
+            return f"+{laps_behind}L {minutes}:{seconds:06.3f}"
+        # Format as mm:ss.sss for all other laps
+        return f"+{minutes}:{seconds:06.3f}"
+
+    lap_df['Gap'] = lap_df.apply(calculate_gap, axis=1)
+    return lap_df
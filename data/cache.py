@@ -0,0 +1,178 @@
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Server-side dataset cache.
+# Parsed races are kept here keyed by a content hash so callbacks can work
+# with a small key instead of shipping the whole lap table back and forth.
+# Entries are also written to a local directory so every gunicorn worker
+# can resolve a key produced by another worker. Entries are pickles, so the
+# directory must be private: it is created with mode 0700 and is used only
+# when it is a real directory owned by the current user; otherwise (or with
+# DATASET_CACHE_DISK=False) the cache is kept in memory only. Pinned
+# datasets (the race the page opens on) are never evicted from either.
+CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', os.path.join(
+    tempfile.gettempdir(), f"rf2-lmu-charts-{os.getuid() if hasattr(os, 'getuid') else 'user'}"))
+DISK_CACHE = os.environ.get('DATASET_CACHE_DISK', 'True') == 'True'
+MEMORY_ENTRIES = int(os.environ.get('DATASET_CACHE_SIZE', '8'))
+DISK_ENTRIES = int(os.environ.get('DATASET_CACHE_DISK_SIZE', '64'))
+
+_memory = OrderedDict()
+_pinned = {}
+_lock = threading.Lock()
+
+
+def dataset_key(content):
+    """Returns the content hash used as dataset key"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def put_dataset(key, df, race_info, incidents, pin=False):
+    """Stores a parsed dataset in memory and in the shared cache directory.
+
+    A pinned dataset is kept outside the LRU and its file is never pruned.
+    """
+    entry = (df, race_info, incidents)
+    if pin:
+        with _lock:
+            _pinned[key] = entry
+            _memory.pop(key, None)
+    else:
+        _remember(key, entry)
+    if not disk_enabled():
+        return key
+    try:
+        path = _path(key)
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            _prune_disk()
+    except OSError:
+        # Disk cache is best effort, the in-memory entry is still valid
+        pass
+    return key
+
+
+def get_dataset(key):
+    """Returns (df, race_info, incidents) for a key or None if unknown"""
+    if not key:
+        return None
+    with _lock:
+        if key in _pinned:
+            return _pinned[key]
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+            return entry
+    if not disk_enabled():
+        return None
+    try:
+        with open(_path(key), 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    _remember(key, entry)
+    return entry
+
+
+def has_dataset(key):
+    """True when a key is in memory or on disk, without loading it"""
+    if not key:
+        return False
+    with _lock:
+        if key in _memory or key in _pinned:
+            return True
+    return disk_enabled() and os.path.exists(_path(key))
+
+
+def drop_dataset(key):
+    """Removes a dataset from memory and from the cache directory (a pinned dataset is kept)"""
+    with _lock:
+        if key in _pinned:
+            return
+        _memory.pop(key, None)
+    if disk_enabled():
+        try:
+            os.remove(_path(key))
+        except OSError:
+            pass
+
+
+def get_dataframe(key):
+    """Returns only the lap DataFrame for a key or None if unknown"""
+    entry = get_dataset(key)
+    return entry[0] if entry is not None else None
+
+
+def disk_enabled():
+    """True when entries are shared through CACHE_DIR, False for a memory-only cache"""
+    return DISK_CACHE and private_dir(CACHE_DIR)
+
+
+def private_dir(path):
+    """Creates path with mode 0700 if needed; True when it is a directory only the current user can use.
+
+    A symlink, a directory owned by another user or one that cannot be
+    created is refused. A directory of the current user that is open to
+    others is restricted to 0700.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if hasattr(os, 'getuid'):
+        if info.st_uid != os.getuid():
+            return False
+        if info.st_mode & 0o077:
+            try:
+                os.chmod(path, 0o700)
+            except OSError:
+                return False
+    return True
+
+
+def clear_memory():
+    """Drops the in-memory entries (disk and pinned entries are kept)"""
+    with _lock:
+        _memory.clear()
+
+
+def _remember(key, entry):
+    with _lock:
+        if key in _pinned:
+            return
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _path(key):
+    # Keys are hex digests, never user supplied paths
+    return os.path.join(CACHE_DIR, f"{''.join(c for c in key if c.isalnum())}.pkl")
+
+
+def _prune_disk():
+    with _lock:
+        pinned = {_path(key) for key in _pinned}
+    files = [path for path in (os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR) if name.endswith('.pkl'))
+             if path not in pinned]
+    if len(files) <= DISK_ENTRIES:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - DISK_ENTRIES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
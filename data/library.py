@@ -0,0 +1,500 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+import pandas as pd
+from data.cache import dataset_key
+from data.schema import apply_schema
+
+# Local results library.
+# With RESULTS_LIBRARY_DIR set, result files under that directory are parsed
+# once into an SQLite database (laps, stints, incidents and race metadata)
+# and the UI loads a race with an indexed query instead of an upload and an
+# XML parse. The database lives in the library directory unless
+# RESULTS_LIBRARY_DB points elsewhere. Files are re-ingested only when their
+# size or mtime changes, and a moved file keeps its race (matched by hash).
+# A second file with the content of a race that is still in place is
+# reported as a duplicate and not stored.
+LIBRARY_DIR = os.environ.get('RESULTS_LIBRARY_DIR', '')
+LIBRARY_DB = os.environ.get('RESULTS_LIBRARY_DB', '') or (os.path.join(LIBRARY_DIR, 'library.sqlite3') if LIBRARY_DIR else '')
+RESULT_EXTENSIONS = ('.xml', '.xmlx')
+
+# Bump when the stored layout or the parser output changes; databases with a
+# migration below are upgraded in place, older ones are rebuilt
+SCHEMA_VERSION = 2
+
+# Lap columns of the parser output and their SQLite types
+LAP_COLUMNS = {
+    'Driver': 'TEXT', 'Lap': 'INTEGER', 'Position': 'INTEGER', 'ET': 'REAL', 'LapTime': 'REAL',
+    'IsPit': 'INTEGER', 'FuelUsed': 'REAL', 'FuelLevel': 'REAL', 'VE': 'REAL', 'VELevel': 'REAL',
+    'TireWear': 'REAL', 'Class': 'TEXT', 'Car': 'TEXT', 'VehName': 'TEXT', 'CarType': 'TEXT',
+    'FCompound': 'TEXT', 'RCompound': 'TEXT', 'Aids': 'TEXT', 'TWFL': 'REAL', 'TWFR': 'REAL',
+    'TWRL': 'REAL', 'TWRR': 'REAL', 'S1': 'REAL', 'S2': 'REAL', 'S3': 'REAL', 'LeaderET': 'REAL',
+    'GapToLeader': 'REAL', 'ClassLeaderET': 'REAL', 'GapToClassLeader': 'REAL',
+    'IntervalAhead': 'REAL', 'ClassIntervalAhead': 'REAL'
+}
+_DTYPES = {'INTEGER': 'int64', 'REAL': 'float64', 'TEXT': 'object'}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS races (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    sha1 TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    track TEXT,
+    course TEXT,
+    date TEXT,
+    drivers INTEGER NOT NULL,
+    laps INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    race_info TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS races_track ON races(track);
+CREATE INDEX IF NOT EXISTS races_date ON races(date);
+
+CREATE TABLE IF NOT EXISTS entries (
+    race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    driver TEXT NOT NULL,
+    class TEXT,
+    car TEXT,
+    PRIMARY KEY (race_id, driver)
+);
+CREATE INDEX IF NOT EXISTS entries_driver ON entries(driver);
+CREATE INDEX IF NOT EXISTS entries_class ON entries(class);
+
+CREATE TABLE IF NOT EXISTS laps (
+    race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    {', '.join(f'"{name}" {kind}' for name, kind in LAP_COLUMNS.items())}
+);
+CREATE INDEX IF NOT EXISTS laps_race ON laps(race_id);
+
+CREATE TABLE IF NOT EXISTS stints (
+    race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    driver TEXT NOT NULL,
+    stint INTEGER NOT NULL,
+    class TEXT,
+    compound TEXT,
+    start_lap INTEGER NOT NULL,
+    end_lap INTEGER NOT NULL,
+    laps INTEGER NOT NULL,
+    best_lap REAL,
+    PRIMARY KEY (race_id, driver, stint)
+);
+
+CREATE TABLE IF NOT EXISTS incidents (
+    race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    et TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS incidents_race ON incidents(race_id);
+
+CREATE TABLE IF NOT EXISTS results (
+    race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    driver TEXT NOT NULL,
+    class TEXT,
+    car TEXT,
+    position INTEGER NOT NULL,
+    class_position INTEGER NOT NULL,
+    laps INTEGER NOT NULL,
+    laps_led INTEGER NOT NULL,
+    best_lap REAL,
+    incidents INTEGER NOT NULL,
+    penalties INTEGER NOT NULL,
+    PRIMARY KEY (race_id, driver)
+);
+CREATE INDEX IF NOT EXISTS results_driver ON results(driver);
+"""
+INCIDENT_KINDS = ('chat', 'incident', 'penalty')
+
+
+def enabled():
+    """True when a library directory is configured"""
+    return bool(LIBRARY_DIR)
+
+
+def connect(db_path=None):
+    """Opens the library database, creating (or rebuilding an outdated) schema"""
+    conn = sqlite3.connect(db_path or LIBRARY_DB, timeout=30)
+    conn.execute('PRAGMA foreign_keys = ON')
+    # Readers (the UI) are not blocked while files are being ingested
+    conn.execute('PRAGMA journal_mode = WAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version in _MIGRATIONS:
+        _MIGRATIONS[version](conn)
+    elif version != SCHEMA_VERSION:
+        with conn:
+            for table in ('results', 'incidents', 'stints', 'laps', 'entries', 'races'):
+                conn.execute(f'DROP TABLE IF EXISTS {table}')
+    if version != SCHEMA_VERSION:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+
+def _add_results(conn):
+    """Version 1 to 2: per-race results, computed from the stored laps (the files are not re-read)"""
+    with conn:
+        conn.executescript(SCHEMA)
+        for (race_id,) in conn.execute('SELECT id FROM races').fetchall():
+            _, df, _, incidents = load_race(conn, race_id)
+            _store_results(conn, race_id, df, incidents)
+
+
+# Upgrades from a schema version to SCHEMA_VERSION without re-ingesting
+_MIGRATIONS = {1: _add_results}
+
+
+def result_files(directory):
+    """Returns the result files under a directory, sorted"""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        found.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(RESULT_EXTENSIONS))
+    return found
+
+
+def is_current(conn, path, stat=None):
+    """True when path is in the library with the same size and mtime"""
+    stat = stat or os.stat(path)
+    row = conn.execute('SELECT size, mtime FROM races WHERE path = ?', (os.path.abspath(path),)).fetchone()
+    return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+
+def ingest_file(conn, path):
+    """Parses a result file into the library; returns the race id, or None when it was already current or a duplicate"""
+    if is_current(conn, path):
+        return None
+    result = _parse_file(path, _known_hashes(conn))
+    if _duplicate_of(conn, path, result[0]) is not None:
+        return None
+    return _store_parsed(conn, path, *result)
+
+
+def _parse_file(path, known=frozenset()):
+    """Hashes a result file and parses it unless its content is in known.
+
+    Returns (sha1, stat, (df, race_info, incidents) or None). Runs in the
+    ingestion worker processes, so it does not touch the database.
+    """
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        content = f.read()
+    sha1 = dataset_key(content)
+    if sha1 in known:
+        return sha1, stat, None
+    from data.parsers import parse_xml_scores
+    return sha1, stat, parse_xml_scores(content)
+
+
+def _store_parsed(conn, path, sha1, stat, parsed):
+    """Stores a _parse_file result; returns the race id, or None when a known race was moved to path"""
+    if parsed is None:
+        if _adopt_moved(conn, path, sha1, stat):
+            return None
+        # The race with this content was removed meanwhile
+        parsed = _parse_file(path)[2]
+    return store_race(conn, path, sha1, stat, *parsed)
+
+
+def _known_hashes(conn):
+    return frozenset(sha1 for (sha1,) in conn.execute('SELECT sha1 FROM races'))
+
+
+def store_race(conn, path, sha1, stat, df, race_info, incidents):
+    """Writes a parsed race, replacing a previous version of the same file or content"""
+    path = os.path.abspath(path)
+    columns = [column for column in df.columns if column in LAP_COLUMNS]
+    with conn:
+        conn.execute('DELETE FROM races WHERE path = ? OR sha1 = ?', (path, sha1))
+        cursor = conn.execute(
+            'INSERT INTO races (path, sha1, size, mtime, track, course, date, drivers, laps, columns, race_info, ingested_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (path, sha1, stat.st_size, stat.st_mtime, race_info.get('track'), race_info.get('course'),
+             race_info.get('date'), int(df['Driver'].nunique()) if not df.empty else 0,
+             int(df['Lap'].max()) if not df.empty else 0, json.dumps(columns), json.dumps(race_info), time.time())
+        )
+        race_id = cursor.lastrowid
+        if not df.empty:
+            entries = df.drop_duplicates('Driver')[['Driver', 'Class', 'Car']]
+            conn.executemany('INSERT INTO entries VALUES (?, ?, ?, ?)',
+                             ((race_id, *row) for row in entries.itertuples(index=False)))
+            laps = df[columns].copy()
+            if 'IsPit' in laps.columns:
+                laps['IsPit'] = laps['IsPit'].astype(int)
+            placeholders = ', '.join('?' * (len(columns) + 1))
+            names = ', '.join(f'"{column}"' for column in columns)
+            conn.executemany(f'INSERT INTO laps (race_id, {names}) VALUES ({placeholders})',
+                             ((race_id, *row) for row in laps.itertuples(index=False)))
+            conn.executemany('INSERT INTO stints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             ((race_id, *row) for row in stint_summary(df).itertuples(index=False)))
+        conn.executemany('INSERT INTO incidents VALUES (?, ?, ?, ?)',
+                         ((race_id, kind, item.get('et'), item.get('message'))
+                          for kind in INCIDENT_KINDS for item in incidents.get(kind, [])))
+        _store_results(conn, race_id, df, incidents)
+    return race_id
+
+
+def _store_results(conn, race_id, df, incidents):
+    """Writes the final classification of a race (business.championship.race_results)"""
+    from business.championship import race_results
+    results = race_results(df, incidents)
+    results['BestLap'] = results['BestLap'].astype(object).where(results['BestLap'].notna(), None)
+    conn.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     ((race_id, *row) for row in results.itertuples(index=False)))
+
+
+def stint_summary(df):
+    """Returns one row per driver stint: Driver, Stint, Class, Compound, StartLap, EndLap, Laps, BestLap.
+
+    A stint starts on the first lap and after every pit lap (the pit lap
+    closes the stint it belongs to).
+    """
+    laps = df[df['Lap'] > 0].sort_values(['Driver', 'Lap'], kind='mergesort')
+    if laps.empty:
+        return pd.DataFrame(columns=['Driver', 'Stint', 'Class', 'Compound', 'StartLap', 'EndLap', 'Laps', 'BestLap'])
+    pit = laps['IsPit'].astype(bool)
+    stint = pit.groupby(laps['Driver'], observed=True).shift(fill_value=False).astype(int).groupby(laps['Driver'], observed=True).cumsum() + 1
+    lap_time = laps['LapTime'].where(laps['LapTime'] > 0)
+    grouped = laps.assign(Stint=stint, ValidLapTime=lap_time).groupby(['Driver', 'Stint'], sort=True, observed=True)
+    summary = grouped.agg(Class=('Class', 'first'), FCompound=('FCompound', 'first'), StartLap=('Lap', 'min'),
+                          EndLap=('Lap', 'max'), Laps=('Lap', 'size'), BestLap=('ValidLapTime', 'min')).reset_index()
+    # FCompound is '<index>,<name>'
+    summary['Compound'] = summary['FCompound'].astype(str).str.split(',').str[-1].str.strip()
+    summary['BestLap'] = summary['BestLap'].astype(object).where(summary['BestLap'].notna(), None)
+    return summary[['Driver', 'Stint', 'Class', 'Compound', 'StartLap', 'EndLap', 'Laps', 'BestLap']]
+
+
+def scan_directory(conn, directory=None, workers=1, progress=None):
+    """Ingests new and changed result files of a directory; returns {'added', 'skipped', 'laps', 'errors', 'duplicates'}.
+
+    duplicates lists (path, library path) of files with the same content as
+    a race whose file is still there; they are hashed again on every scan
+    but not stored. With workers > 1 the files are parsed in that many processes while this
+    one writes them to the database. Every file is committed on its own, so
+    an interrupted scan resumes where it stopped. progress, if given, is
+    called as progress(done, total, summary) after each file.
+    """
+    summary = {'added': 0, 'skipped': 0, 'laps': 0, 'errors': [], 'duplicates': []}
+    pending = []
+    for path in result_files(directory or LIBRARY_DIR):
+        try:
+            if is_current(conn, path):
+                summary['skipped'] += 1
+            else:
+                pending.append(path)
+        except OSError as e:
+            summary['errors'].append((path, str(e)))
+    total = summary['skipped'] + len(summary['errors']) + len(pending)
+    known = _known_hashes(conn)
+    if workers > 1 and len(pending) > 1:
+        results = _parse_parallel(pending, known, workers)
+    else:
+        results = ((path, _result(_parse_file, path, known)) for path in pending)
+    for done, (path, result) in enumerate(results, start=total - len(pending) + 1):
+        try:
+            if isinstance(result, Exception):
+                raise result
+            original = _duplicate_of(conn, path, result[0])
+            if original is not None:
+                summary['duplicates'].append((path, original))
+            elif _store_parsed(conn, path, *result) is None:
+                summary['skipped'] += 1
+            else:
+                summary['added'] += 1
+                df = result[2][0] if result[2] is not None else None
+                summary['laps'] += int((df['Lap'] > 0).sum()) if df is not None and not df.empty else 0
+        except Exception as e:
+            summary['errors'].append((path, str(e)))
+        if progress is not None:
+            progress(done, total, summary)
+    return summary
+
+
+def _parse_parallel(paths, known, workers):
+    """Yields (path, _parse_file result or exception) as a process pool parses the files"""
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        for path in paths:
+            running[executor.submit(_parse_file, path, known)] = path
+            # Bounded so parsed races do not pile up while the database write is slower
+            while len(running) >= workers * 2:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield running.pop(future), _result(future.result)
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield running.pop(future), _result(future.result)
+
+
+def _result(func, *args):
+    """Returns func(*args), or the exception it raised"""
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+def list_races(conn, driver=None, track=None, car_class=None):
+    """Returns the library races (newest first) as dicts, optionally filtered by driver, track or class"""
+    query = 'SELECT id, path, sha1, track, course, date, drivers, laps FROM races'
+    conditions, params = [], []
+    if track:
+        conditions.append('track = ?')
+        params.append(track)
+    if driver:
+        conditions.append('id IN (SELECT race_id FROM entries WHERE driver = ?)')
+        params.append(driver)
+    if car_class:
+        conditions.append('id IN (SELECT race_id FROM entries WHERE class = ?)')
+        params.append(car_class)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY date DESC, id DESC'
+    fields = ('id', 'path', 'sha1', 'track', 'course', 'date', 'drivers', 'laps')
+    return [dict(zip(fields, row)) for row in conn.execute(query, params)]
+
+
+def race_versions(conn):
+    """Returns {(id, sha1)} of the library races; an entry changes whenever its race is re-ingested"""
+    return set(conn.execute('SELECT id, sha1 FROM races'))
+
+
+def season_results(conn, race_ids=None):
+    """Returns the stored results of the given races (default: all), with their race id, in date order.
+
+    Columns are RaceId, Date and business.championship.RESULT_COLUMNS.
+    """
+    from business.championship import RESULT_COLUMNS
+    query = ('SELECT results.race_id, races.date, driver, class, car, position, class_position, results.laps, '
+             'laps_led, best_lap, results.incidents, penalties FROM results JOIN races ON races.id = results.race_id')
+    params = []
+    if race_ids is not None:
+        params = list(race_ids)
+        query += f" WHERE results.race_id IN ({', '.join('?' * len(params))})"
+    query += ' ORDER BY races.date, results.race_id, position'
+    return pd.DataFrame(conn.execute(query, params).fetchall(), columns=['RaceId', 'Date'] + RESULT_COLUMNS)
+
+
+def race_stints(conn, race_id):
+    """Returns the stint summary of a race"""
+    rows = conn.execute(
+        'SELECT driver, stint, class, compound, start_lap, end_lap, laps, best_lap FROM stints '
+        'WHERE race_id = ? ORDER BY driver, stint', (race_id,)).fetchall()
+    return pd.DataFrame(rows, columns=['Driver', 'Stint', 'Class', 'Compound', 'StartLap', 'EndLap', 'Laps', 'BestLap'])
+
+
+def race_key(conn, race_id):
+    """Returns the content hash (dataset key) of a library race, or None if unknown"""
+    row = conn.execute('SELECT sha1 FROM races WHERE id = ?', (race_id,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def relative_path(path, directory=None):
+    """Returns path relative to the library directory (just the file name for files outside it)"""
+    root = os.path.abspath(directory or LIBRARY_DIR)
+    path = os.path.abspath(path)
+    if os.path.commonpath([root, path]) != root:
+        return os.path.basename(path)
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def find_race(conn, sha1):
+    """Returns the id of the library race with content hash sha1, or None if unknown"""
+    row = conn.execute('SELECT id FROM races WHERE sha1 = ?', (sha1,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def load_race(conn, race_id):
+    """Returns (sha1, df, race_info, incidents) of a library race, or None if unknown.
+
+    The DataFrame has the same columns, order and dtypes as parse_xml_scores output.
+    """
+    row = conn.execute('SELECT sha1, columns, race_info FROM races WHERE id = ?', (race_id,)).fetchone()
+    if row is None:
+        return None
+    sha1, columns, race_info = row[0], json.loads(row[1]), json.loads(row[2])
+    names = ', '.join(f'"{column}"' for column in columns)
+    rows = conn.execute(f'SELECT {names} FROM laps WHERE race_id = ? ORDER BY rowid', (race_id,)).fetchall()
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    if not df.empty:
+        df = apply_schema(df.astype({column: _DTYPES[LAP_COLUMNS[column]] for column in columns}))
+    else:
+        df = pd.DataFrame()
+    incidents = {kind: [] for kind in INCIDENT_KINDS}
+    for kind, et, message in conn.execute('SELECT kind, et, message FROM incidents WHERE race_id = ? ORDER BY rowid', (race_id,)):
+        incidents.setdefault(kind, []).append({'et': et, 'message': message})
+    return sha1, df, race_info, incidents
+
+
+def _duplicate_of(conn, path, sha1):
+    """Returns the path of another library file with this content that still exists, or None.
+
+    path then holds a copy of that race, so a previous version of path is
+    dropped from the library.
+    """
+    path = os.path.abspath(path)
+    row = conn.execute('SELECT path FROM races WHERE sha1 = ? AND path != ?', (sha1, path)).fetchone()
+    if row is None or not os.path.exists(row[0]):
+        return None
+    with conn:
+        conn.execute('DELETE FROM races WHERE path = ?', (path,))
+    return row[0]
+
+
+def _adopt_moved(conn, path, sha1, stat):
+    """Points an existing race with the same content, whose file is gone (see _duplicate_of), at its new path; True if there was one"""
+    row = conn.execute('SELECT id FROM races WHERE sha1 = ?', (sha1,)).fetchone()
+    if row is None:
+        return False
+    with conn:
+        conn.execute('DELETE FROM races WHERE path = ? AND id != ?', (os.path.abspath(path), row[0]))
+        conn.execute('UPDATE races SET path = ?, size = ?, mtime = ? WHERE id = ?',
+                     (os.path.abspath(path), stat.st_size, stat.st_mtime, row[0]))
+    return True
+
+
+def main(argv=None):
+    """Ingests a directory into the library: python -m data.library [directory] [--db path] [--workers N]"""
+    import argparse
+    parser = argparse.ArgumentParser(description='Ingest result files into the results library')
+    parser.add_argument('directory', nargs='?', default=LIBRARY_DIR, help='directory to scan (default: RESULTS_LIBRARY_DIR)')
+    parser.add_argument('--db', help='database path (default: RESULTS_LIBRARY_DB or <directory>/library.sqlite3)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='parser processes (default: number of CPUs)')
+    parser.add_argument('--quiet', action='store_true', help='only print the summary')
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error('no directory given and RESULTS_LIBRARY_DIR is not set')
+    db_path = args.db or LIBRARY_DB or os.path.join(args.directory, 'library.sqlite3')
+    start = time.perf_counter()
+
+    def rates(summary):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        return f"{summary['added'] / elapsed:.1f} files/s, {summary['laps'] / elapsed:.0f} laps/s"
+
+    def progress(done, total, summary):
+        end = '\r' if sys.stderr.isatty() and done < total else '\n'
+        print(f"[{done}/{total}] {summary['added']} added, {summary['skipped']} unchanged, "
+              f"{len(summary['errors'])} errors, {rates(summary)}", end=end, file=sys.stderr, flush=True)
+
+    with closing(connect(db_path)) as conn:
+        summary = scan_directory(conn, args.directory, args.workers, None if args.quiet else progress)
+    print(f"{summary['added']} added, {summary['skipped']} unchanged, {len(summary['errors'])} errors, "
+          f"{len(summary['duplicates'])} duplicates in {time.perf_counter() - start:.1f}s ({rates(summary)})")
+    for path, original in summary['duplicates']:
+        print(f'  {path}: same race as {original}', file=sys.stderr)
+    for path, error in summary['errors']:
+        print(f'  {path}: {error}', file=sys.stderr)
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
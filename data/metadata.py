@@ -0,0 +1,59 @@
+import pandas as pd
+
+# Distinct values listed in the metadata, in filter order
+DISTINCT_COLUMNS = {
+    'classes': 'Class',
+    'drivers': 'Driver',
+    'teams': 'Car',
+    'vehicles': 'VehName',
+    'car_types': 'CarType',
+}
+
+
+def empty_metadata():
+    """Returns the metadata of a race without laps"""
+    return {**{name: [] for name in DISTINCT_COLUMNS}, 'max_lap': 0, 'max_lap_by_class': {},
+            'laps_by_driver': {}, 'duration': 0.0}
+
+
+def dataset_metadata(df):
+    """Returns the small JSON summary of a lap table used by the filters and selectors.
+
+    Holds the sorted distinct classes, drivers, teams, vehicles and car
+    types (empty vehicle and car type names left out), the last lap
+    overall and per class, the number of completed laps (Lap > 0) per
+    driver and the race duration (last elapsed time, in seconds). It is a
+    few KB even for long races, so callbacks that only need these values
+    do not depend on the lap data.
+    """
+    if df is None or df.empty:
+        return empty_metadata()
+    metadata = {name: _distinct(df, column, skip_empty=name in ('vehicles', 'car_types'))
+                for name, column in DISTINCT_COLUMNS.items()}
+    metadata['max_lap'] = int(df['Lap'].max())
+    metadata['max_lap_by_class'] = (
+        {str(c): int(lap) for c, lap in df.groupby('Class', observed=True)['Lap'].max().items()}
+        if 'Class' in df.columns else {}
+    )
+    completed = df.loc[df['Lap'] > 0, 'Driver'].astype(object).value_counts()
+    metadata['laps_by_driver'] = {str(driver): int(completed.get(driver, 0)) for driver in metadata['drivers']}
+    metadata['duration'] = float(df['ET'].max()) if 'ET' in df.columns and df['ET'].notna().any() else 0.0
+    return metadata
+
+
+def max_lap(metadata, classes=None):
+    """Returns the last lap of the race, or of the given classes (0 without metadata)"""
+    if not metadata:
+        return 0
+    if not classes:
+        return metadata['max_lap']
+    laps = [metadata['max_lap_by_class'][c] for c in classes if c in metadata['max_lap_by_class']]
+    return max(laps) if laps else 0
+
+
+def _distinct(df, column, skip_empty=False):
+    """Sorted distinct values of a column as str"""
+    if column not in df.columns:
+        return []
+    values = pd.unique(df[column].astype(object).dropna())
+    return sorted(str(value) for value in values if value or not skip_empty)
@@ -1,9 +1,62 @@
+import os
 import xml.etree.ElementTree as ET
 import pandas as pd
+from data.schema import apply_schema
 
+# Structure limits for uploaded results. A 24h race with 60 cars has about
+# 175k elements and is 5 levels deep, so only malformed or hostile files hit them.
+MAX_XML_ELEMENTS = int(os.environ.get('XML_MAX_ELEMENTS', '2000000'))
+MAX_XML_DEPTH = int(os.environ.get('XML_MAX_DEPTH', '32'))
+_FEED_CHUNK = 1 << 20
 
-def parse_xml_scores(content):
-    root = ET.fromstring(content)
+
+class XMLLimitError(ET.ParseError):
+    """Raised when a results file exceeds the element count or depth limits"""
+
+
+def parse_xml_tree(content, max_elements=None, max_depth=None):
+    """Parses XML (str or bytes) into its root element, enforcing element count and depth limits.
+
+    The document is fed to an XMLPullParser in chunks, so parsing stops as
+    soon as a limit is crossed instead of after the whole tree is built.
+    """
+    max_elements = MAX_XML_ELEMENTS if max_elements is None else max_elements
+    max_depth = MAX_XML_DEPTH if max_depth is None else max_depth
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    depth = 0
+    elements = 0
+
+    def check(events):
+        nonlocal root, depth, elements
+        for event, element in events:
+            if event == 'end':
+                depth -= 1
+                continue
+            if root is None:
+                root = element
+            depth += 1
+            elements += 1
+            if depth > max_depth:
+                raise XMLLimitError(f'XML nesting deeper than {max_depth} levels')
+            if elements > max_elements:
+                raise XMLLimitError(f'XML has more than {max_elements} elements')
+
+    for start in range(0, len(content), _FEED_CHUNK):
+        parser.feed(content[start:start + _FEED_CHUNK])
+        check(parser.read_events())
+    parser.close()
+    check(parser.read_events())
+    return root
+
+
+def parse_xml_scores(content, progress=None):
+    """Parses a results XML into (laps DataFrame, race info, incidents).
+
+    progress, when given, is called after each driver as
+    progress(drivers_parsed, total_drivers, laps_parsed).
+    """
+    root = parse_xml_tree(content)
     data = []
     race_info = {}
     incidents = {'chat': [], 'incident': [], 'penalty': []}
@@ -62,7 +115,9 @@ def parse_xml_scores(content):
             'game_version': race_info['game_version'].text if race_info['game_version'] is not None else 'Unknown'
         }
     
-    for driver in root.findall('.//Driver'):
+    drivers = root.findall('.//Driver')
+    laps_parsed = 0
+    for driver_index, driver in enumerate(drivers, 1):
         driver_name = driver.find('Name')
         car_class = driver.find('CarClass')
         grid_pos = driver.find('GridPos')
@@ -268,6 +323,10 @@ def parse_xml_scores(content):
                         'RCompound': rcompound,
                         'Aids': aids_display
                     })
+                    laps_parsed += 1
+        
+        if progress is not None:
+            progress(driver_index, len(drivers), laps_parsed)
     
     df = pd.DataFrame(data)
     if not df.empty:
@@ -303,5 +362,12 @@ def parse_xml_scores(content):
         class_leader_times.columns = ['Lap', 'Class', 'ClassLeaderET']
         df = df.merge(class_leader_times, on=['Lap', 'Class'])
         df['GapToClassLeader'] = df['ET'] - df['ClassLeaderET']
+        
+        # Interval to the car directly ahead on the same lap, overall and in class
+        by_lap = df.sort_values(['Lap', 'ET'], kind='mergesort')
+        df['IntervalAhead'] = by_lap.groupby('Lap')['ET'].diff().fillna(0)
+        by_class = df.sort_values(['Lap', 'Class', 'ET'], kind='mergesort')
+        df['ClassIntervalAhead'] = by_class.groupby(['Lap', 'Class'])['ET'].diff().fillna(0)
+        df = apply_schema(df)
     
     return df, race_info, incidents
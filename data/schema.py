@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Column types of the parsed lap table.
+# The text columns repeat a few values over thousands of laps and become
+# categoricals, Lap and Position get the smallest integer type that holds
+# them, and IsPit is bool. These are lossless: every chart and table gets
+# the same values, in about a quarter of the memory of object/int64 columns
+# (the parsed table lives in every process's dataset cache). With
+# LAP_TABLE_FLOAT32=True the measurement columns are also stored as float32,
+# which halves them again but changes the values shown beyond the 7th
+# significant digit, so it is off by default.
+CATEGORY_COLUMNS = ['Driver', 'Class', 'Car', 'VehName', 'CarType', 'FCompound', 'RCompound', 'Aids']
+INTEGER_COLUMNS = ['Lap', 'Position']
+BOOL_COLUMNS = ['IsPit']
+FLOAT32_COLUMNS = ['FuelUsed', 'FuelLevel', 'VE', 'VELevel', 'TireWear', 'TWFL', 'TWFR', 'TWRL', 'TWRR', 'S1', 'S2', 'S3']
+FLOAT32 = os.environ.get('LAP_TABLE_FLOAT32', 'False') == 'True'
+
+
+def apply_schema(df, float32=None):
+    """Returns df with the lap table column types; columns not in the schema are kept as they are"""
+    if df is None or df.empty:
+        return df
+    float32 = FLOAT32 if float32 is None else float32
+    types = {}
+    for column in df.columns.intersection(CATEGORY_COLUMNS):
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            types[column] = 'category'
+    for column in df.columns.intersection(INTEGER_COLUMNS):
+        if df[column].dtype.kind in 'iu':
+            types[column] = smallest_int(df[column])
+    for column in df.columns.intersection(BOOL_COLUMNS):
+        types[column] = bool
+    if float32:
+        for column in df.columns.intersection(FLOAT32_COLUMNS):
+            types[column] = np.float32
+    return df.astype(types) if types else df
+
+
+def map_values(values, mapping):
+    """Series.map returning plain values also for categoricals (which map to a categorical)"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return values.map(mapping)
+
+
+def smallest_int(values):
+    """Returns the smallest signed integer type holding values"""
+    if values.empty:
+        return np.int8
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def memory_report(df):
+    """Returns {'bytes', 'baseline_bytes', 'saved'} of a lap table.
+
+    bytes is the deep memory usage of df; baseline_bytes what the same
+    table takes with the parser's object/int64/float64 columns.
+    """
+    if df is None or df.empty:
+        return {'bytes': 0, 'baseline_bytes': 0, 'saved': 0.0}
+    usage = df.memory_usage(deep=True, index=False)
+    baseline = 0
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            baseline += df[column].astype(object).memory_usage(deep=True, index=False)
+        elif dtype.kind in 'iu' and dtype.itemsize < 8 or dtype.kind == 'f' and dtype.itemsize < 8:
+            baseline += len(df) * 8
+        else:
+            baseline += usage[column]
+    total = int(usage.sum())
+    return {'bytes': total, 'baseline_bytes': int(baseline), 'saved': 1 - total / baseline if baseline else 0.0}
@@ -0,0 +1,88 @@
+import os
+import pickle
+import sys
+import tempfile
+import pandas as pd
+from data.cache import dataset_key
+
+# Prebuilt snapshot of a parsed results file.
+# Parsing the bundled sample takes a few hundred milliseconds in every
+# gunicorn worker and on every launch of the standalone build, so the parsed
+# lap table, race info and incidents are pickled next to the source file.
+# The snapshot is only used when its stamp matches: bump SNAPSHOT_VERSION
+# whenever the parser output changes.
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+def snapshot_path(xml_path):
+    """Returns the snapshot path of a results file"""
+    return xml_path + SNAPSHOT_SUFFIX
+
+
+def snapshot_stamp(content):
+    """Returns the stamp that a snapshot of this content must carry to be valid"""
+    return {'version': SNAPSHOT_VERSION, 'source': dataset_key(content), 'pandas': pd.__version__}
+
+
+def write_snapshot(path, content, df, race_info, incidents):
+    """Writes a snapshot atomically, returns False if the location is not writable"""
+    entry = {'stamp': snapshot_stamp(content), 'df': df, 'race_info': race_info, 'incidents': incidents}
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+    return True
+
+
+def read_snapshot(path, content):
+    """Returns (df, race_info, incidents) from a snapshot or None if it is missing or stale"""
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(entry, dict) or entry.get('stamp') != snapshot_stamp(content):
+        return None
+    return entry['df'], entry['race_info'], entry['incidents']
+
+
+def load_results(xml_path, write=True):
+    """Loads a results file from its snapshot, parsing it (and refreshing the snapshot) when stale.
+
+    Returns (content, df, race_info, incidents) where content is the raw file.
+    """
+    with open(xml_path, 'rb') as f:
+        content = f.read()
+
+    path = snapshot_path(xml_path)
+    dataset = read_snapshot(path, content)
+    if dataset is None:
+        from data.parsers import parse_xml_scores
+        dataset = parse_xml_scores(content.decode('utf-8'))
+        if write:
+            write_snapshot(path, content, *dataset)
+    return (content,) + tuple(dataset)
+
+
+def build_snapshot(xml_path):
+    """Parses a results file and writes its snapshot"""
+    with open(xml_path, 'rb') as f:
+        content = f.read()
+    from data.parsers import parse_xml_scores
+    df, race_info, incidents = parse_xml_scores(content.decode('utf-8'))
+    path = snapshot_path(xml_path)
+    if not write_snapshot(path, content, df, race_info, incidents):
+        raise OSError(f'Could not write {path}')
+    return path
+
+
+if __name__ == '__main__':
+    # python -m data.snapshot samples/2025_anonymized.xmlx
+    for xml_path in sys.argv[1:]:
+        print(f'Snapshot written to {build_snapshot(xml_path)}')
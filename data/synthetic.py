@@ -0,0 +1,338 @@
+"""Synthetic rFactor2/LMU race results for scale testing.
+
+Generates result XML shaped like the files exported by the game (race
+settings, a Stream of Score/Incident/TrackLimits/Penalty/Chat events and one
+Driver block per entry with its laps). Output is deterministic for a given
+seed and is written as a stream of chunks, so multi-hundred-MB files can be
+produced with memory bounded by the drivers x laps timing table.
+
+    python -m data.synthetic out.xml --preset 24h
+    python -m data.synthetic out.xml --drivers 60 --laps 800 --missing-rate 0.02 --seed 7
+"""
+import argparse
+import heapq
+import random
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+# Base lap time (s), car model and laps per full tank of each class
+CLASSES = {
+    'Hyper': {'lap_time': 108.0, 'car_type': 'Aston Martin Valkyrie LMH', 'category': 'WEC 2025, Hypercar', 'stint_laps': 14},
+    'LMP2': {'lap_time': 112.5, 'car_type': 'Oreca 07 Gibson', 'category': 'ELMS 2025, LMP2', 'stint_laps': 16},
+    'GT3': {'lap_time': 118.0, 'car_type': 'Ford Mustang LMGT3', 'category': 'WEC 2025, LMGT3', 'stint_laps': 15},
+}
+# Tire wear per lap (fraction of the tire) and lap time lost per lap of stint (s)
+COMPOUNDS = {
+    'Soft': {'wear': 0.022, 'deg': 0.060},
+    'Medium': {'wear': 0.015, 'deg': 0.035},
+    'Hard': {'wear': 0.010, 'deg': 0.020},
+}
+# Lap attributes that may be dropped by missing_rate
+OPTIONAL_LAP_ATTRIBUTES = ['s1', 's2', 's3', 'topspeed', 'fuel', 'fuelUsed', 've', 'veUsed',
+                           'twfl', 'twfr', 'twrl', 'twrr', 'fcompound', 'rcompound']
+# Driver elements that may be dropped by missing_rate
+OPTIONAL_DRIVER_ELEMENTS = ['VehName', 'CarType', 'CarNumber', 'TeamName', 'GridPos', 'ControlAndAids']
+
+PRESETS = {
+    'sprint': {'drivers': 44, 'classes': ['Hyper', 'GT3'], 'laps': 33},
+    '6h': {'drivers': 60, 'classes': ['Hyper', 'LMP2', 'GT3'], 'laps': 195},
+    '24h': {'drivers': 60, 'classes': ['Hyper', 'LMP2', 'GT3'], 'laps': 780},
+}
+
+PIT_LOSS = 32.0
+START_LOSS = 8.0
+
+
+def iter_race_xml(drivers=44, classes=('Hyper', 'GT3'), laps=33, pit_every=None, compounds=('Medium', 'Soft', 'Hard'),
+                  score_density=3, incident_density=0.3, track_limits_density=0.06, penalty_density=0.003,
+                  chat_density=0.03, missing_rate=0.0, dnf_rate=0.1, seed=0, track='Paul Ricard Circuit'):
+    """Yields the XML of a synthetic race in chunks.
+
+    drivers entries are spread over classes in turn. laps is the number of
+    laps completed by the winner, the others take the flag on the lap after
+    the winner finishes. pit_every overrides the laps per stint of every
+    class. Densities are events per driver per lap (score_density: Score
+    events, up to one per sector; incident_density, penalty_density and
+    chat_density: events for the whole field per lap). missing_rate is the
+    probability of dropping each optional lap attribute or driver element
+    and of an invalid ('--.----') lap time. dnf_rate is the fraction of
+    entries that retire.
+    """
+    classes = [cls for cls in classes if cls in CLASSES] or ['GT3']
+    compounds = [compound for compound in compounds if compound in COMPOUNDS] or ['Medium']
+    entries = _simulate(drivers, classes, laps, pit_every, compounds, dnf_rate, seed)
+
+    yield _header(track, laps, entries)
+    yield '<Stream>\n'
+    events = [_driver_events(entry, score_density, track_limits_density, seed) for entry in entries]
+    events.append(_field_events(entries, incident_density, penalty_density, chat_density, seed))
+    chunk = []
+    for _, line in heapq.merge(*events, key=lambda event: event[0]):
+        chunk.append(line)
+        if len(chunk) >= 1000:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk)
+    yield '</Stream>\n'
+    yield f'<FormationAndStart>1</FormationAndStart>\n<MostLapsCompleted>{max(len(e["laps"]) for e in entries)}</MostLapsCompleted>\n'
+
+    for entry in entries:
+        yield from _driver_xml(entry, missing_rate, seed)
+    yield '</Race>\n</RaceResults>\n</rFactorXML>\n'
+
+
+def write_race_xml(path, **options):
+    """Streams a synthetic race to path, returns the number of bytes written"""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for chunk in iter_race_xml(**options):
+            f.write(chunk)
+        return f.tell()
+
+
+def race_xml(**options):
+    """Returns a synthetic race as a single string (small races and tests)"""
+    return ''.join(iter_race_xml(**options))
+
+
+def _simulate(drivers, classes, laps, pit_every, compounds, dnf_rate, seed):
+    """Builds the lap timing of every entry: lap times, elapsed time, pit stops, fuel, energy and tires"""
+    rng = random.Random(f'{seed}-field')
+    entries = []
+    for index in range(drivers):
+        cls = classes[index % len(classes)]
+        spec = CLASSES[cls]
+        stint_laps = pit_every or spec['stint_laps']
+        skill = rng.gauss(0, 0.8)
+        entry = {
+            'id': index, 'name': f'Driver {index + 1:03d}', 'team': f'Team {index + 1:03d}', 'number': str(index + 1),
+            'class': cls, 'spec': spec, 'grid': 0, 'laps': [], 'pitstops': 0,
+            'retire_lap': rng.randint(2, max(laps, 2)) if rng.random() < dnf_rate else None
+        }
+
+        et = 0.0
+        fuel = ve = 1.0
+        wear = 1.0
+        stint_lap = 0
+        compound = compounds[0]
+        stint_length = max(2, stint_laps + rng.randint(-1, 1))
+        burn = 0.98 / stint_length
+        for lap in range(1, laps + 1):
+            pit = stint_lap + 1 >= stint_length and lap < laps
+            lap_time = (spec['lap_time'] + skill + rng.gauss(0, 0.35) + 3.0 * fuel
+                        + COMPOUNDS[compound]['deg'] * stint_lap + (START_LOSS if lap == 1 else 0.0))
+            fuel_used = ve_used = burn * rng.uniform(0.95, 1.05)
+            wear -= COMPOUNDS[compound]['wear'] * rng.uniform(0.8, 1.2)
+            fuel -= fuel_used
+            ve -= ve_used
+            if pit:
+                lap_time += PIT_LOSS
+                compound = rng.choice(compounds)
+                fuel_used = fuel - 1.0
+                ve_used = ve - 1.0
+                fuel = ve = wear = 1.0
+                stint_lap = 0
+                stint_length = max(2, stint_laps + rng.randint(-1, 1))
+                entry['pitstops'] += 1
+            else:
+                stint_lap += 1
+            et += lap_time
+            entry['laps'].append({
+                'num': lap, 'et': et, 'time': lap_time, 'pit': pit, 'fuel': max(fuel, 0.0), 'fuelUsed': fuel_used,
+                've': max(ve, 0.0), 'veUsed': ve_used, 'wear': max(wear, 0.0), 'compound': compound,
+                'topspeed': rng.gauss(300, 4)
+            })
+        entries.append(entry)
+
+    # Race ends when the winner completes its laps, the others finish on their next crossing
+    finish_et = min(entry['laps'][-1]['et'] for entry in entries)
+    for entry in entries:
+        completed = min(laps, sum(1 for lap in entry['laps'] if lap['et'] <= finish_et) + 1)
+        entry['finished'] = entry['retire_lap'] is None or entry['retire_lap'] >= completed
+        if not entry['finished']:
+            completed = entry['retire_lap']
+        entry['laps'] = entry['laps'][:completed]
+
+    # Lap positions follow the crossing order of each lap, the grid is shuffled by skill
+    for lap_index in range(laps):
+        crossing = sorted((entry['laps'][lap_index]['et'], entry['id']) for entry in entries if len(entry['laps']) > lap_index)
+        for position, (_, entry_id) in enumerate(crossing, 1):
+            entries[entry_id]['laps'][lap_index]['p'] = position
+    grid = sorted(entries, key=lambda entry: entry['laps'][0]['et'] + rng.gauss(0, 2) if entry['laps'] else float('inf'))
+    for position, entry in enumerate(grid, 1):
+        entry['grid'] = position
+
+    # Final classification: laps completed, then time
+    classification = sorted(entries, key=lambda entry: (-len(entry['laps']), entry['laps'][-1]['et'] if entry['laps'] else 0))
+    class_positions = {}
+    for position, entry in enumerate(classification, 1):
+        entry['position'] = position
+        class_positions[entry['class']] = class_positions.get(entry['class'], 0) + 1
+        entry['class_position'] = class_positions[entry['class']]
+    return entries
+
+
+def _header(track, laps, entries):
+    vehicles = ','.join(sorted({entry['spec']['car_type'].replace(' ', '_') for entry in entries}))
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<!DOCTYPE rF [\n<!ENTITY rFEnt "rFactor Entity">\n]>\n'
+        '<rFactorXML version="1.0">\n<RaceResults>\n'
+        '<Setting>Multiplayer</Setting>\n<ServerName>Synthetic Server</ServerName>\n'
+        '<DateTime>1765743027</DateTime>\n<TimeString>2025/12/14 17:10:27</TimeString>\n'
+        f'<TrackVenue>{escape(track)}</TrackVenue>\n<TrackCourse>{escape(track)}</TrackCourse>\n'
+        f'<TrackEvent>Synthetic Race</TrackEvent>\n<TrackLength>5807.3</TrackLength>\n'
+        '<GameVersion>1.2000</GameVersion>\n<Dedicated>1</Dedicated>\n'
+        f'<RaceLaps>{laps}</RaceLaps>\n<RaceTime>0</RaceTime>\n'
+        '<MechFailRate>0</MechFailRate>\n<DamageMult>100</DamageMult>\n<FuelMult>1</FuelMult>\n<TireMult>1</TireMult>\n'
+        f'<VehiclesAllowed>{escape(vehicles)},</VehiclesAllowed>\n<TireWarmers>0</TireWarmers>\n'
+        '<Race>\n<DateTime>1765743732</DateTime>\n<TimeString>2025/12/14 17:22:12</TimeString>\n'
+        f'<Laps>{laps}</Laps>\n<Minutes>0</Minutes>\n'
+    )
+
+
+def _driver_events(entry, score_density, track_limits_density, seed):
+    """Yields (et, line) Score and TrackLimits events of one entry, in time order"""
+    rng = random.Random(f'{seed}-events-{entry["id"]}')
+    previous_et = 0.0
+    sectors = min(3, max(0, int(score_density)))
+    for lap in entry['laps']:
+        lap_events = []
+        for point in range(sectors):
+            # Sector crossings at roughly 30% and 55% of the lap and at the line
+            fraction = (0.3, 0.55, 1.0)[point]
+            et = previous_et + lap['time'] * fraction
+            lap_num = lap['num'] - 1 if point < 2 else lap['num']
+            lap_events.append((et, f'<Score et="{et:.1f}">Driver {entry["id"]} lap={lap_num} point={(point + 1) % 3} '
+                                   f't={lap["time"] * fraction:.3f} et={et:.3f}</Score>\n'))
+        if rng.random() < track_limits_density:
+            et = previous_et + lap['time'] * rng.uniform(0.05, 0.95)
+            points = rng.choice([0, 0.5, 1])
+            lap_events.append((et, f'<TrackLimits Driver={quoteattr(entry["name"])} ID="{entry["id"]}" Lap="{lap["num"]}" '
+                                   f'WarningPoints="{points}" CurrentPoints="{points}" Resolution="7" et="{et:.1f}">No Further Action</TrackLimits>\n'))
+        lap_events.sort()
+        yield from lap_events
+        previous_et = lap['et']
+
+
+def _field_events(entries, incident_density, penalty_density, chat_density, seed):
+    """Yields (et, line) Incident, Penalty and ChatMessage events of the whole field, in time order"""
+    rng = random.Random(f'{seed}-field-events')
+    active = [entry for entry in entries if entry['laps']]
+    if not active:
+        return
+    end = max(entry['laps'][-1]['et'] for entry in active)
+    mean_lap = sum(entry['laps'][-1]['et'] / len(entry['laps']) for entry in active) / len(active)
+    rates = [
+        ('incident', incident_density / mean_lap),
+        ('penalty', penalty_density / mean_lap),
+        ('chat', chat_density / mean_lap),
+    ]
+    total_rate = sum(rate for _, rate in rates)
+    if total_rate <= 0:
+        return
+
+    et = 0.0
+    while True:
+        et += rng.expovariate(total_rate)
+        if et >= end:
+            return
+        kind = rng.choices([name for name, _ in rates], weights=[rate for _, rate in rates])[0]
+        driver, other = rng.sample(active, 2) if len(active) > 1 else (active[0], active[0])
+        if kind == 'incident':
+            yield et, (f'<Incident et="{et:.1f}">{escape(driver["name"])} reported contact '
+                       f'({rng.uniform(20, 900):.2f}) {escape(other["name"])}</Incident>\n')
+        elif kind == 'penalty':
+            yield et, (f'<Penalty Driver={quoteattr(driver["name"])} ID="{driver["id"]}" Penalty="Drive Thru" Time="0" Laps="0" '
+                       f'Reason="Track Limits" et="{et:.1f}">{escape(driver["name"])} received Drive Thru penalty, 0s, '
+                       f'0laps for Track Limits.</Penalty>\n')
+        else:
+            yield et, f'<ChatMessage et="{et:.1f}">{escape(driver["name"])}: gg</ChatMessage>\n'
+
+
+def _driver_xml(entry, missing_rate, seed):
+    """Yields the Driver block of an entry"""
+    rng = random.Random(f'{seed}-driver-{entry["id"]}')
+    spec = entry['spec']
+
+    def element(tag, value):
+        if tag in OPTIONAL_DRIVER_ELEMENTS and rng.random() < missing_rate:
+            return ''
+        return f'<{tag}>{escape(str(value))}</{tag}>\n'
+
+    laps = entry['laps']
+    lines = [
+        '<Driver>\n', element('Name', entry['name']), element('Connected', 1),
+        element('VehFile', f'{entry["number"]}_{entry["class"]}.VEH'),
+        element('VehName', f'{spec["car_type"]} #{entry["number"]}'), element('Category', spec['category']),
+        element('CarType', spec['car_type']), element('CarClass', entry['class']), element('CarNumber', entry['number']),
+        element('TeamName', entry['team']), element('isPlayer', 0), element('ServerScored', 1),
+        element('GridPos', entry['grid']), element('Position', entry['position']),
+        element('ClassGridPos', entry['grid']), element('ClassPosition', entry['class_position']),
+        element('LapRankIncludingDiscos', entry['position'])
+    ]
+    yield ''.join(lines)
+
+    chunk = []
+    for lap in laps:
+        compound = f'0,{lap["compound"]}'
+        sector_split = (0.26, 0.30)
+        values = {
+            's1': f'{lap["time"] * sector_split[0]:.4f}', 's2': f'{lap["time"] * sector_split[1]:.4f}',
+            's3': f'{lap["time"] * (1 - sum(sector_split)):.4f}', 'topspeed': f'{lap["topspeed"]:.2f}',
+            'fuel': f'{lap["fuel"]:.3f}', 'fuelUsed': f'{lap["fuelUsed"]:.3f}', 've': f'{lap["ve"]:.3f}',
+            'veUsed': f'{lap["veUsed"]:.3f}', 'twfl': f'{lap["wear"]:.3f}', 'twfr': f'{lap["wear"]:.3f}',
+            'twrl': f'{lap["wear"]:.3f}', 'twrr': f'{lap["wear"]:.3f}', 'fcompound': compound, 'rcompound': compound
+        }
+        attributes = ''.join(
+            f' {name}="{values[name]}"' for name in OPTIONAL_LAP_ATTRIBUTES
+            if not (missing_rate and rng.random() < missing_rate)
+        )
+        pit = ' pit="1"' if lap['pit'] else ''
+        lap_time = '--.----' if missing_rate and rng.random() < missing_rate else f'{lap["time"]:.4f}'
+        chunk.append(f'<Lap num="{lap["num"]}" p="{lap["p"]}" et="{lap["et"]:.4f}"{pit}{attributes}>{lap_time}</Lap>\n')
+    yield ''.join(chunk)
+
+    best = min((lap['time'] for lap in laps if not lap['pit']), default=0.0)
+    tail = [element('BestLapTime', f'{best:.4f}')]
+    if entry['finished'] and laps:
+        tail.append(element('FinishTime', f'{laps[-1]["et"]:.4f}'))
+    tail += [element('Laps', len(laps)), element('Pitstops', entry['pitstops']),
+             element('FinishStatus', 'Finished Normally' if entry['finished'] else 'DNF')]
+    if not entry['finished']:
+        tail.append(element('DNFReason', 'DNF'))
+    if rng.random() >= missing_rate:
+        tail.append(f'<ControlAndAids startLap="1" endLap="{len(laps)}">PlayerControl,Clutch,AutoBlip</ControlAndAids>\n')
+    tail.append('</Driver>\n')
+    yield ''.join(tail)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic rFactor2/LMU race results XML')
+    parser.add_argument('output', help='output XML path')
+    parser.add_argument('--preset', choices=sorted(PRESETS), help='starting point for the options below')
+    parser.add_argument('--drivers', type=int)
+    parser.add_argument('--classes', help='comma separated, from: ' + ','.join(CLASSES))
+    parser.add_argument('--laps', type=int, help='laps completed by the winner')
+    parser.add_argument('--pit-every', type=int, help='laps per stint (default per class)')
+    parser.add_argument('--compounds', help='comma separated, from: ' + ','.join(COMPOUNDS))
+    parser.add_argument('--score-density', type=float, help='Score events per driver lap (0-3)')
+    parser.add_argument('--incident-density', type=float, help='incidents per field lap')
+    parser.add_argument('--track-limits-density', type=float, help='track limits per driver lap')
+    parser.add_argument('--penalty-density', type=float, help='penalties per field lap')
+    parser.add_argument('--chat-density', type=float, help='chat messages per field lap')
+    parser.add_argument('--missing-rate', type=float, help='probability of dropping optional attributes')
+    parser.add_argument('--dnf-rate', type=float, help='fraction of entries that retire')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    options = dict(PRESETS.get(args.preset, {}))
+    for name, value in vars(args).items():
+        if name in ('output', 'preset') or value is None:
+            continue
+        options[name] = value.split(',') if name in ('classes', 'compounds') else value
+    size = write_race_xml(args.output, **options)
+    print(f'Wrote {args.output} ({size / 1e6:.1f} MB)')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
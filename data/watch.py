@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from data import cache
+from data.cache import dataset_key, disk_enabled, drop_dataset, get_dataset, has_dataset, put_dataset
+
+# Live results watch mode.
+# With WATCH_RESULTS set to a results file (or a directory, whose newest
+# results file is followed), clients poll every WATCH_INTERVAL seconds and
+# receive the key of the latest version and the events added since the
+# version they hold; the views read the laps from the dataset cache. The
+# file is read by one watcher thread per server process, never in a request,
+# and parsed again only when its size or mtime changes. Every version goes
+# through the shared dataset cache and processes take turns on a lock file,
+# so a version is parsed once and the other processes only load it; any
+# process can then compute the difference between the version a client
+# holds and the latest one. Only the last LIVE_VERSIONS versions stay in
+# the cache, so a long race does not evict the datasets of other users.
+WATCH_PATH = os.environ.get('WATCH_RESULTS', '')
+WATCH_INTERVAL = float(os.environ.get('WATCH_INTERVAL', '5'))
+# The latest version and the one held by clients that polled in time
+LIVE_VERSIONS = 2
+
+_state = {'signature': None, 'key': None, 'versions': []}
+_lock = threading.Lock()
+_watcher = {'thread': None, 'pid': None}
+
+
+def enabled():
+    """True when a results file or directory is being watched"""
+    return bool(WATCH_PATH)
+
+
+def watched_file(path=None):
+    """Returns the watched results file: path itself, or the newest results file of a directory"""
+    path = path or WATCH_PATH
+    if not os.path.isdir(path):
+        return path if os.path.exists(path) else None
+    from data.library import result_files
+    files = result_files(path)
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def latest_dataset():
+    """Returns the dataset key of the latest version read by the watcher thread, or None if there is none yet.
+
+    Never reads the file: the watcher thread of this process (started on the
+    first call) does, so a request only looks up the key.
+    """
+    _ensure_watcher()
+    with _lock:
+        return _state['key']
+
+
+def refresh(path=None):
+    """Reads the watched file if its size or mtime changed; returns the key of the current version.
+
+    A version already in the dataset cache (parsed by another process) is
+    not parsed again. A file caught in the middle of being written fails to
+    parse and keeps the previous version until the next change.
+    """
+    target = watched_file(path)
+    if target is None:
+        return None
+    stat = os.stat(target)
+    signature = (target, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if _state['signature'] == signature and has_dataset(_state['key']):
+            return _state['key']
+        previous = _state['key']
+    with open(target, 'rb') as f:
+        content = f.read()
+    key = dataset_key(content)
+    if not has_dataset(key):
+        with _parse_lock():
+            # Another process may have parsed it while this one waited
+            if get_dataset(key) is None:
+                from data.parsers import parse_xml_scores
+                try:
+                    df, race_info, incidents = parse_xml_scores(content)
+                except Exception:
+                    return previous
+                put_dataset(key, df, race_info, incidents)
+    with _lock:
+        _state['signature'], _state['key'] = signature, key
+        versions = _state['versions']
+        if key not in versions:
+            versions.append(key)
+        stale, versions[:] = versions[:-LIVE_VERSIONS], versions[-LIVE_VERSIONS:]
+    for old in stale:
+        drop_dataset(old)
+    return key
+
+
+def _ensure_watcher():
+    """Starts the watcher thread of this process if it is not running (threads do not survive a fork)"""
+    with _lock:
+        thread = _watcher['thread']
+        if thread is not None and thread.is_alive() and _watcher['pid'] == os.getpid():
+            return
+        thread = threading.Thread(target=_watch_loop, name='results-watcher', daemon=True)
+        _watcher['thread'], _watcher['pid'] = thread, os.getpid()
+    thread.start()
+
+
+def _watch_loop():
+    while enabled():
+        try:
+            refresh()
+        except OSError:
+            # The file was replaced or removed between listing and reading it
+            pass
+        time.sleep(WATCH_INTERVAL)
+
+
+@contextmanager
+def _parse_lock():
+    """Exclusive lock shared by the server processes through the dataset cache directory"""
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is None or not disk_enabled():
+        yield
+        return
+    with open(os.path.join(cache.CACHE_DIR, 'watch.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def new_events(old_incidents, new_incidents):
+    """Returns {kind: events added} when new_incidents extends old_incidents, or None"""
+    added = {}
+    for kind, events in (new_incidents or {}).items():
+        old_events = (old_incidents or {}).get(kind, [])
+        if events[:len(old_events)] != old_events:
+            return None
+        added[kind] = events[len(old_events):]
+    return added
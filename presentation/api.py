@@ -0,0 +1,281 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import closing
+
+import flask
+
+from business.standings import compute_standings
+from data import library, watch
+from data.cache import get_dataset, has_dataset, put_dataset
+from data.schema import memory_report
+
+# Read-only data API for other tools (bots, stream overlays).
+# GET /api/v1/datasets/<key>/{laps,standings,stints} serves a cached dataset
+# (<key> is a dataset key, the sha1 of a results file, or 'live' for the
+# watched file) as JSON records (format=json), JSON columns (format=columns)
+# or an Arrow IPC stream (format=arrow, needs pyarrow). Columns are chosen
+# with fields=, rows with driver=, class=, lap_from=, lap_to=, offset= and
+# limit=. Dataset keys are content hashes, so the ETag of a response is known
+# from the key and the query alone: a poll with a matching If-None-Match is
+# answered 304 without loading or serializing anything. Off by default; set
+# DATA_API=True to enable the endpoints.
+API_ENABLED = os.environ.get('DATA_API', 'False') == 'True'
+API_PREFIX = '/api/v1'
+FORMATS = {
+    'json': 'application/json',
+    'columns': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+GZIP_MIN_BYTES = 1024
+# Part of every ETag; bump when the output of an endpoint changes
+_ETAG_VERSION = '2'
+
+STANDINGS_FIELDS = {
+    'OriginalPosition': 'Position', 'Driver': 'Driver', 'Class': 'Class', 'Car': 'Car', 'VehName': 'VehName',
+    'Lap': 'Lap', 'ET': 'ET', 'Gap': 'Gap', 'BestLap': 'BestLap', 'Led': 'Led', 'Pits': 'Pits', 'Up': 'Up',
+    'FCompound': 'FCompound', 'RCompound': 'RCompound'
+}
+
+# Serialized bodies by ETag, so clients polling without If-None-Match do not
+# recompute. Bounded by total size (per process); a body larger than the
+# whole budget is served but not kept.
+BODY_CACHE_BYTES = int(float(os.environ.get('API_BODY_CACHE_MB', '32')) * 1024 * 1024)
+_bodies = OrderedDict()
+_bodies_size = 0
+_bodies_lock = threading.Lock()
+
+
+class APIError(Exception):
+    """A request the API answers with an error status and a JSON message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def install_api(app):
+    """Registers the read-only data endpoints on the Dash server when enabled"""
+    if not API_ENABLED:
+        return False
+    server = app.server
+    if 'data_api' in server.blueprints:
+        return True
+    api = flask.Blueprint('data_api', __name__, url_prefix=API_PREFIX)
+    api.add_url_rule('/live', 'live', _live)
+    api.add_url_rule('/library/races', 'library_races', _library_races)
+    api.add_url_rule('/datasets/<key>', 'info', _table_view('info'))
+    for table in TABLES:
+        api.add_url_rule(f'/datasets/<key>/{table}', table, _table_view(table))
+    api.register_error_handler(APIError, lambda e: (flask.jsonify(error=str(e)), e.status))
+    server.register_blueprint(api)
+    return True
+
+
+def laps_table(df, args):
+    """The lap table of the dataset"""
+    return df
+
+
+def standings_table(df, args):
+    """Running order at ?lap= (default: the last lap), as in the Standings tab"""
+    lap = _int_arg(args, 'lap', int(df['Lap'].max()) if not df.empty else 0)
+    standings = compute_standings(df, lap)
+    if standings.empty:
+        return standings
+    fields = [field for field in STANDINGS_FIELDS if field in standings.columns]
+    return standings[fields].rename(columns=STANDINGS_FIELDS).reset_index(drop=True)
+
+
+def stints_table(df, args):
+    """One row per driver stint (data.library.stint_summary)"""
+    if df.empty:
+        return df
+    return library.stint_summary(df)
+
+
+TABLES = {'laps': laps_table, 'standings': standings_table, 'stints': stints_table}
+
+
+def _table_view(table):
+    def view(key):
+        key = _resolve_key(key)
+        args = flask.request.args
+        fmt = args.get('format', 'json')
+        if fmt not in FORMATS:
+            raise APIError(400, f"format must be one of {', '.join(FORMATS)}")
+        if fmt == 'arrow' and not _arrow_available():
+            raise APIError(406, 'format=arrow needs pyarrow installed on the server')
+        gzipped = table != 'info' and 'gzip' in flask.request.headers.get('Accept-Encoding', '')
+        etag = _etag(key, table, args, gzipped)
+        if etag in flask.request.if_none_match:
+            # The ETag is derived from the key, so it matches even for a dataset this server does not have
+            if not _known(key):
+                raise APIError(404, f'unknown dataset {key}')
+            return _response(b'', etag, status=304)
+        body = _cached_body(etag, lambda: _build(key, table, args, fmt, gzipped))
+        return _response(body, etag, FORMATS[fmt] if table != 'info' else 'application/json', gzipped)
+    view.__name__ = f'{table}_view'
+    return view
+
+
+def _build(key, table, args, fmt, gzipped):
+    entry = _dataset(key)
+    df, race_info, _ = entry
+    if table == 'info':
+        return json.dumps({'key': key, 'race_info': race_info, 'rows': len(df), 'columns': list(df.columns),
+                           'drivers': int(df['Driver'].nunique()) if not df.empty else 0,
+                           'memory': memory_report(df)}).encode('utf-8')
+    selected = _select(TABLES[table](df, args), args)
+    body = _serialize(selected, fmt)
+    if gzipped and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def _select(df, args):
+    """Applies the row (driver, class, lap range, offset/limit) and column (fields) selection"""
+    if df.empty:
+        return df
+    for arg, column in (('driver', 'Driver'), ('class', 'Class')):
+        values = args.getlist(arg)
+        if values and column in df.columns:
+            df = df[df[column].isin(values)]
+    if 'Lap' in df.columns:
+        lap_from, lap_to = _int_arg(args, 'lap_from', None), _int_arg(args, 'lap_to', None)
+        if lap_from is not None:
+            df = df[df['Lap'] >= lap_from]
+        if lap_to is not None:
+            df = df[df['Lap'] <= lap_to]
+    offset, limit = _int_arg(args, 'offset', 0), _int_arg(args, 'limit', None)
+    if offset or limit is not None:
+        df = df.iloc[offset:offset + limit if limit is not None else None]
+    fields = [field for field in args.get('fields', '').split(',') if field]
+    if fields:
+        unknown = [field for field in fields if field not in df.columns]
+        if unknown:
+            raise APIError(400, f"unknown fields {', '.join(unknown)}; available: {', '.join(df.columns)}")
+        df = df[fields]
+    return df
+
+
+def _serialize(df, fmt):
+    if fmt == 'arrow':
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if fmt == 'columns':
+        columns = ','.join(f'{json.dumps(str(column))}:{df[column].to_json(orient="values", double_precision=15)}'
+                           for column in df.columns)
+        return ('{' + columns + '}').encode('utf-8')
+    return df.to_json(orient='records', double_precision=15).encode('utf-8')
+
+
+def _resolve_key(key):
+    """Maps the 'live' alias to the watched file's current dataset key"""
+    if key == 'live':
+        latest = watch.latest_dataset() if watch.enabled() else None
+        if latest is None:
+            raise APIError(404, 'no live results file')
+        return latest
+    return key
+
+
+def _dataset(key):
+    """Returns (df, race_info, incidents) of a dataset key, loading library races into the cache"""
+    entry = get_dataset(key)
+    if entry is None and library.enabled():
+        with closing(library.connect()) as conn:
+            race_id = library.find_race(conn, key)
+            race = library.load_race(conn, race_id) if race_id is not None else None
+        if race is not None:
+            put_dataset(*race)
+            entry = race[1:]
+    if entry is None:
+        raise APIError(404, f'unknown dataset {key}')
+    return entry
+
+
+def _known(key):
+    """True when _dataset would find key, checked without loading it"""
+    if has_dataset(key):
+        return True
+    if library.enabled():
+        with closing(library.connect()) as conn:
+            return library.find_race(conn, key) is not None
+    return False
+
+
+def _etag(key, table, args, gzipped):
+    query = sorted((name, value) for name, values in args.lists() for value in values)
+    digest = hashlib.sha1(json.dumps([_ETAG_VERSION, key, table, query]).encode('utf-8')).hexdigest()
+    return f'{digest}.gz' if gzipped else digest
+
+
+def _cached_body(etag, build):
+    global _bodies_size
+    with _bodies_lock:
+        body = _bodies.get(etag)
+        if body is not None:
+            _bodies.move_to_end(etag)
+            return body
+    body = build()
+    if len(body) > BODY_CACHE_BYTES:
+        return body
+    with _bodies_lock:
+        if etag not in _bodies:
+            _bodies[etag] = body
+            _bodies_size += len(body)
+        while _bodies_size > BODY_CACHE_BYTES:
+            _, evicted = _bodies.popitem(last=False)
+            _bodies_size -= len(evicted)
+    return body
+
+
+def _response(body, etag, mimetype=None, gzipped=False, status=200):
+    response = flask.Response(body, status=status, mimetype=mimetype)
+    response.set_etag(etag)
+    # Clients may keep responses but must revalidate (a cheap 304) before reusing them
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if gzipped and body[:2] == b'\x1f\x8b':
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def _live():
+    """Current dataset key of the watched results file"""
+    return flask.jsonify(key=_resolve_key('live'))
+
+
+def _library_races():
+    """Races of the results library with their dataset keys; paths are relative to the library directory"""
+    if not library.enabled():
+        raise APIError(404, 'the results library is not enabled')
+    with closing(library.connect()) as conn:
+        races = library.list_races(conn)
+    return flask.jsonify([dict(race, path=library.relative_path(race['path']), key=race['sha1']) for race in races])
+
+
+def _int_arg(args, name, default):
+    value = args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise APIError(400, f'{name} must be an integer')
+
+
+def _arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+from data.cache import disk_enabled, private_dir
+
+# Background jobs for long-running callbacks (upload parsing).
+# With dash[diskcache] installed, uploads are parsed in a subprocess by
+# Dash's DiskcacheManager and the browser polls for progress and the
+# result, so a long endurance file never holds a waitress thread or a
+# gunicorn worker. Without it (or with BACKGROUND_UPLOADS=False, with a
+# memory-only dataset cache, whose entries a job could not hand back, and in
+# the standalone build) uploads are parsed inside the request as before.
+BACKGROUND_UPLOADS = os.environ.get('BACKGROUND_UPLOADS', 'True') == 'True'
+# Job arguments and results are pickled there, so it must be private like the dataset cache
+BACKGROUND_CACHE_DIR = os.environ.get('BACKGROUND_CACHE_DIR', os.path.join(
+    tempfile.gettempdir(), f"rf2-lmu-charts-jobs-{os.getuid() if hasattr(os, 'getuid') else 'user'}"))
+# Seconds a finished job result is kept for the browser to collect
+BACKGROUND_EXPIRE = int(os.environ.get('BACKGROUND_EXPIRE', '600'))
+
+
+def background_manager():
+    """Returns the background callback manager, or None to run callbacks in the request"""
+    if (not BACKGROUND_UPLOADS or getattr(sys, 'frozen', False) or not disk_enabled()
+            or not private_dir(BACKGROUND_CACHE_DIR)):
+        return None
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        return DiskcacheManager(diskcache.Cache(BACKGROUND_CACHE_DIR), expire=BACKGROUND_EXPIRE)
+    except ImportError:
+        # DiskcacheManager also needs psutil and multiprocess
+        return None
+
+
+def upload_progress(filename, drivers_parsed, total_drivers, laps_parsed):
+    """Returns the parse progress text shown in the upload area"""
+    return f'Parsing {filename}: {drivers_parsed}/{total_drivers} drivers, {laps_parsed} laps'
+
+
+def scan_progress(files_done, total_files, summary):
+    """Returns the library rescan text: progress while running, the summary when files_done is None"""
+    counts = f"{summary['added']} added, {summary['skipped']} unchanged"
+    errors = summary['errors'] if isinstance(summary['errors'], int) else len(summary['errors'])
+    if errors:
+        counts += f', {errors} failed'
+    duplicates = summary.get('duplicates', 0)
+    duplicates = duplicates if isinstance(duplicates, int) else len(duplicates)
+    if duplicates:
+        counts += f', {duplicates} duplicates'
+    if files_done is None:
+        return f'Library scanned: {counts}'
+    return f'Scanning library: {files_done}/{total_files} files ({counts})'
@@ -1,35 +1,109 @@
 import dash
-from dash import html, dcc, Input, Output, State
+from dash import html, dcc, Input, Output, State, Patch
 import pandas as pd
 import base64
-from data.parsers import parse_xml_scores
-from business.analytics import (
-    update_position_chart, update_gap_chart, update_class_gap_chart,
-    update_laptime_chart, update_laptime_no_pit_chart,
-    update_fuel_chart, update_ve_chart, update_tire_wear_chart,
-    update_fuel_level_chart, update_ve_level_chart, update_tire_consumption_chart,
-    update_consistency_chart, update_tire_degradation_chart, update_pace_decay_chart,
-    update_strategy_gantt_chart
+import os
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from data import library, watch
+from data.cache import dataset_key, put_dataset, get_dataset, get_dataframe, has_dataset
+from data.metadata import dataset_metadata, max_lap
+from data.schema import memory_report
+from presentation.metrics import instrument_callbacks, data_phase, observe_rows, set_view
+from presentation.profiling import install_profiler
+from presentation.background import background_manager, upload_progress, scan_progress
+from presentation.chart_executor import build_charts
+from presentation.upload_limits import MAX_UPLOAD_MB, install_request_limit, decoded_size
+from presentation.api import install_api
+from presentation.components import (
+    build_laptimes_view, create_laptimes_page, create_laptimes_controls,
+    create_degradation_controls, create_degradation_table, library_race_options,
+    race_label, create_comparison_controls, create_season_controls, create_season_table, memory_text
 )
 
-def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
+# Chart builders (business.analytics and its numpy/plotly helpers), the XML
+# parser and the lap matrix are imported inside the callbacks that use them,
+# so the server starts without loading them and each tab pays for its
+# builders on first use.
+
+# Sorted lap-times views keyed by dataset, filters and sort options.
+# Paging through a view only slices it, so each page request costs the same
+# regardless of race length or page number.
+_LAPTIMES_VIEW_CACHE_SIZE = 16
+_laptimes_views = OrderedDict()
+_laptimes_views_lock = threading.Lock()
+
+# Per-race comparison tables (business.comparison.race_tables) keyed by
+# dataset, so adding a race to the Compare tab only computes that race
+_COMPARISON_CACHE_SIZE = 32
+_comparison_cache = OrderedDict()
+_comparison_tables_lock = threading.Lock()
+
+# Season totals of the results library per points table, with the (race id,
+# sha1) pairs they include, so new races are added without re-reading the rest
+_SEASON_CACHE_SIZE = 8
+_season_totals = OrderedDict()
+_season_totals_lock = threading.Lock()
+
+# Fields larger than this open the Position tab on the heatmap lap chart
+LAP_CHART_HEATMAP_MIN_DRIVERS = int(os.environ.get('LAP_CHART_HEATMAP_MIN_DRIVERS', '40'))
+
+# (graph id, business.analytics builder) of the tabs made of independent
+# charts, built together by build_charts (in the chart pool when enabled)
+TAB_CHARTS = {
+    'tab-gap': [
+        ('class-gap-chart', 'update_class_gap_chart'),
+        ('gap-chart', 'update_gap_chart'),
+        ('class-interval-chart', 'update_class_interval_chart'),
+        ('interval-chart', 'update_interval_chart'),
+        ('battle-chart', 'update_battle_chart')
+    ],
+    'tab-fuel': [
+        ('fuel-level-chart', 'update_fuel_level_chart'),
+        ('fuel-chart', 'update_fuel_chart'),
+        ('ve-level-chart', 'update_ve_level_chart'),
+        ('ve-chart', 'update_ve_chart')
+    ],
+    'tab-tires': [
+        ('pace-decay-chart', 'update_pace_decay_chart'),
+        ('tire-wear-chart', 'update_tire_wear_chart'),
+        ('tire-consumption-chart', 'update_tire_consumption_chart'),
+        ('tire-degradation-chart', 'update_tire_degradation_chart')
+    ]
+}
+POSITION_VIEW_CHARTS = {'lines': 'update_position_chart', 'heatmap': 'update_lap_chart_heatmap'}
+
+def register_callbacks(app, initial_df, initial_race_info, initial_incidents, initial_dataset_key=None):
     """Registra todos os callbacks da aplicação"""
+    # Same as app.callback, recording latency and payload metrics when enabled
+    callback = instrument_callbacks(app)
+    # cProfile capture of callback requests when enabled
+    install_profiler(app)
+    # 413 for request bodies over MAX_REQUEST_MB, before they are read
+    install_request_limit(app)
+    # Read-only JSON/Arrow data endpoints under /api/v1
+    install_api(app)
+    initial_metadata = dataset_metadata(initial_df)
     
-    @app.callback(
+    @callback(
         Output('tabs-content', 'children'),
         [Input('tabs', 'value'),
-         Input('stored-data', 'data'),
+         Input('dataset-key', 'data'),
          Input('class-filter', 'value'),
          Input('driver-filter', 'value'),
          Input('car-filter', 'value'),
          Input('veh-filter', 'value'),
          Input('cartype-filter', 'value'),
          Input('stored-incidents', 'data')],
-        [State('standings-lap-store', 'data')],
+        [State('standings-lap-store', 'data'),
+         State('session-races', 'data'),
+         State('dataset-meta', 'data')],
         prevent_initial_call=False
     )
-    def render_tab_content(active_tab, data, selected_classes, selected_drivers, selected_cars, selected_veh, selected_cartype, incidents, stored_lap):
+    def render_tab_content(active_tab, key, selected_classes, selected_drivers, selected_cars, selected_veh, selected_cartype, incidents, stored_lap, session_races, metadata):
         ctx = dash.callback_context
+        set_view(active_tab)
         
         # If we're on standings tab and only non-class filters changed, don't update
         if active_tab == 'tab-standings' and ctx.triggered:
@@ -37,39 +111,47 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
             if trigger_id in ['driver-filter', 'car-filter', 'veh-filter', 'cartype-filter']:
                 raise dash.exceptions.PreventUpdate
         
-        df = pd.DataFrame(data)
+        if active_tab in ('tab-compare', 'tab-season'):
+            # Comparison and season have their own race selection
+            if ctx.triggered and ctx.triggered[0]['prop_id'] != 'tabs.value':
+                raise dash.exceptions.PreventUpdate
+            if active_tab == 'tab-season':
+                from business.championship import points_table
+                return create_season_controls(points_table())
+            return create_comparison_controls(_comparison_options(session_races), [key] if key else [])
+        
+        if _expired(key):
+            return _expired_notice()
         
         if active_tab == 'tab-standings':
             # For standings, only apply class filter
-            if selected_classes:
-                df = df[df['Class'].isin(selected_classes)]
-            data = df.to_dict('records')
-        elif not df.empty:
-            # For other tabs, apply all filters
-            if selected_drivers:
-                df = df[df['Driver'].isin(selected_drivers)]
-            if selected_classes:
-                df = df[df['Class'].isin(selected_classes)]
-            if selected_cars:
-                df = df[df['Car'].isin(selected_cars)]
-            if selected_veh:
-                df = df[df['VehName'].isin(selected_veh)]
-            if selected_cartype:
-                df = df[df['CarType'].isin(selected_cartype)]
-            data = df.to_dict('records')
+            if metadata is None:
+                # Requests without the metadata store (pages from older versions, scripts)
+                metadata = dataset_metadata(_cached_frame(key))
+            return _render_standings_tab(not _standings_frame(key, selected_classes).empty, stored_lap,
+                                         max_lap(metadata, selected_classes))
         
-        if active_tab == 'tab-standings':
-            return _render_standings_tab(data, stored_lap)
-        elif active_tab == 'tab-position':
-            return html.Div([
-                dcc.Graph(id='position-chart', figure=update_position_chart(data, None, None)),
-                dcc.Graph(id='strategy-gantt-chart', figure=update_strategy_gantt_chart(data, None, None))
-            ])
-        elif active_tab == 'tab-gap':
+        # Charts read the cached dataset and select drivers from its lap matrix
+        data, drivers = _chart_inputs(key, (selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype))
+        
+        if active_tab == 'tab-position':
+            view = 'heatmap' if _driver_count(data, drivers) > LAP_CHART_HEATMAP_MIN_DRIVERS else 'lines'
+            position, gantt = build_charts([POSITION_VIEW_CHARTS[view], 'update_strategy_gantt_chart'], key, data, drivers)
             return html.Div([
-                dcc.Graph(id='class-gap-chart', figure=update_class_gap_chart(data, None, None)),
-                dcc.Graph(id='gap-chart', figure=update_gap_chart(data, None, None))
+                dcc.RadioItems(id='position-view', options=[
+                    {'label': ' Lines', 'value': 'lines'},
+                    {'label': ' Lap Chart', 'value': 'heatmap'}
+                ], value=view, inline=True, style={'fontSize': '12px', 'padding': '10px 20px 0 20px'}),
+                dcc.Graph(id='position-chart', figure=position),
+                dcc.Graph(id='strategy-gantt-chart', figure=gantt)
             ])
+        elif active_tab in TAB_CHARTS:
+            charts = TAB_CHARTS[active_tab]
+            figures = build_charts([builder for _, builder in charts], key, data, drivers)
+            graphs = [dcc.Graph(id=graph_id, figure=figure) for (graph_id, _), figure in zip(charts, figures)]
+            if active_tab == 'tab-tires':
+                graphs.append(create_degradation_controls())
+            return html.Div(graphs)
         elif active_tab == 'tab-laptimes':
             return html.Div([
                 dcc.Tabs(id='laptimes-tabs', value='laptimes-charts', children=[
@@ -78,20 +160,6 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
                 ]),
                 html.Div(id='laptimes-content')
             ], style={'padding': '10px 20px 0 20px'})
-        elif active_tab == 'tab-fuel':
-            return html.Div([
-                dcc.Graph(id='fuel-level-chart', figure=update_fuel_level_chart(data, None, None)),
-                dcc.Graph(id='fuel-chart', figure=update_fuel_chart(data, None, None)),
-                dcc.Graph(id='ve-level-chart', figure=update_ve_level_chart(data, None, None)),
-                dcc.Graph(id='ve-chart', figure=update_ve_chart(data, None, None))
-            ])
-        elif active_tab == 'tab-tires':
-            return html.Div([
-                dcc.Graph(id='pace-decay-chart', figure=update_pace_decay_chart(data, None, None)),
-                dcc.Graph(id='tire-wear-chart', figure=update_tire_wear_chart(data, None, None)),
-                dcc.Graph(id='tire-consumption-chart', figure=update_tire_consumption_chart(data, None, None)),
-                dcc.Graph(id='tire-degradation-chart', figure=update_tire_degradation_chart(data, None, None))
-            ])
         elif active_tab == 'tab-incidents':
             return html.Div([
                 dcc.Tabs(id='events-tabs', value='events-chat', children=[
@@ -102,72 +170,109 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
                 html.Div(id='events-content', style={'padding': '20px 40px'})
             ], style={'padding': '10px 20px 0 20px'})
 
-    @app.callback(
+    @callback(
+        Output('position-chart', 'figure'),
+        Input('position-view', 'value'),
+        [State('dataset-key', 'data'),
+         State('driver-filter', 'value'),
+         State('class-filter', 'value'),
+         State('car-filter', 'value'),
+         State('veh-filter', 'value'),
+         State('cartype-filter', 'value')],
+        prevent_initial_call=True
+    )
+    def switch_position_view(view, key, selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype):
+        if _expired(key):
+            raise dash.exceptions.PreventUpdate
+        data, drivers = _chart_inputs(key, (selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype))
+        return _position_figure(view, data, drivers)
+
+    @callback(
         Output('laptimes-content', 'children'),
         [Input('laptimes-tabs', 'value'),
-         Input('stored-data', 'data'),
+         Input('dataset-key', 'data'),
          Input('driver-filter', 'value'),
          Input('class-filter', 'value'),
          Input('car-filter', 'value'),
          Input('veh-filter', 'value'),
          Input('cartype-filter', 'value')]
     )
-    def render_laptimes_content(active_laptimes_tab, data, selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype):
-        df = pd.DataFrame(data)
-        
-        # Apply all filters
-        if not df.empty:
-            if selected_drivers:
-                df = df[df['Driver'].isin(selected_drivers)]
-            if selected_classes:
-                df = df[df['Class'].isin(selected_classes)]
-            if selected_cars:
-                df = df[df['Car'].isin(selected_cars)]
-            if selected_veh:
-                df = df[df['VehName'].isin(selected_veh)]
-            if selected_cartype:
-                df = df[df['CarType'].isin(selected_cartype)]
-        
-        filtered_data = df.to_dict('records')
+    def render_laptimes_content(active_laptimes_tab, key, selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype):
+        filters = (selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype)
+        set_view(active_laptimes_tab)
+        if _expired(key):
+            return _expired_notice()
         
         if active_laptimes_tab == 'laptimes-charts':
+            from business.analytics import update_laptime_chart, update_laptime_no_pit_chart, update_consistency_chart
+            data, drivers = _chart_inputs(key, filters)
             return html.Div([
-                dcc.Graph(id='laptime-no-pit-chart', figure=update_laptime_no_pit_chart(filtered_data, None, None)),
-                dcc.Graph(id='laptime-chart', figure=update_laptime_chart(filtered_data, None, None)),
-                dcc.Graph(id='consistency-chart', figure=update_consistency_chart(filtered_data, None, None))
+                dcc.Graph(id='laptime-no-pit-chart', figure=update_laptime_no_pit_chart(data, drivers, None)),
+                dcc.Graph(id='laptime-chart', figure=update_laptime_chart(data, drivers, None)),
+                dcc.Graph(id='consistency-chart', figure=update_consistency_chart(data, drivers, None))
             ])
         elif active_laptimes_tab == 'laptimes-table':
+            df = _cached_frame(key)
+            if not df.empty:
+                df = _apply_filters(df, filters)
             return _create_laptimes_table(df)
 
-    @app.callback(
-        [Output('stored-data', 'data'),
-         Output('stored-race-info', 'data'),
-         Output('stored-incidents', 'data'),
-         Output('upload-status', 'children')],
-        Input('upload-data', 'contents'),
-        State('upload-data', 'filename')
-    )
-    def update_data(contents, filename):
+    upload_outputs = [Output('stored-race-info', 'data'),
+                      Output('stored-incidents', 'data'),
+                      Output('dataset-key', 'data'),
+                      Output('dataset-meta', 'data'),
+                      Output('upload-status', 'children')]
+    manager = background_manager()
+    if manager is not None:
+        # Parsed in a background job; the layout already carries the initial dataset
+        @callback(
+            upload_outputs,
+            Input('upload-data', 'contents'),
+            State('upload-data', 'filename'),
+            background=True,
+            manager=manager,
+            progress=Output('upload-progress', 'children'),
+            progress_default='',
+            running=[(Output('upload-data', 'disabled'), True, False)],
+            prevent_initial_call=True
+        )
+        def update_data(set_progress, contents, filename):
+            return load_upload(contents, filename, lambda *counts: set_progress(upload_progress(filename, *counts)))
+    else:
+        @callback(
+            upload_outputs,
+            Input('upload-data', 'contents'),
+            State('upload-data', 'filename')
+        )
+        def update_data(contents, filename):
+            return load_upload(contents, filename)
+
+    def load_upload(contents, filename, progress=None):
         if contents is None:
-            return initial_df.to_dict('records'), initial_race_info, initial_incidents, ''
+            return initial_race_info, initial_incidents, initial_dataset_key, initial_metadata, ''
         
         content_type, content_string = contents.split(',')
-        decoded = base64.b64decode(content_string)
         
-        # Check file size (20MB limit)
-        file_size_mb = len(decoded) / (1024 * 1024)
-        if file_size_mb > 20:
-            return initial_df.to_dict('records'), initial_race_info, initial_incidents, html.Div([
+        # Check file size before decoding anything
+        file_size_mb = decoded_size(content_string) / (1024 * 1024)
+        if file_size_mb > MAX_UPLOAD_MB:
+            return initial_race_info, initial_incidents, initial_dataset_key, initial_metadata, html.Div([
                 html.Span(['❌', html.Span('', className='emoji-icon')], style={'fontSize': '16px'}),
-                html.Span(f'File {filename} is too large ({file_size_mb:.1f}MB). Maximum allowed size is 20MB.', 
+                html.Span(f'File {filename} is too large ({file_size_mb:.1f}MB). Maximum allowed size is {MAX_UPLOAD_MB:g}MB.', 
                          style={'color': '#dc3545', 'fontWeight': 'bold'})
             ], style={'textAlign': 'center', 'padding': '10px', 'backgroundColor': '#f8d7da', 'border': '1px solid #f5c6cb', 'borderRadius': '5px', 'margin': '10px'})
         
         try:
-            df, race_info, incidents = parse_xml_scores(decoded.decode('utf-8'))
-            return df.to_dict('records'), race_info, incidents, html.Div([
+            from data.parsers import parse_xml_scores
+            decoded = base64.b64decode(content_string)
+            # The parser reads the bytes (and their declared encoding) without a decoded str copy
+            df, race_info, incidents = data_phase(parse_xml_scores)(decoded, progress)
+            observe_rows(len(df))
+            key = put_dataset(dataset_key(decoded), df, race_info, incidents)
+            return race_info, incidents, key, dataset_metadata(df), html.Div([
                 html.Span(['✅', html.Span('', className='emoji-icon')], style={'fontSize': '16px'}),
-                html.Span(f'{filename} loaded successfully!', style={'color': '#28a745', 'fontWeight': 'bold'})
+                html.Span(f'{filename} loaded successfully!', style={'color': '#28a745', 'fontWeight': 'bold'}),
+                html.Div(memory_text(memory_report(df)), id='dataset-memory', style={'fontSize': '11px', 'color': '#6c757d'})
             ], id='success-message', style={
                 'position': 'fixed', 'top': '20px', 'right': '20px', 'zIndex': '9999',
                 'textAlign': 'center', 'padding': '10px 15px', 'backgroundColor': '#d4edda', 
@@ -175,12 +280,127 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
                 'animation': 'fadeOut 0.5s ease-in-out 3s forwards'
             })
         except Exception as e:
-            return initial_df.to_dict('records'), initial_race_info, initial_incidents, html.Div([
+            return initial_race_info, initial_incidents, initial_dataset_key, initial_metadata, html.Div([
                 html.Span(['❌', html.Span('', className='emoji-icon')], style={'fontSize': '16px'}),
                 html.Span(f'Error loading {filename}: {str(e)}', style={'color': '#dc3545', 'fontWeight': 'bold'})
             ], style={'textAlign': 'center', 'padding': '10px', 'backgroundColor': '#f8d7da', 'border': '1px solid #f5c6cb', 'borderRadius': '5px', 'margin': '10px'})
 
-    @app.callback(
+    if library.enabled():
+        register_library_callbacks(callback, manager)
+    if watch.enabled():
+        register_watch_callbacks(callback)
+
+    @callback(
+        Output('session-races', 'data'),
+        Input('dataset-key', 'data'),
+        [State('stored-race-info', 'data'),
+         State('session-races', 'data')]
+    )
+    def remember_session_race(key, race_info, session_races):
+        session_races = session_races or []
+        if not key or any(race['value'] == key for race in session_races):
+            raise dash.exceptions.PreventUpdate
+        return session_races + [{'label': race_label(race_info), 'value': key}]
+
+    @callback(
+        Output('compare-races', 'options'),
+        Input('session-races', 'data'),
+        prevent_initial_call=True
+    )
+    def update_comparison_options(session_races):
+        return _comparison_options(session_races)
+
+    @callback(
+        [Output('comparison-charts', 'children'),
+         Output('compare-driver', 'options')],
+        [Input('compare-races', 'value'),
+         Input('compare-driver', 'value')],
+        State('compare-races', 'options')
+    )
+    def update_race_comparison(selected, driver, options):
+        if not selected:
+            return html.P('Select one or more races to compare'), []
+        from business.comparison import combine_races, race_comparison_drivers
+        from business import analytics
+        labels = {option['value']: option['label'] for option in options or []}
+        races = []
+        for value in selected:
+            # Races evicted from the dataset cache since they were loaded are left out
+            tables = _comparison_tables(value)
+            if tables is not None:
+                races.append((labels.get(value, str(value)), tables))
+        laps, fits = combine_races(races)
+        observe_rows(len(laps))
+        return html.Div([
+            dcc.Graph(id='race-laptime-comparison-chart', figure=analytics.build_race_laptime_comparison_chart(laps, driver)),
+            dcc.Graph(id='race-degradation-comparison-chart', figure=analytics.build_race_degradation_comparison_chart(fits, driver)),
+            dcc.Graph(id='race-fuel-comparison-chart', figure=analytics.build_race_fuel_comparison_chart(laps, driver))
+        ]), [{'label': d, 'value': d} for d in race_comparison_drivers(laps)]
+
+    @callback(
+        [Output('laptimes-table-page', 'children'),
+         Output('laptimes-page', 'data'),
+         Output('laptimes-page-label', 'children')],
+        [Input('laptimes-prev', 'n_clicks'),
+         Input('laptimes-next', 'n_clicks'),
+         Input('laptimes-sort', 'value'),
+         Input('laptimes-sort-dir', 'value'),
+         Input('laptimes-group', 'value'),
+         Input('laptimes-lap-type', 'value'),
+         Input('laptimes-page-size', 'value')],
+        [State('laptimes-page', 'data'),
+         State('dataset-key', 'data'),
+         State('driver-filter', 'value'),
+         State('class-filter', 'value'),
+         State('car-filter', 'value'),
+         State('veh-filter', 'value'),
+         State('cartype-filter', 'value')]
+    )
+    def update_laptimes_page(prev_clicks, next_clicks, sort_by, sort_dir, group, lap_type, page_size, page, key,
+                             selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype):
+        filters = (selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype)
+        group_by_driver = bool(group)
+        view = _get_laptimes_view(key, filters, sort_by, sort_dir == 'asc', group_by_driver, lap_type)
+        if view is None:
+            return _expired_notice(), 0, ''
+        if view.empty:
+            return html.P('No lap time data available'), 0, ''
+        
+        # Paging buttons move one page, any other control goes back to the first page
+        trigger_id = dash.callback_context.triggered_id
+        page = page or 0
+        if trigger_id == 'laptimes-prev':
+            page -= 1
+        elif trigger_id == 'laptimes-next':
+            page += 1
+        else:
+            page = 0
+        
+        page_size = page_size or 100
+        total_pages = max(1, -(-len(view) // page_size))
+        page = min(max(page, 0), total_pages - 1)
+        
+        label = f"Page {page + 1} of {total_pages} ({len(view)} laps)"
+        return create_laptimes_page(view, page, page_size, group_by_driver), page, label
+
+    @callback(
+        Output('degradation-table', 'children'),
+        [Input('degradation-sort', 'value'),
+         Input('degradation-sort-dir', 'value')],
+        [State('dataset-key', 'data'),
+         State('driver-filter', 'value'),
+         State('class-filter', 'value'),
+         State('car-filter', 'value'),
+         State('veh-filter', 'value'),
+         State('cartype-filter', 'value')]
+    )
+    def update_degradation_table(sort_by, sort_dir, key, selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype):
+        if _expired(key):
+            return _expired_notice()
+        df, drivers = _chart_inputs(key, (selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype))
+        return create_degradation_table(_degradation_rates(df, drivers), sort_by, sort_dir == 'asc')
+
+    @callback(
         [Output('class-filter', 'options'),
          Output('driver-filter', 'options'),
          Output('car-filter', 'options'),
@@ -191,22 +411,29 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
          Output('car-filter', 'value'),
          Output('veh-filter', 'value'),
          Output('cartype-filter', 'value')],
-        Input('stored-data', 'data')
+        Input('dataset-meta', 'data'),
+        [State('class-filter', 'value'),
+         State('driver-filter', 'value'),
+         State('car-filter', 'value'),
+         State('veh-filter', 'value'),
+         State('cartype-filter', 'value')]
     )
-    def update_filters(data):
-        df = pd.DataFrame(data)
-        if df.empty:
+    def update_filters(metadata, *selected):
+        if not metadata or not metadata['drivers']:
             return [], [], [], [], [], None, None, None, None, None
         
-        drivers = [{'label': d, 'value': d} for d in sorted(df['Driver'].unique())]
-        classes = [{'label': c, 'value': c} for c in sorted(df['Class'].unique())]
-        cars = [{'label': c, 'value': c} for c in sorted(df['Car'].unique())]
-        vehs = [{'label': v, 'value': v} for v in sorted(df['VehName'].unique()) if v]
-        cartypes = [{'label': ct, 'value': ct} for ct in sorted(df['CarType'].unique()) if ct]
+        # Values come already sorted (and without empty vehicles/car types) from the dataset metadata
+        options = [[{'label': v, 'value': v} for v in metadata[name]]
+                   for name in ('classes', 'drivers', 'teams', 'vehicles', 'car_types')]
         
-        return classes, drivers, cars, vehs, cartypes, None, None, None, None, None
+        if watch.enabled():
+            # Live data grows every few seconds: keep the selections that still exist
+            values = [[v for v in (value or []) if v in {o['value'] for o in opts}] or None
+                      for value, opts in zip(selected, options)]
+            return (*options, *values)
+        return (*options, None, None, None, None, None)
 
-    @app.callback(
+    @callback(
         Output('race-info', 'children'),
         Input('stored-race-info', 'data')
     )
@@ -275,7 +502,7 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
             ], style={'marginTop': '5px'})
         ])
 
-    @app.callback(
+    @callback(
         Output('events-content', 'children'),
         [Input('events-tabs', 'value'),
          Input('stored-incidents', 'data')]
@@ -324,32 +551,36 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
                 html.Tbody([html.Tr([html.Td(f"{msg['et']}s", style=td_style), html.Td(msg['message'], style=td_style)]) for msg in messages])
             ], style=table_style)
 
-    @app.callback(
+    @callback(
         Output('standings-lap-store', 'data'),
         Input('standings-lap-selector', 'value')
     )
     def store_selected_lap(selected_lap):
         return selected_lap
 
-    @app.callback(
+    @callback(
         Output('standings-table', 'children'),
-        [Input('standings-lap-selector', 'value'),
-         Input('standings-filtered-data', 'data')]
+        Input('standings-lap-selector', 'value'),
+        [State('dataset-key', 'data'),
+         State('class-filter', 'value')]
     )
-    def update_standings_table(selected_lap, data):
+    def update_standings_table(selected_lap, key, selected_classes):
         from presentation.components import create_standings_table
-        return create_standings_table(selected_lap, data)
+        if _expired(key):
+            return _expired_notice()
+        # The class filter re-renders the whole tab, so reading it as State is enough
+        return create_standings_table(selected_lap, _standings_frame(key, selected_classes))
 
-    @app.callback(
+    @callback(
         Output('laptimes-tab-store', 'data'),
         Input('laptimes-tabs', 'value')
     )
     def store_laptimes_tab(selected_tab):
         return selected_tab
 
-    @app.callback(
+    @callback(
         Output('laptimes-tabs', 'value'),
-        [Input('stored-data', 'data'),
+        [Input('dataset-key', 'data'),
          Input('driver-filter', 'value'),
          Input('class-filter', 'value'),
          Input('car-filter', 'value'),
@@ -357,156 +588,331 @@ def register_callbacks(app, initial_df, initial_race_info, initial_incidents):
          Input('cartype-filter', 'value')],
         [State('laptimes-tab-store', 'data')]
     )
-    def restore_laptimes_tab(data, selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype, stored_tab):
+    def restore_laptimes_tab(key, selected_drivers, selected_classes, selected_cars, selected_veh, selected_cartype, stored_tab):
         return stored_tab
 
-    @app.callback(
+    @callback(
         Output('events-tab-store', 'data'),
         Input('events-tabs', 'value')
     )
     def store_events_tab(selected_tab):
         return selected_tab
 
-    @app.callback(
+    @callback(
         Output('events-tabs', 'value'),
-        [Input('stored-data', 'data'),
+        [Input('dataset-key', 'data'),
          Input('class-filter', 'value')],
         [State('events-tab-store', 'data')]
     )
-    def restore_events_tab(data, selected_classes, stored_tab):
+    def restore_events_tab(key, selected_classes, stored_tab):
         return stored_tab
 
+def register_library_callbacks(callback, manager=None):
+    """Registra os callbacks do seletor da biblioteca local de resultados"""
+    @callback(
+        Output('library-race', 'options'),
+        Input('library-scan', 'data')
+    )
+    def update_library_options(summary):
+        # Listing is a quick query; the initial call fills the dropdown
+        with closing(library.connect()) as conn:
+            return library_race_options(library.list_races(conn))
+
+    if manager is not None:
+        # Rescan parses every new file: a background job, so no request thread waits for it
+        @callback(
+            [Output('library-scan', 'data'),
+             Output('library-status', 'children')],
+            Input('library-refresh', 'n_clicks'),
+            background=True,
+            manager=manager,
+            progress=Output('library-progress', 'children'),
+            progress_default='',
+            running=[(Output('library-refresh', 'disabled'), True, False)],
+            prevent_initial_call=True
+        )
+        def rescan_library(set_progress, n_clicks):
+            return scan_library(lambda *counts: set_progress(scan_progress(*counts)))
+    else:
+        @callback(
+            [Output('library-scan', 'data'),
+             Output('library-status', 'children')],
+            Input('library-refresh', 'n_clicks'),
+            prevent_initial_call=True
+        )
+        def rescan_library(n_clicks):
+            return scan_library()
+
+    def scan_library(progress=None):
+        with closing(library.connect()) as conn:
+            summary = library.scan_directory(conn, progress=progress)
+        summary = {**summary, 'errors': len(summary['errors']), 'duplicates': len(summary['duplicates'])}
+        return summary, scan_progress(None, None, summary)
+
+    @callback(
+        [Output('stored-race-info', 'data', allow_duplicate=True),
+         Output('stored-incidents', 'data', allow_duplicate=True),
+         Output('dataset-key', 'data', allow_duplicate=True),
+         Output('dataset-meta', 'data', allow_duplicate=True),
+         Output('upload-status', 'children', allow_duplicate=True)],
+        Input('library-race', 'value'),
+        prevent_initial_call=True
+    )
+    def load_library_race(race_id):
+        if race_id is None:
+            raise dash.exceptions.PreventUpdate
+        race = _library_dataset(race_id)
+        if race is None:
+            raise dash.exceptions.PreventUpdate
+        key, df, race_info, incidents = race
+        observe_rows(len(df))
+        return race_info, incidents, key, dataset_metadata(df), ''
+
+    @callback(
+        [Output('season-table', 'children'),
+         Output('season-class', 'options')],
+        [Input('season-points', 'value'),
+         Input('season-class', 'value'),
+         Input('library-race', 'options')]
+    )
+    def update_season_table(points, car_class, library_races):
+        from business.championship import points_table
+        try:
+            points = points_table(points or '')
+        except ValueError:
+            return html.P('Points must be a comma separated list of numbers', style={'color': '#dc3545'}), dash.no_update
+        standings = _season_standings(points)
+        classes = [{'label': c, 'value': c} for c in sorted(standings['Class'].unique())]
+        if car_class:
+            standings = standings[standings['Class'] == car_class]
+        return create_season_table(standings), classes
+
+
+def register_watch_callbacks(callback):
+    """Registra o callback que acompanha o arquivo de resultados ao vivo (WATCH_RESULTS)"""
+    @callback(
+        [Output('stored-race-info', 'data', allow_duplicate=True),
+         Output('stored-incidents', 'data', allow_duplicate=True),
+         Output('dataset-key', 'data', allow_duplicate=True),
+         Output('dataset-meta', 'data', allow_duplicate=True)],
+        Input('watch-interval', 'n_intervals'),
+        State('dataset-key', 'data'),
+        prevent_initial_call=True
+    )
+    def follow_results(n_intervals, key):
+        latest = watch.latest_dataset()
+        if latest is None or latest == key:
+            raise dash.exceptions.PreventUpdate
+        entry = get_dataset(latest)
+        if entry is None:
+            # Evicted or replaced by a newer version meanwhile: the next poll sends that one
+            raise dash.exceptions.PreventUpdate
+        df, race_info, incidents = entry
+        previous = get_dataset(key)
+        events = watch.new_events(previous[2], incidents) if previous is not None else None
+        observe_rows(len(df))
+        # Laps stay in the dataset cache; the new key and metadata make the views re-read them
+        metadata = dataset_metadata(df)
+        if events is None:
+            # Another race or a version this client does not extend: send every event
+            return race_info, incidents, latest, metadata
+        # Only the events added since the client's version
+        added = Patch()
+        for kind, items in events.items():
+            if items:
+                added[kind].extend(items)
+        return race_info, added, latest, metadata
+
+
+def _library_dataset(race_id):
+    """Retorna (key, df, race_info, incidents) de uma corrida da biblioteca, passando pelo cache de datasets"""
+    with closing(library.connect()) as conn:
+        key = library.race_key(conn, race_id)
+        # Races already opened in this or another worker come from the dataset cache
+        entry = get_dataset(key)
+        if entry is not None:
+            return (key, *entry)
+        race = data_phase(library.load_race)(conn, race_id)
+    if race is None:
+        return None
+    put_dataset(*race)
+    return race
+
+
+@data_phase
+def _season_standings(points):
+    """Classificação do campeonato da biblioteca; só as corridas novas são somadas aos totais em cache"""
+    from business.championship import accumulate, season_standings
+    with closing(library.connect()) as conn:
+        versions = library.race_versions(conn)
+        with _season_totals_lock:
+            counted, totals = _season_totals.get(points, (frozenset(), None))
+        if not counted <= versions:
+            # A race was removed or re-ingested: start over
+            counted, totals = frozenset(), None
+        new = versions - counted
+        if new:
+            results = library.season_results(conn, [race_id for race_id, _ in new])
+            totals = accumulate(totals, results, points)
+            counted = counted | new
+            with _season_totals_lock:
+                _season_totals[points] = (counted, totals)
+                _season_totals.move_to_end(points)
+                while len(_season_totals) > _SEASON_CACHE_SIZE:
+                    _season_totals.popitem(last=False)
+    return season_standings(totals)
+
+
+def _comparison_options(session_races):
+    """Corridas oferecidas na aba Compare: as carregadas nesta sessão e depois as da biblioteca"""
+    options = list(session_races or [])
+    if library.enabled():
+        with closing(library.connect()) as conn:
+            options += [dict(option, value=f"library:{option['value']}")
+                        for option in library_race_options(library.list_races(conn))]
+    return options
+
+
+@data_phase
+def _comparison_tables(value):
+    """Retorna as tabelas de comparação (business.comparison) de uma corrida selecionada, ou None se ela saiu do cache"""
+    if isinstance(value, str) and value.startswith('library:'):
+        race = _library_dataset(int(value.split(':', 1)[1]))
+        key = race[0] if race is not None else None
+    else:
+        key = value
+    with _comparison_tables_lock:
+        tables = _comparison_cache.get(key)
+        if tables is not None:
+            _comparison_cache.move_to_end(key)
+            return tables
+    df = get_dataframe(key)
+    if df is None:
+        return None
+    from business.comparison import race_tables
+    tables = race_tables(df)
+    with _comparison_tables_lock:
+        _comparison_cache[key] = tables
+        while len(_comparison_cache) > _COMPARISON_CACHE_SIZE:
+            _comparison_cache.popitem(last=False)
+    return tables
+
+
 def _create_laptimes_table(df):
-    """Cria a tabela de tempos de volta"""
+    """Cria a tabela de tempos de volta paginada no servidor"""
     if df.empty:
         return html.P('No data available')
     
-    # Filter only laps with valid lap times
-    lap_df = df[(df['Lap'] > 0) & (df['LapTime'] > 0)].copy()
-    
-    if lap_df.empty:
+    if df[(df['Lap'] > 0) & (df['LapTime'] > 0)].empty:
         return html.P('No lap time data available')
     
-    # Limit to 2000 rows for performance
-    if len(lap_df) > 2000:
-        lap_df = lap_df.head(2000)
-        performance_warning = html.P([html.Span('⚠️', className='emoji-icon'), ' Showing first 2000 laps for performance. Use filters to see specific data.'], 
-                                   style={'color': '#ff6b35', 'fontSize': '12px', 'fontStyle': 'italic', 'marginBottom': '10px'})
-    else:
-        performance_warning = None
-    
-    # Get finishing order from the last lap data
-    last_lap_df = lap_df.groupby('Driver')['Lap'].max().reset_index()
-    last_lap_df = last_lap_df.merge(lap_df, on=['Driver', 'Lap'])
-    finishing_order = last_lap_df.sort_values('Position')['Driver'].tolist()
-    
-    # Create a mapping of driver to final position
-    final_positions = {driver: pos + 1 for pos, driver in enumerate(finishing_order)}
-    
-    # Get starting positions
-    starting_positions = df[df['Lap'] == 0].set_index('Driver')['Position'].to_dict()
-    
-    # Sort by finishing order, then by lap
-    lap_df['FinishOrder'] = lap_df['Driver'].map({driver: i for i, driver in enumerate(finishing_order)})
-    lap_df = lap_df.sort_values(['FinishOrder', 'Lap'])
-    
-    table_style = {'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '13px'}
-    th_style = {'textAlign': 'left', 'padding': '8px', 'backgroundColor': '#f8f9fa', 'borderBottom': '2px solid #dee2e6', 'fontWeight': '600'}
-    td_style = {'padding': '6px 8px', 'borderBottom': '1px solid #e9ecef'}
-    
-    rows = []
-    current_driver = None
-    
-    for _, row in lap_df.iterrows():
-        # Add driver header row
-        if current_driver != row['Driver']:
-            current_driver = row['Driver']
-            finish_pos = final_positions.get(row['Driver'], 'DNF')
-            start_pos = starting_positions.get(row['Driver'], 'N/A')
-            start_text = f" (Started P{int(start_pos)})" if start_pos != 'N/A' and start_pos > 0 else ""
-            rows.append(html.Tr([
-                html.Td(f"P{finish_pos} - {row['Driver']} - {row['Car']}{start_text}", colSpan=10, 
-                       style={**td_style, 'backgroundColor': '#e9ecef', 'fontWeight': 'bold'})
-            ]))
-        
-        # Format lap time
-        lap_time = row['LapTime']
-        minutes = int(lap_time // 60)
-        seconds = lap_time % 60
-        lap_time_str = f"{minutes}:{seconds:06.3f}"
-        
-        # Get sector times from XML if available
-        s1 = row.get('S1', 0)
-        s2 = row.get('S2', 0) 
-        s3 = row.get('S3', 0)
-        s1_str = f"{s1:.3f}" if s1 > 0 else '-'
-        s2_str = f"{s2:.3f}" if s2 > 0 else '-'
-        s3_str = f"{s3:.3f}" if s3 > 0 else '-'
-        
-        # Virtual Energy
-        ve_str = f"{row.get('VE', 0):.1%}" if row.get('VE', 0) > 0 else ''
-        
-        # Fuel remaining
-        fuel_str = f"{row['FuelLevel']:.1%}" if row['FuelLevel'] > 0 else '-'
-        
-        # Tire wear percentages
-        twfl = row.get('TWFL', 0)
-        twfr = row.get('TWFR', 0)
-        twrl = row.get('TWRL', 0)
-        twrr = row.get('TWRR', 0)
-        tire_wear_str = f"FL:{twfl:.0%} FR:{twfr:.0%} RL:{twrl:.0%} RR:{twrr:.0%}" if any([twfl, twfr, twrl, twrr]) else '-'
-        
-        # Tire compounds
-        fcompound = row.get('FCompound', '').split(',')[-1] if row.get('FCompound') else '-'
-        rcompound = row.get('RCompound', '').split(',')[-1] if row.get('RCompound') else '-'
-        compounds_str = f"{fcompound}/{rcompound}"
-        
-        # Pit stop indicator
-        pit_str = 'PIT' if row.get('IsPit', False) else ''
-        
-        rows.append(html.Tr([
-            html.Td(str(int(row['Lap'])), style=td_style),
-            html.Td(lap_time_str, style=td_style),
-            html.Td(s1_str, style=td_style),
-            html.Td(s2_str, style=td_style),
-            html.Td(s3_str, style=td_style),
-            html.Td(ve_str, style=td_style),
-            html.Td(fuel_str, style=td_style),
-            html.Td(tire_wear_str, style=td_style),
-            html.Td(compounds_str, style=td_style),
-            html.Td(pit_str, style={**td_style, 'fontWeight': 'bold', 'color': 'red'})
-        ]))
+    return html.Div([
+        create_laptimes_controls(),
+        html.Div(id='laptimes-table-page')
+    ], style={'padding': '20px 40px'})
+
+@data_phase
+def _apply_filters(df, filters):
+    """Aplica os filtros globais (drivers, classes, times, veículos, tipos de carro)"""
+    for column, selected in zip(['Driver', 'Class', 'Car', 'VehName', 'CarType'], filters):
+        if selected:
+            df = df[df[column].isin(selected)]
+    return df
+
+@data_phase
+def _degradation_rates(df, drivers):
+    """Taxas de degradação por classe e composto dos pilotos selecionados"""
+    if df.empty:
+        return None
+    if drivers is not None:
+        df = df[df['Driver'].isin(drivers)]
+    from business.degradation import assign_stints, fit_stint_degradation, degradation_rates
+    return degradation_rates(fit_stint_degradation(assign_stints(df)))
+
+@data_phase
+def _chart_inputs(key, filters):
+    """Retorna (dados, pilotos) para os gráficos: o dataset em cache e os pilotos que passam nos filtros"""
+    df = _cached_frame(key)
+    observe_rows(len(df))
+    if df.empty or not any(filters):
+        return df, None
     
-    table_content = [
-        html.Table([
-            html.Thead(html.Tr([
-                html.Th('Lap', style=th_style),
-                html.Th('Lap Time', style=th_style),
-                html.Th('S1', style=th_style),
-                html.Th('S2', style=th_style),
-                html.Th('S3', style=th_style),
-                html.Th('VE', style=th_style),
-                html.Th('Fuel', style=th_style),
-                html.Th('Tire Wear', style=th_style),
-                html.Th('Tires Compound', style=th_style),
-                html.Th('Pit', style=th_style)
-            ])),
-            html.Tbody(rows)
-        ], style=table_style)
-    ]
+    from business.lap_matrix import get_lap_matrix
+    matrix = get_lap_matrix(df)
+    drivers = matrix.drivers[matrix.rows(*filters)].tolist()
+    if not drivers:
+        return pd.DataFrame(), None
+    return df, drivers
+
+def _cached_frame(key):
+    """Tabela de voltas do dataset em cache (vazia sem dataset; chaves que expiraram são tratadas antes com _expired)"""
+    df = get_dataframe(key)
+    return pd.DataFrame() if df is None else df
+
+def _expired(key):
+    """True quando a chave guardada no navegador saiu do cache de datasets do servidor"""
+    return bool(key) and not has_dataset(key)
+
+def _expired_notice():
+    """Aviso no lugar dos gráficos e tabelas de um dataset que expirou"""
+    return html.Div([
+        html.Span(['⌛', html.Span('', className='emoji-icon')], style={'fontSize': '16px'}),
+        html.Span(' Dataset expired: this race is no longer available on the server. Please upload the file again.',
+                  style={'color': '#856404', 'fontWeight': 'bold'})
+    ], id='dataset-expired', style={'textAlign': 'center', 'padding': '10px', 'backgroundColor': '#fff3cd',
+                                    'border': '1px solid #ffeeba', 'borderRadius': '5px', 'margin': '10px'})
+
+def _driver_count(data, drivers):
+    """Número de pilotos exibidos nos gráficos"""
+    if drivers is not None:
+        return len(drivers)
+    from business.lap_matrix import get_lap_matrix
+    return 0 if data.empty else len(get_lap_matrix(data).drivers)
+
+def _position_figure(view, data, drivers):
+    """Gráfico de posições em linhas (um trace por piloto) ou lap chart em heatmap (um único trace)"""
+    from business.analytics import update_position_chart, update_lap_chart_heatmap
+    if view == 'heatmap':
+        return update_lap_chart_heatmap(data, drivers, None)
+    return update_position_chart(data, drivers, None)
+
+@data_phase
+def _get_laptimes_view(key, filters, sort_by, ascending, group_by_driver, lap_type):
+    """Retorna a visão ordenada da tabela de voltas, reaproveitando o cache quando possível"""
+    cache_key = (key, tuple(tuple(f) if f else () for f in filters), sort_by, ascending, group_by_driver, lap_type)
+    with _laptimes_views_lock:
+        view = _laptimes_views.get(cache_key)
+        if view is not None:
+            _laptimes_views.move_to_end(cache_key)
+            return view
     
-    if performance_warning:
-        table_content.insert(0, performance_warning)
+    df = get_dataframe(key)
+    if df is None:
+        return None
+    if not df.empty:
+        df = _apply_filters(df, filters)
+    observe_rows(len(df))
+    view = build_laptimes_view(df, sort_by, ascending, group_by_driver, lap_type)
     
-    return html.Div(table_content, style={'padding': '20px 40px'})
+    with _laptimes_views_lock:
+        _laptimes_views[cache_key] = view
+        while len(_laptimes_views) > _LAPTIMES_VIEW_CACHE_SIZE:
+            _laptimes_views.popitem(last=False)
+    return view
+
+@data_phase
+def _standings_frame(key, selected_classes):
+    """Voltas do dataset em cache das classes selecionadas (a única filtragem que vale para os standings)"""
+    df = _cached_frame(key)
+    if selected_classes and not df.empty:
+        df = df[df['Class'].isin(selected_classes)]
+    return df
 
-def _render_standings_tab(data, stored_lap):
-    """Renderiza a aba de standings"""
-    all_df = pd.DataFrame(data)
-    if all_df.empty:
+def _render_standings_tab(has_data, stored_lap, max_lap):
+    """Renderiza a aba de standings; max_lap vem dos metadados do dataset"""
+    if not has_data:
         return html.P('No data available')
     
-    max_lap = int(all_df['Lap'].max())
     lap_options = [{'label': f'Lap {i}', 'value': i} for i in range(0, max_lap + 1)]
     
     # Use stored lap if available and valid, otherwise use max_lap
@@ -523,6 +929,5 @@ def _render_standings_tab(data, stored_lap):
                        style={'fontSize': '12px', 'color': '#666', 'fontStyle': 'italic', 'margin': '0', 'paddingTop': '15px'})
             ], style={'display': 'inline-block', 'verticalAlign': 'top', 'marginLeft': '20px'})
         ], style={'marginBottom': '20px'}),
-        dcc.Store(id='standings-filtered-data', data=data),
         html.Div(id='standings-table')
     ], style={'padding': '20px'})
\ No newline at end of file
@@ -0,0 +1,85 @@
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import threading
+
+from data import cache
+from data.cache import disk_enabled, get_dataframe
+
+# Process pool for the independent figures of multi-chart tabs.
+# CHART_WORKERS > 0 builds the figures of a tab concurrently in that many
+# worker processes (per server process, so per gunicorn worker). Workers get
+# only the dataset key and the selected drivers: each one loads the dataset
+# from the shared disk cache once and keeps it in its own memory cache, so
+# the lap table is never pickled per request. Figures come back as plain
+# dicts. Disabled (0) by default, in the standalone build and with a
+# memory-only dataset cache; any pool failure falls back to building in the
+# request thread.
+CHART_WORKERS = int(os.environ.get('CHART_WORKERS', '0'))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def build_charts(names, key, data, drivers):
+    """Builds the named business.analytics charts for a tab, in the process pool when enabled"""
+    executor = _get_executor() if len(names) > 1 and key and data is get_dataframe(key) else None
+    if executor is not None:
+        try:
+            futures = [executor.submit(_build_chart, name, key, drivers) for name in names]
+            return [future.result() for future in futures]
+        except (concurrent.futures.BrokenExecutor, LookupError, OSError, RuntimeError):
+            shutdown()
+    import business.analytics as analytics
+    return [getattr(analytics, name)(data, drivers, None) for name in names]
+
+
+def shutdown():
+    """Stops the worker processes (a new pool is started on the next tab render)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    # Never nested: a pool worker builds its charts itself
+    if (CHART_WORKERS <= 0 or getattr(sys, 'frozen', False) or multiprocessing.parent_process() is not None
+            or not disk_enabled()):
+        return None
+    with _executor_lock:
+        # A pool inherited through fork (gunicorn --preload) belongs to the parent
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = concurrent.futures.ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=_mp_context(),
+                                                               initializer=_init_worker, initargs=(cache.CACHE_DIR,))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _mp_context():
+    # forkserver: workers are not forked from a process running server
+    # threads, but from a clean one that has preloaded the chart builders.
+    # Not available on Windows, where spawned workers import them themselves
+    try:
+        context = multiprocessing.get_context('forkserver')
+    except ValueError:
+        return multiprocessing.get_context('spawn')
+    context.set_forkserver_preload(['business.analytics'])
+    return context
+
+
+def _init_worker(cache_dir):
+    # Workers read the datasets from the directory of the process that started them
+    cache.CACHE_DIR = cache_dir
+
+
+def _build_chart(name, key, drivers):
+    import business.analytics as analytics
+    df = get_dataframe(key)
+    if df is None:
+        raise LookupError(f'Dataset {key} is not in the cache')
+    return getattr(analytics, name)(df, drivers, None).to_dict()
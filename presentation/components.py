@@ -1,5 +1,29 @@
-from dash import html
+from dash import html, dcc
+import os
+import numpy as np
 import pandas as pd
+from business.standings import compute_standings
+from data.schema import map_values
+
+LAPTIMES_PAGE_SIZES = [50, 100, 200, 500]
+LAPTIMES_SORT_OPTIONS = [
+    {'label': 'Finishing order', 'value': 'finish'},
+    {'label': 'Lap', 'value': 'Lap'},
+    {'label': 'Lap Time', 'value': 'LapTime'},
+    {'label': 'S1', 'value': 'S1'},
+    {'label': 'S2', 'value': 'S2'},
+    {'label': 'S3', 'value': 'S3'},
+    {'label': 'Fuel', 'value': 'FuelLevel'},
+    {'label': 'Tire Wear', 'value': 'TireWear'}
+]
+DEGRADATION_SORT_OPTIONS = [
+    {'label': 'Deg per lap', 'value': 'LapSlope'},
+    {'label': 'Deg per % wear', 'value': 'WearSlope'},
+    {'label': 'Class', 'value': 'Class'},
+    {'label': 'Compound', 'value': 'Compound'},
+    {'label': 'Stints', 'value': 'Stints'},
+    {'label': 'Laps', 'value': 'Laps'}
+]
 
 def create_standings_table(selected_lap, data):
     """Cria a tabela de standings"""
@@ -7,62 +31,9 @@ def create_standings_table(selected_lap, data):
     if df.empty or selected_lap is None:
         return html.P('No data available')
     
-    # Get all drivers' latest lap up to selected_lap
-    all_drivers = df['Driver'].unique()
-    lap_df_list = []
-    
-    for driver in all_drivers:
-        driver_data = df[(df['Driver'] == driver) & (df['Lap'] <= selected_lap)]
-        if not driver_data.empty:
-            latest = driver_data.loc[driver_data['Lap'].idxmax()]
-            lap_df_list.append(latest)
-    
-    lap_df = pd.DataFrame(lap_df_list)
-    
-    # Sort by laps completed (descending) then by ET (ascending)
-    lap_df = lap_df.sort_values(['Lap', 'ET'], ascending=[False, True])
-    
-    # Assign positions based on correct order
-    lap_df['OriginalPosition'] = range(1, len(lap_df) + 1)
-    
-    # Calculate positions gained/lost using the corrected position
-    initial_pos = df[df['Lap'] == 0].set_index('Driver')['Position'].to_dict()
-    lap_df['Up'] = lap_df.apply(lambda row: initial_pos.get(row['Driver'], row['OriginalPosition']) - row['OriginalPosition'], axis=1)
-    
-    # Calculate best lap per driver up to selected lap
-    best_laps = df[(df['LapTime'] > 0) & (df['Lap'] <= selected_lap)].groupby('Driver')['LapTime'].min().to_dict()
-    lap_df['BestLap'] = lap_df['Driver'].map(best_laps)
-    
-    # Count pit stops up to selected lap
-    pit_counts = df[(df['IsPit'] == True) & (df['Lap'] <= selected_lap)].groupby('Driver').size().to_dict()
-    lap_df['Pits'] = lap_df['Driver'].map(pit_counts).fillna(0).astype(int)
-    
-    # Count laps led up to selected lap
-    laps_led = df[(df['Position'] == 1) & (df['Lap'] <= selected_lap) & (df['Lap'] > 0)].groupby('Driver').size().to_dict()
-    lap_df['Led'] = lap_df['Driver'].map(laps_led).fillna(0).astype(int)
-    
-    # Calculate gap to leader
-    leader_lap = lap_df.iloc[0]['Lap']
-    leader_et = lap_df.iloc[0]['ET']
-    
-    def calculate_gap(row):
-        if row.name == lap_df.index[0]:  # First row is leader
-            return 'Leader'
-        laps_behind = leader_lap - row['Lap']
-        time_gap = row['ET'] - leader_et
-        
-        # Only use lap format on the last lap of the race
-        if selected_lap == df['Lap'].max() and laps_behind >= 1:
-            minutes = int(abs(time_gap) // 60)
-            seconds = abs(time_gap) % 60
-            return f"+{laps_behind}L {minutes}:{seconds:06.3f}"
-        else:
-            # Format as mm:ss.sss for all other laps
-            minutes = int(abs(time_gap) // 60)
-            seconds = abs(time_gap) % 60
-            return f"+{minutes}:{seconds:06.3f}"
-    
-    lap_df['Gap'] = lap_df.apply(calculate_gap, axis=1)
+    lap_df = compute_standings(df, selected_lap)
+    if lap_df.empty:
+        return html.P('No data available')
     
     table_style = {'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '13px', 'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'}
     th_style = {'textAlign': 'left', 'padding': '10px', 'backgroundColor': '#f8f9fa', 'borderBottom': '2px solid #dee2e6', 'fontWeight': '600', 'fontSize': '12px'}
@@ -114,4 +85,321 @@ def create_standings_table(selected_lap, data):
             html.Th(['Aids ', html.Span('ℹ️', className='emoji-icon')], style=th_style, title='TC=Traction Control, ABS=Anti-lock Brakes, SC=Stability Control, AS=Auto Shift, AC=Auto Clutch, AB=Auto Blip, AL=Auto Lift, PC=Player Control')
         ])),
         html.Tbody(rows)
-    ], style=table_style)
\ No newline at end of file
+    ], style=table_style)
+
+
+def build_laptimes_view(df, sort_by='finish', ascending=True, group_by_driver=True, lap_type='all'):
+    """Monta a visão ordenada da tabela de tempos de volta (todas as voltas, sem limite)"""
+    if df is None or df.empty:
+        return pd.DataFrame()
+    
+    # Filter only laps with valid lap times
+    lap_df = df[(df['Lap'] > 0) & (df['LapTime'] > 0)]
+    if lap_type == 'no-pit':
+        lap_df = lap_df[~lap_df['IsPit'].astype(bool)]
+    elif lap_type == 'pit':
+        lap_df = lap_df[lap_df['IsPit'].astype(bool)]
+    
+    if lap_df.empty:
+        return pd.DataFrame()
+    
+    # Get finishing order from the last lap data
+    last_laps = lap_df.loc[lap_df.groupby('Driver', observed=True)['Lap'].idxmax()]
+    finishing_order = last_laps.sort_values('Position', kind='mergesort')['Driver'].tolist()
+    finish_map = {driver: pos + 1 for pos, driver in enumerate(finishing_order)}
+    starting_positions = df[df['Lap'] == 0].drop_duplicates('Driver').set_index('Driver')['Position']
+    
+    view = lap_df.copy()
+    view['FinishPos'] = map_values(view['Driver'], finish_map)
+    view['StartPos'] = map_values(view['Driver'], starting_positions).fillna(0)
+    
+    if sort_by == 'finish' or sort_by not in view.columns:
+        keys, orders = ['FinishPos', 'Lap'], [ascending, True]
+    else:
+        # Missing values (0) always go to the end regardless of direction
+        view['SortKey'] = view[sort_by].where(view[sort_by] > 0)
+        keys, orders = ['SortKey', 'FinishPos', 'Lap'], [ascending, True, True]
+        if group_by_driver:
+            keys, orders = ['FinishPos'] + keys, [True] + orders
+    
+    view = view.sort_values(keys, ascending=orders, na_position='last', kind='mergesort')
+    return view.reset_index(drop=True)
+
+
+def format_laptimes_rows(page_df):
+    """Formata as colunas de uma página da tabela de forma vetorizada"""
+    def column(name, default=0):
+        if name in page_df.columns:
+            values = page_df[name]
+            # Categorias não aceitam um valor padrão fora delas
+            return (values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values).fillna(default)
+        return pd.Series(default, index=page_df.index)
+    
+    lap_time = column('LapTime').to_numpy(dtype=float)
+    minutes = (lap_time // 60).astype(int).astype(str)
+    seconds = np.char.mod('%06.3f', lap_time % 60)
+    
+    formatted = pd.DataFrame(index=page_df.index)
+    formatted['Driver'] = column('Driver', '').astype(str)
+    formatted['Lap'] = column('Lap').astype(int).astype(str)
+    formatted['LapTime'] = np.char.add(np.char.add(minutes, ':'), seconds)
+    for sector in ['S1', 'S2', 'S3']:
+        values = column(sector).to_numpy(dtype=float)
+        formatted[sector] = np.where(values > 0, np.char.mod('%.3f', values), '-')
+    
+    ve = column('VE').to_numpy(dtype=float)
+    formatted['VE'] = np.where(ve > 0, np.char.mod('%.1f%%', ve * 100), '')
+    fuel = column('FuelLevel').to_numpy(dtype=float)
+    formatted['Fuel'] = np.where(fuel > 0, np.char.mod('%.1f%%', fuel * 100), '-')
+    
+    wear = {tire: column(f'TW{tire}').to_numpy(dtype=float) for tire in ['FL', 'FR', 'RL', 'RR']}
+    wear_text = None
+    for tire, values in wear.items():
+        part = np.char.add(f'{tire}:', np.char.mod('%.0f%%', values * 100))
+        wear_text = part if wear_text is None else np.char.add(np.char.add(wear_text, ' '), part)
+    has_wear = np.logical_or.reduce([values != 0 for values in wear.values()])
+    formatted['TireWear'] = np.where(has_wear, wear_text, '-')
+    
+    fcompound = column('FCompound', '').astype(str).str.split(',').str[-1].replace('', '-')
+    rcompound = column('RCompound', '').astype(str).str.split(',').str[-1].replace('', '-')
+    formatted['Compounds'] = fcompound + '/' + rcompound
+    formatted['Pit'] = np.where(column('IsPit', False).astype(bool), 'PIT', '')
+    return formatted
+
+
+def create_laptimes_page(view, page, page_size, group_by_driver=True):
+    """Cria a tabela de tempos de volta para uma única página da visão"""
+    page_df = view.iloc[page * page_size:(page + 1) * page_size]
+    if page_df.empty:
+        return html.P('No lap time data available')
+    
+    table_style = {'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '13px'}
+    th_style = {'textAlign': 'left', 'padding': '8px', 'backgroundColor': '#f8f9fa', 'borderBottom': '2px solid #dee2e6', 'fontWeight': '600'}
+    td_style = {'padding': '6px 8px', 'borderBottom': '1px solid #e9ecef'}
+    pit_style = {**td_style, 'fontWeight': 'bold', 'color': 'red'}
+    
+    columns = ['Lap', 'LapTime', 'S1', 'S2', 'S3', 'VE', 'Fuel', 'TireWear', 'Compounds', 'Pit']
+    headers = ['Lap', 'Lap Time', 'S1', 'S2', 'S3', 'VE', 'Fuel', 'Tire Wear', 'Tires Compound', 'Pit']
+    if not group_by_driver:
+        columns = ['Driver'] + columns
+        headers = ['Driver'] + headers
+    
+    formatted = format_laptimes_rows(page_df)
+    drivers = page_df['Driver'].to_numpy()
+    # Driver header rows are added where a new driver group starts inside the page
+    group_starts = set(np.flatnonzero(np.r_[True, drivers[1:] != drivers[:-1]])) if group_by_driver else set()
+    
+    rows = []
+    for i, values in enumerate(formatted[columns].itertuples(index=False, name=None)):
+        if i in group_starts:
+            row = page_df.iloc[i]
+            start_pos = int(row['StartPos'])
+            start_text = f" (Started P{start_pos})" if start_pos > 0 else ""
+            rows.append(html.Tr([
+                html.Td(f"P{int(row['FinishPos'])} - {row['Driver']} - {row['Car']}{start_text}", colSpan=len(columns),
+                       style={**td_style, 'backgroundColor': '#e9ecef', 'fontWeight': 'bold'})
+            ]))
+        rows.append(html.Tr([html.Td(value, style=td_style) for value in values[:-1]] + [html.Td(values[-1], style=pit_style)]))
+    
+    return html.Table([
+        html.Thead(html.Tr([html.Th(header, style=th_style) for header in headers])),
+        html.Tbody(rows)
+    ], style=table_style)
+
+
+def create_laptimes_controls():
+    """Cria os controles de ordenação, filtro e paginação da tabela de tempos de volta"""
+    label_style = {'fontSize': '12px', 'marginBottom': '2px'}
+    block_style = {'display': 'inline-block', 'verticalAlign': 'top', 'padding': '0 10px 10px 0'}
+    button_style = {'padding': '4px 12px', 'margin': '0 5px', 'cursor': 'pointer'}
+    return html.Div([
+        html.Div([
+            html.Label('Sort by:', style=label_style),
+            dcc.Dropdown(id='laptimes-sort', options=LAPTIMES_SORT_OPTIONS, value='finish', clearable=False, style={'fontSize': '12px', 'minWidth': '160px'})
+        ], style=block_style),
+        html.Div([
+            html.Label('Order:', style=label_style),
+            dcc.RadioItems(id='laptimes-sort-dir', options=[{'label': ' Asc', 'value': 'asc'}, {'label': ' Desc', 'value': 'desc'}],
+                           value='asc', inline=True, style={'fontSize': '12px', 'paddingTop': '8px'})
+        ], style=block_style),
+        html.Div([
+            html.Label('Laps:', style=label_style),
+            dcc.Dropdown(id='laptimes-lap-type', options=[
+                {'label': 'All laps', 'value': 'all'},
+                {'label': 'Exclude pit laps', 'value': 'no-pit'},
+                {'label': 'Pit laps only', 'value': 'pit'}
+            ], value='all', clearable=False, style={'fontSize': '12px', 'minWidth': '160px'})
+        ], style=block_style),
+        html.Div([
+            html.Label('Rows per page:', style=label_style),
+            dcc.Dropdown(id='laptimes-page-size', options=[{'label': str(size), 'value': size} for size in LAPTIMES_PAGE_SIZES],
+                         value=100, clearable=False, style={'fontSize': '12px', 'minWidth': '90px'})
+        ], style=block_style),
+        html.Div([
+            dcc.Checklist(id='laptimes-group', options=[{'label': ' Group by driver', 'value': 'group'}], value=['group'],
+                          style={'fontSize': '12px', 'paddingTop': '22px'})
+        ], style=block_style),
+        html.Div([
+            html.Button('◀', id='laptimes-prev', n_clicks=0, style=button_style),
+            html.Span(id='laptimes-page-label', style={'fontSize': '12px'}),
+            html.Button('▶', id='laptimes-next', n_clicks=0, style=button_style)
+        ], style={**block_style, 'paddingTop': '18px'}),
+        dcc.Store(id='laptimes-page', data=0)
+    ])
+
+
+def create_degradation_controls():
+    """Cria os controles de ordenação da tabela de taxas de degradação"""
+    label_style = {'fontSize': '12px', 'marginBottom': '2px'}
+    block_style = {'display': 'inline-block', 'verticalAlign': 'top', 'padding': '0 10px 10px 0'}
+    return html.Div([
+        html.H4('Degradation rate by class and compound', style={'margin': '10px 0'}),
+        html.Div([
+            html.Label('Sort by:', style=label_style),
+            dcc.Dropdown(id='degradation-sort', options=DEGRADATION_SORT_OPTIONS, value='LapSlope', clearable=False, style={'fontSize': '12px', 'minWidth': '160px'})
+        ], style=block_style),
+        html.Div([
+            html.Label('Order:', style=label_style),
+            dcc.RadioItems(id='degradation-sort-dir', options=[{'label': ' Asc', 'value': 'asc'}, {'label': ' Desc', 'value': 'desc'}],
+                           value='desc', inline=True, style={'fontSize': '12px', 'paddingTop': '8px'})
+        ], style=block_style),
+        html.Div(id='degradation-table')
+    ], style={'padding': '10px 20px'})
+
+
+def create_degradation_table(rates, sort_by='LapSlope', ascending=False):
+    """Cria a tabela de taxas de degradação (regressão por stint agregada por classe e composto)"""
+    if rates is None or rates.empty:
+        return html.P('No stint long enough to estimate tire degradation')
+    
+    if sort_by in rates.columns:
+        rates = rates.sort_values(sort_by, ascending=ascending, kind='mergesort')
+    
+    table_style = {'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '13px'}
+    th_style = {'textAlign': 'left', 'padding': '8px', 'backgroundColor': '#f8f9fa', 'borderBottom': '2px solid #dee2e6', 'fontWeight': '600'}
+    td_style = {'padding': '6px 8px', 'borderBottom': '1px solid #e9ecef'}
+    
+    rows = [
+        html.Tr([
+            html.Td(row['Class'], style=td_style),
+            html.Td(row['Compound'], style=td_style),
+            html.Td(int(row['Stints']), style=td_style),
+            html.Td(int(row['Laps']), style=td_style),
+            html.Td(f"{row['LapSlope']:+.3f}s", style=td_style),
+            html.Td(f"{row['WearSlope']:+.3f}s", style=td_style)
+        ])
+        for row in rates.to_dict('records')
+    ]
+    
+    headers = ['Class', 'Compound', 'Stints', 'Laps', 'Deg per Lap', 'Deg per 1% Wear']
+    return html.Table([
+        html.Thead(html.Tr([html.Th(header, style=th_style) for header in headers])),
+        html.Tbody(rows)
+    ], style=table_style)
+
+
+def create_season_controls(points):
+    """Cria os controles do campeonato (tabela de pontos e classe) da biblioteca"""
+    label_style = {'fontSize': '12px', 'marginBottom': '2px'}
+    block_style = {'display': 'inline-block', 'verticalAlign': 'top', 'padding': '0 10px 10px 0'}
+    return html.Div([
+        html.Div([
+            html.Label('Points (1st, 2nd, ...):', style=label_style),
+            dcc.Input(id='season-points', value=', '.join(f'{p:g}' for p in points), debounce=True,
+                      style={'fontSize': '12px', 'width': '320px', 'display': 'block'})
+        ], style=block_style),
+        html.Div([
+            html.Label('Class:', style=label_style),
+            dcc.Dropdown(id='season-class', placeholder='All Classes', style={'fontSize': '12px', 'minWidth': '220px'})
+        ], style=block_style),
+        dcc.Loading(type='circle', children=[html.Div(id='season-table')])
+    ], style={'padding': '10px 20px'})
+
+
+def create_season_table(standings):
+    """Cria a tabela de classificação do campeonato por classe"""
+    if standings is None or standings.empty:
+        return html.P('No races in the results library')
+    
+    table_style = {'width': '100%', 'borderCollapse': 'collapse', 'fontSize': '13px'}
+    th_style = {'textAlign': 'left', 'padding': '8px', 'backgroundColor': '#f8f9fa', 'borderBottom': '2px solid #dee2e6', 'fontWeight': '600'}
+    td_style = {'padding': '6px 8px', 'borderBottom': '1px solid #e9ecef'}
+    
+    rows = [
+        html.Tr([
+            html.Td(int(row['Rank']), style=td_style),
+            html.Td(row['Driver'], style=td_style),
+            html.Td(row['Class'], style=td_style),
+            html.Td(f"{row['Points']:g}", style={**td_style, 'fontWeight': 'bold'}),
+            html.Td(int(row['Races']), style=td_style),
+            html.Td(int(row['Wins']), style=td_style),
+            html.Td(int(row['Podiums']), style=td_style),
+            html.Td(f"{row['AvgFinish']:.1f}", style=td_style),
+            html.Td(int(row['BestFinish']), style=td_style),
+            html.Td(int(row['LapsLed']), style=td_style),
+            html.Td(int(row['Incidents']), style=td_style),
+            html.Td(int(row['Penalties']), style=td_style)
+        ])
+        for row in standings.to_dict('records')
+    ]
+    
+    headers = ['Pos', 'Driver', 'Class', 'Points', 'Races', 'Wins', 'Podiums', 'Avg Finish', 'Best', 'Laps Led', 'Incidents', 'Penalties']
+    return html.Table([
+        html.Thead(html.Tr([html.Th(header, style=th_style) for header in headers])),
+        html.Tbody(rows)
+    ], style=table_style)
+
+
+def create_library_selector():
+    """Cria o seletor de corridas da biblioteca local de resultados"""
+    return html.Div([
+        dcc.Dropdown(id='library-race', placeholder='Load a race from the results library...',
+                     style={'fontSize': '12px', 'flex': '1'}),
+        html.Button('Rescan', id='library-refresh', n_clicks=0,
+                    style={'fontSize': '12px', 'marginLeft': '8px', 'cursor': 'pointer'}),
+        html.Span(id='library-progress', style={'fontSize': '11px', 'color': '#6c757d', 'marginLeft': '8px'}),
+        html.Span(id='library-status', style={'fontSize': '11px', 'color': '#6c757d', 'marginLeft': '8px'}),
+        # Summary of the last rescan; a new one refreshes the dropdown
+        dcc.Store(id='library-scan')
+    ], style={'display': 'flex', 'alignItems': 'center', 'margin': '10px 0'})
+
+
+def race_label(race_info):
+    """Rótulo curto de uma corrida (data e pista) para listas de seleção"""
+    race_info = race_info or {}
+    return f"{race_info.get('date') or '?'} — {race_info.get('track') or 'Unknown track'}"
+
+
+def create_comparison_controls(options, value):
+    """Cria os controles do modo de comparação entre corridas"""
+    label_style = {'fontSize': '12px', 'marginBottom': '2px'}
+    block_style = {'display': 'inline-block', 'verticalAlign': 'top', 'padding': '0 10px 10px 0'}
+    return html.Div([
+        html.Div([
+            html.Label('Races:', style=label_style),
+            dcc.Dropdown(id='compare-races', options=options, value=value, multi=True,
+                         placeholder='Select races to compare', style={'fontSize': '12px', 'minWidth': '420px'})
+        ], style=block_style),
+        html.Div([
+            html.Label('Driver:', style=label_style),
+            dcc.Dropdown(id='compare-driver', placeholder='All Drivers', style={'fontSize': '12px', 'minWidth': '220px'})
+        ], style=block_style),
+        dcc.Loading(type='circle', children=[html.Div(id='comparison-charts')])
+    ], style={'padding': '10px 20px'})
+
+
+def library_race_options(races):
+    """Formata as corridas da biblioteca como opções do dropdown"""
+    options = []
+    for race in races:
+        track = race['track'] or 'Unknown track'
+        if race['course'] and race['course'] != race['track']:
+            track = f"{track} ({race['course']})"
+        label = f"{race['date'] or '?'} — {track} — {race['drivers']} drivers — {os.path.basename(race['path'])}"
+        options.append({'label': label, 'value': race['id']})
+    return options
+
+
+def memory_text(report):
+    """Texto com a memória da tabela de voltas e a economia em relação aos tipos do parser"""
+    return f"Lap table: {report['bytes'] / 1e6:.1f} MB ({report['saved']:.0%} less than untyped columns)"
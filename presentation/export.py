@@ -0,0 +1,334 @@
+import html
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from data import cache
+from data.cache import dataset_key, get_dataframe, put_dataset
+from data.library import result_files
+
+# Static export of a race report.
+# python -m presentation.export <results file or directory> -o <output> writes
+# one folder per race with every chart of the app (as Plotly JSON and in a
+# standalone index.html), the standings at the final lap and the lap times
+# table (as JSON and HTML). plotly.min.js is written once at the top of the
+# output and shared by every page, so the bundle opens offline. Races are
+# parsed and figures built in a pool of --workers processes (default: number
+# of CPUs); each task gets only the dataset key and loads the parsed race
+# from a dataset cache directory of the export run, so a whole season is one
+# bounded command that never touches the cache of a running server.
+
+# (section title, [(chart id, business.analytics builder)]) in tab order
+EXPORT_SECTIONS = [
+    ('Position', [
+        ('position-chart', 'update_position_chart'),
+        ('lap-chart-heatmap', 'update_lap_chart_heatmap'),
+        ('strategy-gantt-chart', 'update_strategy_gantt_chart')
+    ]),
+    ('Gap', [
+        ('class-gap-chart', 'update_class_gap_chart'),
+        ('gap-chart', 'update_gap_chart'),
+        ('class-interval-chart', 'update_class_interval_chart'),
+        ('interval-chart', 'update_interval_chart'),
+        ('battle-chart', 'update_battle_chart')
+    ]),
+    ('Lap Times', [
+        ('laptime-no-pit-chart', 'update_laptime_no_pit_chart'),
+        ('laptime-chart', 'update_laptime_chart'),
+        ('consistency-chart', 'update_consistency_chart')
+    ]),
+    ('Fuel', [
+        ('fuel-level-chart', 'update_fuel_level_chart'),
+        ('fuel-chart', 'update_fuel_chart'),
+        ('ve-level-chart', 'update_ve_level_chart'),
+        ('ve-chart', 'update_ve_chart')
+    ]),
+    ('Tires', [
+        ('pace-decay-chart', 'update_pace_decay_chart'),
+        ('tire-wear-chart', 'update_tire_wear_chart'),
+        ('tire-consumption-chart', 'update_tire_consumption_chart'),
+        ('tire-degradation-chart', 'update_tire_degradation_chart')
+    ])
+]
+TABLES = ('standings', 'laptimes')
+PLOTLY_JS = 'plotly.min.js'
+
+STANDINGS_HEADERS = ['Pos', 'Up', 'Class', 'Driver', 'Team', 'Car', 'Laps', 'Time/Gap', 'Best Lap', 'Led', 'Pits', 'Tires']
+LAPTIMES_COLUMNS = ['Driver', 'Lap', 'LapTime', 'S1', 'S2', 'S3', 'VE', 'Fuel', 'TireWear', 'Compounds', 'Pit']
+LAPTIMES_HEADERS = ['Driver', 'Lap', 'Lap Time', 'S1', 'S2', 'S3', 'VE', 'Fuel', 'Tire Wear', 'Tires Compound', 'Pit']
+
+
+def export_items():
+    """Returns the (item id, builder) of every chart and table of a race report"""
+    return [item for _, charts in EXPORT_SECTIONS for item in charts] + [(table, table) for table in TABLES]
+
+
+def export_races(paths, output, workers=1, progress=None):
+    """Exports the report of each results file into its own folder of output.
+
+    Returns {'races': exported, 'figures': charts and tables written,
+    'errors': [(path, message)]}. progress(done, total, summary) is called
+    after each race. Parsed races go to a temporary dataset cache directory
+    that is removed at the end, so this is meant for a command line run.
+    """
+    server_cache_dir = cache.CACHE_DIR
+    with tempfile.TemporaryDirectory(prefix='rf2-lmu-charts-export-') as cache_dir:
+        cache.CACHE_DIR = cache_dir
+        try:
+            return _export_races(paths, output, workers, progress)
+        finally:
+            cache.CACHE_DIR = server_cache_dir
+
+
+def _export_races(paths, output, workers, progress):
+    os.makedirs(output, exist_ok=True)
+    _write_plotly_js(output)
+    folders = race_folders(paths)
+    summary = {'races': 0, 'figures': 0, 'errors': []}
+    index = []
+    items = export_items()
+    pending = {}
+    for path, result in _run(paths, items, workers):
+        race = pending.setdefault(path, {'race_info': None, 'results': {}, 'errors': [], 'left': len(items) + 1})
+        race['left'] -= 1
+        if isinstance(result, Exception):
+            race['errors'].append(str(result))
+            if race['race_info'] is None:
+                # Not parsed: nothing else was queued for this race
+                race['left'] = 0
+        elif 'race_info' in result:
+            race['race_info'] = result['race_info']
+        else:
+            race['results'][result['item']] = result['body']
+        if race['left'] > 0:
+            continue
+        del pending[path]
+        if race['errors']:
+            summary['errors'].append((path, race['errors'][0]))
+        else:
+            folder = folders[path]
+            _write_race(os.path.join(output, folder), path, race['race_info'], race['results'])
+            summary['races'] += 1
+            summary['figures'] += len(items)
+            index.append((folder, race['race_info']))
+        if progress is not None:
+            progress(summary['races'] + len(summary['errors']), len(paths), summary)
+    _write_index(output, sorted(index))
+    return summary
+
+
+def race_folders(paths):
+    """Returns {path: unique folder name} built from the file names"""
+    folders, used = {}, set()
+    for path in paths:
+        base = re.sub(r'[^\w.-]+', '_', os.path.splitext(os.path.basename(path))[0]) or 'race'
+        folder, n = base, 2
+        while folder in used:
+            folder, n = f'{base}_{n}', n + 1
+        used.add(folder)
+        folders[path] = folder
+    return folders
+
+
+def load_race(path):
+    """Parses a results file into the dataset cache; returns its key and race info"""
+    from data.snapshot import load_results
+    content, df, race_info, incidents = load_results(path, write=False)
+    key = put_dataset(dataset_key(content), df, race_info, incidents)
+    return {'key': key, 'race_info': race_info}
+
+
+def render_item(key, path, item):
+    """Builds one chart (Plotly JSON) or table (JSON and HTML) of a race"""
+    df = get_dataframe(key)
+    if df is None:
+        # The disk cache is best effort: parse again in this process
+        load_race(path)
+        df = get_dataframe(key)
+    if item == 'standings':
+        body = _standings(df)
+    elif item == 'laptimes':
+        body = _laptimes(df)
+    else:
+        import business.analytics as analytics
+        body = {'json': getattr(analytics, item)(df, None, None).to_json()}
+    return {'item': item, 'body': body}
+
+
+def _run(paths, items, workers):
+    """Yields (path, load_race or render_item result, or the exception raised) for every race and item.
+
+    The items of a parsed race are queued ahead of the races still to parse,
+    so a race is finished (and its results released) before the next ones
+    start, and at most two tasks per worker are in flight.
+    """
+    queue = deque((load_race, (path,), path) for path in paths)
+
+    def follow_up(path, result):
+        if isinstance(result, dict) and 'key' in result:
+            queue.extendleft(reversed([(render_item, (result['key'], path, builder), path) for _, builder in items]))
+
+    if workers <= 1:
+        while queue:
+            func, args, path = queue.popleft()
+            result = _result(func, *args)
+            follow_up(path, result)
+            yield path, result
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_use_cache_dir, initargs=(cache.CACHE_DIR,)) as executor:
+        running = {}
+        while queue or running:
+            while queue and len(running) < workers * 2:
+                func, args, path = queue.popleft()
+                running[executor.submit(func, *args)] = path
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = running.pop(future)
+                result = _result(future.result)
+                follow_up(path, result)
+                yield path, result
+
+
+def _use_cache_dir(cache_dir):
+    # Workers share the cache directory of the export run
+    cache.CACHE_DIR = cache_dir
+
+
+def _result(func, *args):
+    """Returns func(*args), or the exception it raised"""
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+def _standings(df):
+    import pandas as pd
+    from presentation.api import standings_table
+    table = standings_table(df, {})
+    if table.empty:
+        return {'json': '[]', 'html': '<p>No data available</p>'}
+    best = table['BestLap']
+    best_text = [f'{int(t // 60)}:{t % 60:06.3f}' if pd.notna(t) and t > 0 else '-' for t in best]
+    tires = [f"{(front or '-').split(',')[-1]}/{(rear or '-').split(',')[-1]}"
+             for front, rear in zip(table.get('FCompound', [''] * len(table)), table.get('RCompound', [''] * len(table)))]
+    rows = zip(table['Position'], [f'+{up}' if up > 0 else str(up) for up in table['Up']], table['Class'],
+               table['Driver'], table['Car'], table.get('VehName', ['-'] * len(table)), table['Lap'], table['Gap'],
+               best_text, table['Led'], table['Pits'], tires)
+    return {'json': table.to_json(orient='records', double_precision=15), 'html': _html_table(STANDINGS_HEADERS, rows)}
+
+
+def _laptimes(df):
+    from presentation.components import build_laptimes_view, format_laptimes_rows
+    view = build_laptimes_view(df)
+    if view.empty:
+        return {'json': '[]', 'html': '<p>No lap time data available</p>'}
+    fields = [field for field in ('Driver', 'Lap', 'LapTime', 'S1', 'S2', 'S3', 'VE', 'FuelLevel', 'IsPit', 'FCompound', 'RCompound')
+              if field in view.columns]
+    formatted = format_laptimes_rows(view)
+    return {'json': view[fields].to_json(orient='records', double_precision=15),
+            'html': _html_table(LAPTIMES_HEADERS, formatted[LAPTIMES_COLUMNS].itertuples(index=False, name=None))}
+
+
+def _html_table(headers, rows):
+    head = ''.join(f'<th>{html.escape(header)}</th>' for header in headers)
+    body = ''.join('<tr>' + ''.join(f'<td>{html.escape(str(value))}</td>' for value in row) + '</tr>' for row in rows)
+    return f'<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+def _write_plotly_js(output):
+    path = os.path.join(output, PLOTLY_JS)
+    from plotly.offline import get_plotlyjs
+    script = get_plotlyjs()
+    if os.path.exists(path) and os.path.getsize(path) == len(script.encode('utf-8')):
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(script)
+
+
+def _write_race(folder, path, race_info, results):
+    """Writes charts/*.json, standings.json, laptimes.json, race.json and index.html of a race"""
+    os.makedirs(os.path.join(folder, 'charts'), exist_ok=True)
+    for chart_id, builder in (item for _, charts in EXPORT_SECTIONS for item in charts):
+        with open(os.path.join(folder, 'charts', f'{chart_id}.json'), 'w', encoding='utf-8') as f:
+            f.write(results[builder]['json'])
+    for table in TABLES:
+        with open(os.path.join(folder, f'{table}.json'), 'w', encoding='utf-8') as f:
+            f.write(results[table]['json'])
+    with open(os.path.join(folder, 'race.json'), 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.basename(path), 'race_info': race_info,
+                   'charts': [chart_id for _, charts in EXPORT_SECTIONS for chart_id, _ in charts],
+                   'tables': list(TABLES)}, f, indent=2)
+    with open(os.path.join(folder, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_race_page(race_info, results))
+
+
+def _race_page(race_info, results):
+    from presentation.components import race_label
+    title = html.escape(race_label(race_info))
+    sections = [f'<h2>Standings</h2>{results["standings"]["html"]}']
+    for section, charts in EXPORT_SECTIONS:
+        sections.append(f'<h2>{html.escape(section)}</h2>')
+        for chart_id, builder in charts:
+            # "</" would end the script element early
+            figure = results[builder]['json'].replace('</', '<\\/')
+            sections.append(f'<div id="{chart_id}" class="chart"></div>'
+                            f'<script>(function(){{var f={figure};'
+                            f'Plotly.newPlot("{chart_id}",f.data,f.layout,{{responsive:true}});}})();</script>')
+    sections.append(f'<h2>Lap Times</h2>{results["laptimes"]["html"]}')
+    return _page(title, f'../{PLOTLY_JS}', ''.join(sections))
+
+
+def _write_index(output, races):
+    from presentation.components import race_label
+    items = ''.join(f'<li><a href="{html.escape(folder)}/index.html">{html.escape(race_label(race_info))}</a></li>'
+                    for folder, race_info in races)
+    with open(os.path.join(output, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_page('Races', None, f'<ul>{items}</ul>'))
+
+
+def _page(title, script, body):
+    head = f'<script src="{script}"></script>' if script else ''
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{title}</title>{head}'
+            '<style>body{font-family:sans-serif;margin:20px 40px}table{border-collapse:collapse;font-size:13px}'
+            'th,td{text-align:left;padding:6px 8px;border-bottom:1px solid #e9ecef}th{background:#f8f9fa}'
+            '.chart{min-height:450px}</style>'
+            f'</head><body><h1>{title}</h1>{body}</body></html>')
+
+
+def main(argv=None):
+    """Exports race reports: python -m presentation.export <file or directory> -o <output> [--workers N]"""
+    import argparse
+    parser = argparse.ArgumentParser(description='Export every chart and table of races to static HTML/JSON')
+    parser.add_argument('source', help='results file, or directory of results files (a season)')
+    parser.add_argument('-o', '--output', default='export', help='output directory (default: export)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('--quiet', action='store_true', help='only print the summary')
+    args = parser.parse_args(argv)
+    paths = result_files(args.source) if os.path.isdir(args.source) else [args.source]
+    if not paths:
+        parser.error(f'no results files in {args.source}')
+    start = time.perf_counter()
+
+    def progress(done, total, summary):
+        end = '\r' if sys.stderr.isatty() and done < total else '\n'
+        print(f"[{done}/{total}] {summary['races']} exported, {len(summary['errors'])} errors",
+              end=end, file=sys.stderr, flush=True)
+
+    summary = export_races(paths, args.output, args.workers, None if args.quiet else progress)
+    print(f"{summary['races']} races, {summary['figures']} charts and tables in {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
+    for path, error in summary['errors']:
+        print(f'  {path}: {error}', file=sys.stderr)
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
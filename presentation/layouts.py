@@ -1,7 +1,12 @@
 from dash import html, dcc
 import pandas as pd
+from presentation.upload_limits import MAX_UPLOAD_MB
+from presentation.components import create_library_selector
+from data import library, watch
+from data.cache import DISK_ENTRIES, disk_enabled
+from data.metadata import dataset_metadata
 
-def create_main_layout(initial_df, initial_race_info, initial_incidents):
+def create_main_layout(initial_df, initial_race_info, initial_incidents, initial_dataset_key=None):
     """Cria o layout principal da aplicação"""
     return html.Div([
         html.Div([
@@ -13,6 +18,9 @@ def create_main_layout(initial_df, initial_race_info, initial_incidents):
             
             html.Div(id='race-info', style={'textAlign': 'center', 'padding': '10px', 'backgroundColor': '#f0f0f0', 'margin': '10px 0', 'borderRadius': '5px'}),
             
+            # Races of the local results library (RESULTS_LIBRARY_DIR), loaded without an upload
+            create_library_selector() if library.enabled() else html.Div(),
+            
             dcc.Upload(
                 id='upload-data',
                 children=html.Div(['Drag and Drop or ', html.A('Select XML File')]),
@@ -23,7 +31,7 @@ def create_main_layout(initial_df, initial_race_info, initial_incidents):
                 }
             ),
             
-            html.P([html.Span('📁', className='emoji-icon'), ' Maximum file size: 20MB • ', html.Span('🔒', className='emoji-icon'), ' Your data is not stored or persisted on the server - processed in memory only'], 
+            html.P([html.Span('📁', className='emoji-icon'), f' Maximum file size: {MAX_UPLOAD_MB:g}MB • ', html.Span('🔒', className='emoji-icon'), _storage_notice()], 
                    style={'textAlign': 'center', 'fontSize': '12px', 'color': '#666', 'margin': '0'}),
             
             dcc.Loading(
@@ -31,10 +39,12 @@ def create_main_layout(initial_df, initial_race_info, initial_incidents):
                 type='circle',
                 children=[html.Div(id='upload-status')]
             ),
+            # Progress of background upload parsing (outside the spinner so it stays visible)
+            html.Div(id='upload-progress', style={'textAlign': 'center', 'fontSize': '12px', 'color': '#666'}),
             
             create_filters_section(),
             
-            create_tabs_section(),
+            create_tabs_section(season=library.enabled()),
             
             dcc.Loading(
                 id='loading-tabs',
@@ -44,15 +54,27 @@ def create_main_layout(initial_df, initial_race_info, initial_incidents):
             ),
             
             # Data stores
-            dcc.Store(id='stored-data', data=initial_df.to_dict('records')),
             dcc.Store(id='stored-race-info', data=initial_race_info),
             dcc.Store(id='stored-incidents', data=initial_incidents),
+            # Laps stay on the server, read from the dataset cache by dataset-key
+            dcc.Store(id='dataset-key', data=initial_dataset_key),
+            dcc.Store(id='dataset-meta', data=dataset_metadata(initial_df)),
+            # Races loaded in this session, offered by the Compare tab
+            dcc.Store(id='session-races', data=[]),
             dcc.Store(id='standings-lap-store'),
             dcc.Store(id='laptimes-tab-store', data='laptimes-charts'),
-            dcc.Store(id='events-tab-store', data='events-chat')
+            dcc.Store(id='events-tab-store', data='events-chat'),
+            # Polls the watched results file (WATCH_RESULTS) for new laps
+            dcc.Interval(id='watch-interval', interval=int(watch.WATCH_INTERVAL * 1000)) if watch.enabled() else html.Div()
         ], className='main-container')
     ])
 
+def _storage_notice():
+    """Texto sobre onde os arquivos enviados ficam guardados no servidor"""
+    if disk_enabled():
+        return f' Parsed races are kept temporarily in a private server cache (the oldest are removed after {DISK_ENTRIES} races)'
+    return ' Your data is not stored or persisted on the server - processed in memory only'
+
 def create_filters_section():
     """Cria a seção de filtros"""
     return html.Div([
@@ -82,14 +104,18 @@ def create_filters_section():
         ], style={'display': 'inline-block', 'verticalAlign': 'top', 'padding': '10px'}),
     ])
 
-def create_tabs_section():
-    """Cria a seção de tabs"""
-    return dcc.Tabs(id='tabs', value='tab-standings', children=[
+def create_tabs_section(season=False):
+    """Cria a seção de tabs (com a aba Season quando a biblioteca de resultados está ativa)"""
+    tabs = [
         dcc.Tab(label='Standings', value='tab-standings'),
         dcc.Tab(label='Position', value='tab-position'),
         dcc.Tab(label='Gap', value='tab-gap'),
         dcc.Tab(label='Lap Times', value='tab-laptimes'),
         dcc.Tab(label='Fuel', value='tab-fuel'),
         dcc.Tab(label='Tires', value='tab-tires'),
-        dcc.Tab(label='Events', value='tab-incidents')
-    ])
\ No newline at end of file
+        dcc.Tab(label='Events', value='tab-incidents'),
+        dcc.Tab(label='Compare', value='tab-compare')
+    ]
+    if season:
+        tabs.append(dcc.Tab(label='Season', value='tab-season'))
+    return dcc.Tabs(id='tabs', value='tab-standings', children=tabs)
\ No newline at end of file
@@ -0,0 +1,220 @@
+import bisect
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+
+import dash
+import flask
+
+# Per-callback latency and payload metrics.
+# Enabled with CALLBACK_METRICS=True. When disabled register_callbacks gets
+# the plain app.callback and no request hook or route is installed, so the
+# only cost left is the flag check in data_phase/observe_rows/set_view.
+# Each process keeps its histograms in memory and flushes them to a JSON
+# file in METRICS_DIR, /metrics sums the files of every gunicorn worker.
+ENABLED = os.environ.get('CALLBACK_METRICS', 'False') == 'True'
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'rf2-lmu-charts-metrics'))
+FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1.0'))
+
+SECONDS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+BYTES_BUCKETS = [1e3, 1e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 5e7]
+ROWS_BUCKETS = [100, 1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6]
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    'rf2_callback_duration_seconds': ('Callback wall time', SECONDS_BUCKETS),
+    'rf2_callback_data_seconds': ('Time spent loading, filtering and sorting the dataset (pandas)', SECONDS_BUCKETS),
+    'rf2_callback_render_seconds': ('Time spent building figures and components (Plotly/Dash)', SECONDS_BUCKETS),
+    'rf2_callback_serialize_seconds': ('Time spent by Dash outside the callback, mostly JSON encoding', SECONDS_BUCKETS),
+    'rf2_callback_request_bytes': ('Callback request JSON size', BYTES_BUCKETS),
+    'rf2_callback_response_bytes': ('Callback response JSON size', BYTES_BUCKETS),
+    'rf2_callback_dataset_rows': ('Rows of the dataset used by the callback', ROWS_BUCKETS),
+}
+LABELS = ('callback', 'trigger', 'view')
+
+_histograms = {}
+_lock = threading.Lock()
+_local = threading.local()
+_last_flush = [0.0]
+
+
+def instrument_callbacks(app):
+    """Returns the decorator used to register callbacks, recording metrics when enabled"""
+    if not ENABLED:
+        return app.callback
+    _install(app.server)
+
+    def callback(*args, **kwargs):
+        register = app.callback(*args, **kwargs)
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*func_args, **func_kwargs):
+                record = {'callback': func.__name__, 'trigger': _trigger(), 'view': '', 'data': 0.0, 'depth': 0, 'rows': None}
+                _local.record = record
+                start = time.perf_counter()
+                try:
+                    return func(*func_args, **func_kwargs)
+                finally:
+                    record['duration'] = time.perf_counter() - start
+            return register(wrapper)
+        return decorator
+    return callback
+
+
+def data_phase(func):
+    """Counts the time spent in func as dataset (pandas) time of the running callback"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        record = getattr(_local, 'record', None) if ENABLED else None
+        if record is None or record['depth']:
+            return func(*args, **kwargs)
+        record['depth'] += 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record['data'] += time.perf_counter() - start
+            record['depth'] -= 1
+    return wrapper
+
+
+def observe_rows(rows):
+    """Records the dataset size used by the running callback"""
+    if ENABLED:
+        record = getattr(_local, 'record', None)
+        if record is not None:
+            record['rows'] = rows
+
+
+def set_view(view):
+    """Labels the running callback with the tab or view it renders"""
+    if ENABLED:
+        record = getattr(_local, 'record', None)
+        if record is not None:
+            record['view'] = view or ''
+
+
+def observe(name, value, labels):
+    """Adds a value to a histogram of this process"""
+    buckets = HISTOGRAMS[name][1]
+    key = (name,) + tuple(labels.get(label, '') for label in LABELS)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        entry['buckets'][bisect.bisect_left(buckets, value)] += 1
+        entry['sum'] += value
+        entry['count'] += 1
+
+
+def flush():
+    """Writes this process' histograms to the shared metrics directory"""
+    with _lock:
+        state = [{'key': list(key), **entry, 'buckets': list(entry['buckets'])} for key, entry in _histograms.items()]
+        _last_flush[0] = time.monotonic()
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, os.path.join(METRICS_DIR, f'{os.getpid()}.json'))
+    except OSError:
+        pass
+
+
+def collect():
+    """Sums the histograms flushed by every worker"""
+    totals = {}
+    try:
+        names = [name for name in os.listdir(METRICS_DIR) if name.endswith('.json')]
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for entry in state:
+            key = tuple(entry['key'])
+            if key[0] not in HISTOGRAMS:
+                continue
+            total = totals.setdefault(key, {'buckets': [0] * len(entry['buckets']), 'sum': 0.0, 'count': 0})
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+            total['sum'] += entry['sum']
+            total['count'] += entry['count']
+    return totals
+
+
+def render_prometheus(totals):
+    """Formats aggregated histograms in the Prometheus text exposition format"""
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        series = sorted((key, entry) for key, entry in totals.items() if key[0] == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, entry in series:
+            labels = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(LABELS, key[1:]))
+            cumulative = 0
+            for bound, count in zip(buckets + [float('inf')], entry['buckets']):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {entry["sum"]:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {entry["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _install(server):
+    if getattr(server, '_callback_metrics_installed', False):
+        return
+    server._callback_metrics_installed = True
+
+    @server.before_request
+    def _start_request():
+        _local.record = None
+        flask.g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _finish_request(response):
+        record = getattr(_local, 'record', None)
+        _local.record = None
+        if record is None or 'duration' not in record or not flask.request.path.endswith('/_dash-update-component'):
+            return response
+
+        total = time.perf_counter() - flask.g.metrics_start
+        labels = {label: record[label] for label in LABELS}
+        observe('rf2_callback_duration_seconds', record['duration'], labels)
+        observe('rf2_callback_data_seconds', record['data'], labels)
+        observe('rf2_callback_render_seconds', max(record['duration'] - record['data'], 0.0), labels)
+        observe('rf2_callback_serialize_seconds', max(total - record['duration'], 0.0), labels)
+        observe('rf2_callback_request_bytes', flask.request.content_length or 0, labels)
+        observe('rf2_callback_response_bytes', response.calculate_content_length() or 0, labels)
+        if record['rows'] is not None:
+            observe('rf2_callback_dataset_rows', record['rows'], labels)
+        if time.monotonic() - _last_flush[0] >= FLUSH_INTERVAL:
+            flush()
+        return response
+
+    @server.route('/metrics')
+    def _metrics():
+        flush()
+        return flask.Response(render_prometheus(collect()), mimetype='text/plain; version=0.0.4')
+
+
+def _trigger():
+    try:
+        triggered = dash.callback_context.triggered_id
+    except Exception:
+        return ''
+    if isinstance(triggered, dict):
+        return json.dumps(triggered, sort_keys=True)
+    return triggered or ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
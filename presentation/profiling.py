@@ -0,0 +1,161 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+
+import flask
+
+# On-demand cProfile capture of Dash callback requests.
+# PROFILE_CALLBACKS=True profiles every callback request; with PROFILE_TOKEN
+# set, only requests carrying the header 'X-Profile-Token: <token>' are
+# profiled. One request is profiled at a time per process (concurrent ones
+# run normally), so waitress threads and gunicorn workers never share a
+# profiler. Profiles are written to PROFILE_DIR as
+# <timestamp>-<pid>-<callback output>.pstats, keeping the newest
+# PROFILE_KEEP, plus a .collapsed stack summary when PROFILE_COLLAPSED=True.
+PROFILE_ALL = os.environ.get('PROFILE_CALLBACKS', 'False') == 'True'
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'rf2-lmu-charts-profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))
+PROFILE_COLLAPSED = os.environ.get('PROFILE_COLLAPSED', 'False') == 'True'
+
+DISPATCH_SUFFIX = '_dash-update-component'
+
+_busy = threading.Lock()
+
+
+def install_profiler(app):
+    """Wraps the Dash callback dispatch view in cProfile when profiling is enabled"""
+    if not (PROFILE_ALL or PROFILE_TOKEN):
+        return False
+    server = app.server
+    for rule in server.url_map.iter_rules():
+        view = server.view_functions.get(rule.endpoint)
+        if not rule.rule.endswith(DISPATCH_SUFFIX) or view is None or getattr(view, '_profiled', False):
+            continue
+        if inspect.iscoroutinefunction(view):
+            continue
+        server.view_functions[rule.endpoint] = _profiled(view)
+    return True
+
+
+def _profiled(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _requested() or not _busy.acquire(blocking=False):
+            return view(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                profiler.disable()
+        finally:
+            _busy.release()
+        name = save_profile(profiler, _callback_id())
+        response = flask.make_response(response)
+        if name:
+            response.headers['X-Profile-File'] = name
+        return response
+    wrapper._profiled = True
+    return wrapper
+
+
+def _requested():
+    if PROFILE_ALL:
+        return True
+    token = flask.request.headers.get(PROFILE_HEADER, '')
+    return bool(token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def _callback_id():
+    try:
+        output = (flask.request.get_json(silent=True) or {}).get('output', '')
+    except Exception:
+        output = ''
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(output)).strip('_.')[:80] or 'callback'
+
+
+def save_profile(profiler, callback_id):
+    """Writes the profile (and optionally its collapsed stacks) to the ring directory, returns the file name"""
+    stamp = time.strftime('%Y%m%d-%H%M%S') + f'-{int(time.time() * 1000) % 1000:03d}'
+    name = f'{stamp}-{os.getpid()}-{callback_id}'
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, name)
+        profiler.dump_stats(path + '.pstats')
+        if PROFILE_COLLAPSED:
+            with open(path + '.collapsed', 'w', encoding='utf-8') as f:
+                f.writelines(f'{stack} {value}\n' for stack, value in collapsed_stacks(pstats.Stats(profiler)))
+        _prune()
+    except OSError:
+        return None
+    return name + '.pstats'
+
+
+def collapsed_stacks(stats, max_depth=64, min_seconds=1e-5):
+    """Returns [(stack, microseconds)] in collapsed-stack format ('a;b;c 123') from pstats data.
+
+    cProfile only keeps caller -> callee edges, so each call path is rebuilt
+    from the roots and a function's own time is split among its callers in
+    proportion to the cumulative time of each edge.
+    """
+    entries = stats.stats
+    names = {func: _frame_name(func) for func in entries}
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+    roots = [func for func, entry in entries.items() if not entry[4]]
+
+    totals = {}
+
+    def visit(func, path, stack, share):
+        _, _, tt, ct, _ = entries[func]
+        stack = f'{stack};{names[func]}' if stack else names[func]
+        own = tt * share
+        if own > 0:
+            totals[stack] = totals.get(stack, 0.0) + own
+        if len(path) >= max_depth or ct <= 0:
+            return
+        path = path | {func}
+        for callee in callees.get(func, []):
+            if callee in path:
+                continue
+            edge_time = share * entries[callee][4][func][3]
+            # Paths below min_seconds are dropped, which also bounds the walk
+            if edge_time >= min_seconds:
+                visit(callee, path, stack, edge_time / entries[callee][3])
+
+    for root in roots:
+        visit(root, frozenset(), '', 1.0)
+    return sorted(((stack, int(seconds * 1e6)) for stack, seconds in totals.items() if seconds >= min_seconds),
+                  key=lambda item: -item[1])
+
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{os.path.basename(filename)}:{name}:{line}'
+
+
+def _prune():
+    profiles = sorted(
+        (os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR) if name.endswith('.pstats')),
+        key=os.path.getmtime
+    )
+    for path in profiles[:max(len(profiles) - PROFILE_KEEP, 0)]:
+        for stale in (path, path[:-len('.pstats')] + '.collapsed'):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
@@ -0,0 +1,42 @@
+import os
+
+import flask
+
+# Upload size limits.
+# MAX_UPLOAD_MB is the largest results file accepted; it is checked on the
+# base64 payload before anything is decoded. MAX_REQUEST_MB caps every
+# request body and is enforced from the Content-Length header (and while
+# streaming chunked bodies) before Flask reads or parses the JSON. Its
+# default leaves room for the base64 overhead (4/3) of the largest upload,
+# so oversized files still reach the callback and get a readable message.
+# No other callback sends race data: they carry the dataset key, filter
+# values and small metadata, well below the limit.
+MAX_UPLOAD_MB = float(os.environ.get('MAX_UPLOAD_MB', '20'))
+MAX_REQUEST_MB = float(os.environ.get('MAX_REQUEST_MB', str(MAX_UPLOAD_MB * 2)))
+
+
+def install_request_limit(app):
+    """Rejects request bodies larger than MAX_REQUEST_MB with 413 before they are read"""
+    server = app.server
+    limit = int(MAX_REQUEST_MB * 1024 * 1024)
+    # Also bounds chunked bodies, which have no Content-Length
+    server.config['MAX_CONTENT_LENGTH'] = limit
+    if getattr(server, '_request_limit_installed', False):
+        return
+    server._request_limit_installed = True
+
+    @server.before_request
+    def _reject_large_requests():
+        length = flask.request.content_length
+        if length is not None and length > server.config['MAX_CONTENT_LENGTH']:
+            # Close the connection instead of draining the unread body
+            response = flask.Response(f'Request body too large (maximum {MAX_REQUEST_MB:g}MB)', status=413,
+                                      mimetype='text/plain')
+            response.headers['Connection'] = 'close'
+            return response
+
+
+def decoded_size(content_string):
+    """Returns the size in bytes of a base64 payload without decoding it"""
+    padding = len(content_string) - len(content_string.rstrip('='))
+    return len(content_string) * 3 // 4 - padding
@@ -1,6 +1,16 @@
 import pytest
 import pandas as pd
 from pathlib import Path
+from data import cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Usa um diretório temporário para o cache em disco, fora do cache de um servidor em execução"""
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path))
+    cache.clear_memory()
+    yield
+    cache.clear_memory()
 
 
 @pytest.fixture
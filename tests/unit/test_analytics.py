@@ -7,7 +7,8 @@ from business.analytics import (
     update_fuel_chart, update_ve_chart, update_tire_wear_chart,
     update_fuel_level_chart, update_ve_level_chart, update_tire_consumption_chart,
     update_consistency_chart, update_tire_degradation_chart, update_pace_decay_chart,
-    update_strategy_gantt_chart
+    update_strategy_gantt_chart, update_lap_chart_heatmap,
+    update_interval_chart, update_class_interval_chart, update_battle_chart
 )
 
 
@@ -45,6 +46,38 @@ class TestPositionChart:
         assert len(fig.data) > 0
 
 
+class TestLapChartHeatmap:
+    """Testes para update_lap_chart_heatmap"""
+    
+    def test_empty_dataframe_returns_message(self):
+        """Testa se DataFrame vazio retorna mensagem"""
+        fig = update_lap_chart_heatmap([], None, None)
+        assert 'No data available' in fig.layout.annotations[0].text
+    
+    def test_single_heatmap_trace(self, sample_dataframe):
+        """Testa se o gráfico usa um único trace independente do número de pilotos"""
+        fig = update_lap_chart_heatmap(sample_dataframe, None, None)
+        assert len(fig.data) == 1
+        assert fig.data[0].type == 'heatmap'
+    
+    def test_cells_hold_driver_names(self, sample_dataframe):
+        """Testa se cada célula (posição, volta) identifica o piloto no hover"""
+        df = sample_dataframe.copy()
+        df.loc[df['Driver'] == 'Driver Two', 'Position'] = [2, 1]
+        df.loc[(df['Driver'] == 'Driver One') & (df['Lap'] == 1), 'Position'] = 2
+        fig = update_lap_chart_heatmap(df, None, None)
+        text = fig.data[0].text
+        assert text[0][0] == 'Driver One'
+        assert text[0][1] == 'Driver Two'
+        assert text[1][1] == 'Driver One'
+    
+    def test_driver_filter_applied(self, sample_dataframe):
+        """Testa se o filtro de pilotos remove as células dos demais"""
+        fig = update_lap_chart_heatmap(sample_dataframe, ['Driver Two'], None)
+        names = {name for row in fig.data[0].text for name in row if name}
+        assert names == {'Driver Two'}
+
+
 class TestGapChart:
     """Testes para update_gap_chart"""
     
@@ -64,6 +97,48 @@ class TestGapChart:
         assert isinstance(fig, go.Figure)
 
 
+class TestIntervalCharts:
+    """Testes para update_interval_chart e update_class_interval_chart"""
+    
+    def test_empty_dataframe_returns_message(self):
+        """Testa se DataFrame vazio retorna mensagem"""
+        assert 'No data available' in update_interval_chart([], None, None).layout.annotations[0].text
+        assert 'No data available' in update_class_interval_chart([], None, None).layout.annotations[0].text
+    
+    def test_one_trace_per_driver(self, sample_dataframe):
+        """Testa se há um trace por piloto"""
+        df = sample_dataframe.copy()
+        df['IntervalAhead'] = [0, 0, 0, 0.5]
+        df['ClassIntervalAhead'] = [0, 0, 0, 0.5]
+        assert len(update_interval_chart(df, None, None).data) == 2
+        assert len(update_class_interval_chart(df, ['Driver Two'], None).data) == 1
+
+
+class TestBattleChart:
+    """Testes para update_battle_chart"""
+    
+    def test_empty_dataframe_returns_message(self):
+        """Testa se DataFrame vazio retorna mensagem"""
+        fig = update_battle_chart([], None, None)
+        assert 'No data available' in fig.layout.annotations[0].text
+    
+    def test_no_battles_message(self, sample_dataframe):
+        """Testa mensagem quando não há batalhas"""
+        fig = update_battle_chart(sample_dataframe, None, None)
+        assert 'No battles found' in fig.layout.annotations[0].text
+    
+    def test_battles_in_single_trace(self):
+        """Testa se as batalhas são desenhadas em um único trace"""
+        rows = [{'Driver': d, 'Lap': lap, 'ET': lap * 100.0 + delay, 'Class': 'GT3'}
+                for d, delay in [('A', 0), ('B', 0.5), ('C', 20), ('D', 20.3)] for lap in range(1, 5)]
+        fig = update_battle_chart(pd.DataFrame(rows), None, None)
+        assert len(fig.data) == 1
+        # Closest battle first when both last the same number of laps
+        assert list(fig.data[0].y) == ['C vs D', 'A vs B']
+        fig = update_battle_chart(pd.DataFrame(rows), ['D'], None)
+        assert list(fig.data[0].y) == ['C vs D']
+
+
 class TestLaptimeChart:
     """Testes para update_laptime_chart"""
     
@@ -192,6 +267,16 @@ class TestTireDegradationChart:
         
         fig = update_tire_degradation_chart(data, None, None)
         assert isinstance(fig, go.Figure)
+    
+    def test_trend_line_per_stint(self):
+        """Testa se cada stint ajustado recebe uma reta de tendência"""
+        rows = [{'Driver': 'A', 'Class': 'GT3', 'Lap': lap, 'IsPit': False, 'FCompound': '0,Soft',
+                 'LapTime': 100 + 0.5 * lap, 'TireWear': 1 - 0.05 * lap} for lap in range(1, 6)]
+        fig = update_tire_degradation_chart(rows, None, None)
+        trends = [trace for trace in fig.data if trace.mode == 'lines']
+        assert len(fig.data) == 2 and len(trends) == 1
+        # Delta grows 0.5s per lap while wear grows 5% per lap
+        assert abs((trends[0].y[1] - trends[0].y[0]) / (trends[0].x[1] - trends[0].x[0]) - 0.1) < 1e-9
 
 
 class TestPaceDecayChart:
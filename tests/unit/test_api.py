@@ -0,0 +1,194 @@
+import gzip
+import pytest
+import pandas as pd
+from contextlib import closing
+from dash import Dash, html
+from data import library, watch
+from data.cache import put_dataset
+from data.parsers import parse_xml_scores
+from data.synthetic import race_xml
+from presentation import api
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente de teste de um servidor com a API de dados"""
+    monkeypatch.setattr(api, 'API_ENABLED', True)
+    app = Dash(__name__)
+    app.layout = html.Div()
+    api.install_api(app)
+    return app.server.test_client()
+
+
+@pytest.fixture
+def dataset():
+    """Corrida sintética no cache de datasets"""
+    df, race_info, incidents = parse_xml_scores(race_xml(drivers=8, laps=12, seed=3))
+    return put_dataset('api-test-race', df, race_info, incidents), df
+
+
+class TestLaps:
+    """Testes para o endpoint de voltas"""
+
+    def test_records(self, client, dataset):
+        """Testa se todas as voltas são retornadas como registros"""
+        key, df = dataset
+        response = client.get(f'/api/v1/datasets/{key}/laps')
+        assert response.status_code == 200
+        assert len(response.get_json()) == len(df)
+
+    def test_field_and_row_selection(self, client, dataset):
+        """Testa a seleção de colunas, pilotos e faixa de voltas"""
+        key, df = dataset
+        driver = df['Driver'].iloc[0]
+        rows = client.get(f'/api/v1/datasets/{key}/laps?fields=Driver,Lap,LapTime&driver={driver}&lap_from=3&lap_to=5').get_json()
+        assert {tuple(row) for row in rows} == {('Driver', 'Lap', 'LapTime')}
+        assert sorted(row['Lap'] for row in rows) == [3, 4, 5]
+        assert {row['Driver'] for row in rows} == {driver}
+
+    def test_columns_format(self, client, dataset):
+        """Testa o formato colunar com paginação"""
+        key, df = dataset
+        columns = client.get(f'/api/v1/datasets/{key}/laps?format=columns&fields=Lap,ET&offset=2&limit=5').get_json()
+        assert columns['Lap'] == df['Lap'].iloc[2:7].tolist()
+        assert columns['ET'] == pytest.approx(df['ET'].iloc[2:7].tolist())
+
+    def test_invalid_requests(self, client, dataset):
+        """Testa os erros de campos, parâmetros, formato e dataset desconhecidos"""
+        key, _ = dataset
+        assert client.get(f'/api/v1/datasets/{key}/laps?fields=Nope').status_code == 400
+        assert client.get(f'/api/v1/datasets/{key}/laps?limit=ten').status_code == 400
+        assert client.get(f'/api/v1/datasets/{key}/laps?format=xml').status_code == 400
+        assert client.get('/api/v1/datasets/missing/laps').status_code == 404
+        assert client.get('/api/v1/datasets/missing/laps').get_json()['error'] == 'unknown dataset missing'
+
+    def test_arrow_needs_pyarrow(self, client, dataset):
+        """Testa se format=arrow é recusado sem pyarrow"""
+        key, _ = dataset
+        if api._arrow_available():
+            pytest.skip('pyarrow instalado')
+        assert client.get(f'/api/v1/datasets/{key}/laps?format=arrow').status_code == 406
+
+
+class TestCaching:
+    """Testes para ETag e compressão"""
+
+    def test_not_modified(self, client, dataset, monkeypatch):
+        """Testa se um If-None-Match igual recebe 304 sem recalcular nada"""
+        key, _ = dataset
+        first = client.get(f'/api/v1/datasets/{key}/laps?fields=Lap')
+        monkeypatch.setattr(api, '_build', lambda *args: pytest.fail('rebuilt'))
+
+        again = client.get(f'/api/v1/datasets/{key}/laps?fields=Lap', headers={'If-None-Match': first.headers['ETag']})
+        assert again.status_code == 304
+        assert again.headers['ETag'] == first.headers['ETag']
+        # Sem If-None-Match o corpo vem do cache de respostas
+        assert client.get(f'/api/v1/datasets/{key}/laps?fields=Lap').data == first.data
+
+    def test_not_modified_unknown_dataset(self, client):
+        """Testa se o ETag de um dataset que o servidor não tem recebe 404, e não 304"""
+        from werkzeug.datastructures import MultiDict
+        etag = api._etag('0000', 'laps', MultiDict([('fields', 'Lap')]), False)
+        response = client.get('/api/v1/datasets/0000/laps?fields=Lap', headers={'If-None-Match': etag})
+        assert response.status_code == 404
+
+    def test_body_cache_is_bounded_by_size(self, client, dataset, monkeypatch):
+        """Testa se o cache de respostas respeita o limite em bytes"""
+        key, _ = dataset
+        monkeypatch.setattr(api, '_bodies', type(api._bodies)())
+        monkeypatch.setattr(api, '_bodies_size', 0)
+        size = len(client.get(f'/api/v1/datasets/{key}/laps?fields=Lap').data)
+        monkeypatch.setattr(api, 'BODY_CACHE_BYTES', size * 2)
+        for query in ('fields=ET', 'fields=Position', 'fields=LapTime'):
+            client.get(f'/api/v1/datasets/{key}/laps?{query}')
+        assert api._bodies_size <= size * 2
+        assert api._bodies_size == sum(len(body) for body in api._bodies.values())
+        # Um corpo maior que o limite inteiro é servido sem entrar no cache
+        cached = list(api._bodies)
+        monkeypatch.setattr(api, 'BODY_CACHE_BYTES', 1)
+        assert client.get(f'/api/v1/datasets/{key}/laps?fields=VE').status_code == 200
+        assert list(api._bodies) == cached
+
+    def test_etag_follows_query(self, client, dataset):
+        """Testa se consultas diferentes têm ETags diferentes"""
+        key, _ = dataset
+        etags = {client.get(f'/api/v1/datasets/{key}/laps?{query}').headers['ETag']
+                 for query in ('fields=Lap', 'fields=ET', 'fields=Lap&limit=3')}
+        assert len(etags) == 3
+
+    def test_gzip(self, client, dataset):
+        """Testa se o corpo é comprimido quando o cliente aceita gzip"""
+        key, _ = dataset
+        plain = client.get(f'/api/v1/datasets/{key}/laps')
+        compressed = client.get(f'/api/v1/datasets/{key}/laps', headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert compressed.headers['ETag'] != plain.headers['ETag']
+        assert compressed.headers['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(compressed.data) == plain.data
+
+
+class TestStandingsAndStints:
+    """Testes para os endpoints de classificação e stints"""
+
+    def test_standings_at_lap(self, client, dataset):
+        """Testa a classificação numa volta e na última volta"""
+        key, df = dataset
+        final = client.get(f'/api/v1/datasets/{key}/standings').get_json()
+        assert [row['Position'] for row in final] == list(range(1, df['Driver'].nunique() + 1))
+        assert final[0]['Gap'] == 'Leader'
+        laps = [row['Lap'] for row in client.get(f'/api/v1/datasets/{key}/standings?lap=4').get_json()]
+        assert max(laps) == 4 and laps == sorted(laps, reverse=True)
+
+    def test_stints(self, client, dataset):
+        """Testa o resumo de stints"""
+        key, df = dataset
+        stints = pd.DataFrame(client.get(f'/api/v1/datasets/{key}/stints').get_json())
+        assert set(stints['Driver']) == set(df['Driver'])
+
+    def test_info(self, client, dataset):
+        """Testa o resumo do dataset"""
+        key, df = dataset
+        info = client.get(f'/api/v1/datasets/{key}').get_json()
+        assert info['rows'] == len(df)
+        assert info['drivers'] == df['Driver'].nunique()
+        assert 0 < info['memory']['bytes'] < info['memory']['baseline_bytes']
+
+
+class TestSources:
+    """Testes para o modo watch e a biblioteca como fontes de dados"""
+
+    def test_live(self, client, tmp_path, sample_xml, monkeypatch):
+        """Testa o alias live do arquivo acompanhado"""
+        assert client.get('/api/v1/live').status_code == 404
+        path = tmp_path / 'live.xml'
+        path.write_text(sample_xml, encoding='utf-8')
+        monkeypatch.setattr(watch, 'WATCH_PATH', str(path))
+        monkeypatch.setattr(watch, '_state', {'signature': None, 'key': None, 'versions': []})
+        monkeypatch.setattr(watch, '_ensure_watcher', lambda: None)
+        key = watch.refresh()
+
+        assert client.get('/api/v1/live').get_json()['key'] == key
+        assert len(client.get('/api/v1/datasets/live/laps').get_json()) == len(parse_xml_scores(sample_xml)[0])
+
+    def test_library_race(self, client, tmp_path, sample_xml, monkeypatch):
+        """Testa se uma corrida da biblioteca é servida pelo seu hash"""
+        (tmp_path / 'race.xml').write_text(sample_xml, encoding='utf-8')
+        db_path = str(tmp_path / 'library.sqlite3')
+        monkeypatch.setattr(library, 'LIBRARY_DIR', str(tmp_path))
+        monkeypatch.setattr(library, 'LIBRARY_DB', db_path)
+        with closing(library.connect(db_path)) as conn:
+            library.scan_directory(conn)
+        monkeypatch.setattr(api, 'get_dataset', lambda key: None)
+
+        races = client.get('/api/v1/library/races').get_json()
+        assert len(races) == 1
+        assert races[0]['path'] == 'race.xml'
+        info = client.get(f"/api/v1/datasets/{races[0]['key']}").get_json()
+        assert info['rows'] == len(parse_xml_scores(sample_xml)[0])
+
+    def test_disabled(self, monkeypatch):
+        """Testa se DATA_API=False não registra os endpoints"""
+        monkeypatch.setattr(api, 'API_ENABLED', False)
+        app = Dash(__name__)
+        assert api.install_api(app) is False
+        assert app.server.test_client().get('/api/v1/live').status_code != 200
@@ -47,6 +47,16 @@ class TestAppInitialization:
         assert app.app.index_string is not None
         assert len(app.app.index_string) > 0
     
+    def test_initial_dataset_survives_uploads(self, monkeypatch):
+        """Testa se a corrida inicial continua disponível depois de mais uploads que o limite da memória"""
+        import app
+        from data import cache
+        monkeypatch.setattr(cache, 'DISK_CACHE', False)
+        for i in range(cache.MEMORY_ENTRIES + 1):
+            cache.put_dataset(f'upload{i}', app.initial_df.head(1), {}, {})
+        assert cache.get_dataframe('upload0') is None
+        assert cache.get_dataframe(app.initial_dataset_key) is app.initial_df
+    
     def test_suppress_callback_exceptions_enabled(self):
         """Testa se suppress_callback_exceptions está habilitado"""
         import app
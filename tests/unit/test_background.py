@@ -0,0 +1,79 @@
+import pytest
+from dash import Dash
+from presentation import background
+
+
+class TestBackgroundManager:
+    """Testes para o gerenciador de callbacks em background"""
+    
+    def test_disabled_returns_none(self, monkeypatch):
+        """Testa se BACKGROUND_UPLOADS=False mantém o parse na requisição"""
+        monkeypatch.setattr(background, 'BACKGROUND_UPLOADS', False)
+        assert background.background_manager() is None
+    
+    def test_frozen_build_returns_none(self, monkeypatch):
+        """Testa se o executável standalone não usa jobs em background"""
+        monkeypatch.setattr(background.sys, 'frozen', True, raising=False)
+        assert background.background_manager() is None
+    
+    def test_diskcache_manager_when_installed(self, tmp_path, monkeypatch):
+        """Testa se o DiskcacheManager é usado quando diskcache está instalado"""
+        pytest.importorskip('diskcache')
+        pytest.importorskip('multiprocess')
+        pytest.importorskip('psutil')
+        from dash import DiskcacheManager
+        monkeypatch.setattr(background, 'BACKGROUND_CACHE_DIR', str(tmp_path))
+        assert isinstance(background.background_manager(), DiskcacheManager)
+    
+    def test_foreign_directory_returns_none(self, tmp_path, monkeypatch):
+        """Testa se um diretório de jobs que não é privado mantém o parse na requisição"""
+        monkeypatch.setattr(background, 'BACKGROUND_CACHE_DIR', str(tmp_path))
+        monkeypatch.setattr(background, 'private_dir', lambda path: False)
+        assert background.background_manager() is None
+    
+    def test_upload_progress_text(self):
+        """Testa o texto de progresso do upload"""
+        assert background.upload_progress('race.xml', 3, 20, 150) == 'Parsing race.xml: 3/20 drivers, 150 laps'
+
+
+    def test_scan_progress_text(self):
+        """Testa o texto do rescan da biblioteca com falhas e duplicatas"""
+        summary = {'added': 1, 'skipped': 2, 'laps': 10, 'errors': [('a.xml', 'bad')], 'duplicates': 3}
+        assert background.scan_progress(2, 6, summary) == 'Scanning library: 2/6 files (1 added, 2 unchanged, 1 failed, 3 duplicates)'
+        assert background.scan_progress(None, None, {**summary, 'errors': 0, 'duplicates': []}) == 'Library scanned: 1 added, 2 unchanged'
+
+
+class TestUploadCallbackRegistration:
+    """Testes para o registro do callback de upload"""
+    
+    def _upload_callback(self, app):
+        from dash import html
+        app.layout = html.Div()
+        specs = app.server.test_client().get('/_dash-dependencies').get_json()
+        return next(spec for spec in specs if spec['inputs'][0]['id'] == 'upload-data')
+    
+    def test_sync_upload_without_manager(self, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se sem gerenciador o upload roda na requisição, inclusive na carga inicial"""
+        import presentation.callbacks as callbacks
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        
+        upload = self._upload_callback(app)
+        assert upload.get('background') is None
+        assert not upload['prevent_initial_call']
+    
+    def test_background_upload_with_manager(self, tmp_path, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se com gerenciador o upload vira job em background com progresso"""
+        pytest.importorskip('diskcache')
+        pytest.importorskip('multiprocess')
+        pytest.importorskip('psutil')
+        import presentation.callbacks as callbacks
+        monkeypatch.setattr(background, 'BACKGROUND_CACHE_DIR', str(tmp_path))
+        app = Dash(__name__)
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        
+        upload = self._upload_callback(app)
+        assert upload['background']['interval'] > 0
+        assert upload['prevent_initial_call']
+        assert upload['running']['running'] == {'upload-data.disabled': True}
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from business.battles import detect_battles, BATTLE_MIN_LAPS
+
+
+def _race(gaps, laps=6, cls='GT3'):
+    """Cria voltas onde cada piloto termina a volta com o atraso (s) dado em relação ao líder"""
+    rows = []
+    for driver, gap in gaps.items():
+        for lap in range(1, laps + 1):
+            delay = gap(lap) if callable(gap) else gap
+            rows.append({'Driver': driver, 'Lap': lap, 'ET': lap * 100.0 + delay, 'Class': cls})
+    return pd.DataFrame(rows)
+
+
+class TestDetectBattles:
+    """Testes para detect_battles"""
+    
+    def test_empty_dataframe(self):
+        """Testa DataFrame vazio"""
+        assert detect_battles(pd.DataFrame()).empty
+    
+    def test_detects_close_pair(self):
+        """Testa se um par próximo por voltas consecutivas é detectado"""
+        battles = detect_battles(_race({'A': 0, 'B': 0.5, 'C': 10}))
+        assert len(battles) == 1
+        battle = battles.iloc[0]
+        assert (battle['Driver'], battle['Rival']) == ('A', 'B')
+        assert (battle['StartLap'], battle['EndLap'], battle['Laps']) == (1, 6, 6)
+        assert abs(battle['MinInterval'] - 0.5) < 1e-9
+    
+    def test_short_runs_ignored(self):
+        """Testa se sequências menores que min_laps são ignoradas"""
+        df = _race({'A': 0, 'B': lambda lap: 0.5 if lap in (1, 2, 4, 5) else 5})
+        assert detect_battles(df, min_laps=3).empty
+        assert len(detect_battles(df, min_laps=2)) == 2
+    
+    def test_position_swap_keeps_battle(self):
+        """Testa se a troca de posição mantém a mesma batalha"""
+        df = _race({'A': 0, 'B': lambda lap: 0.4 if lap <= 3 else -0.4})
+        battles = detect_battles(df)
+        assert len(battles) == 1
+        assert battles.iloc[0]['Laps'] == 6
+    
+    def test_only_car_directly_ahead(self):
+        """Testa se apenas o carro imediatamente à frente é considerado"""
+        battles = detect_battles(_race({'A': 0, 'B': 0.6, 'C': 1.2}))
+        pairs = set(zip(battles['Driver'], battles['Rival']))
+        assert pairs == {('A', 'B'), ('B', 'C')}
+    
+    def test_by_class(self):
+        """Testa batalhas dentro da classe"""
+        df = pd.concat([_race({'A': 0, 'C': 1.0}, cls='GT3'), _race({'B': 0.5}, cls='LMP2')])
+        overall = detect_battles(df)
+        assert set(zip(overall['Driver'], overall['Rival'])) == {('A', 'B'), ('B', 'C')}
+        battles = detect_battles(df, by_class=True)
+        assert set(zip(battles['Driver'], battles['Rival'])) == {('A', 'C')}
+    
+    def test_large_field(self):
+        """Testa 60 carros x 700 voltas (o tempo é medido em benchmarks/suite.py)"""
+        rng = np.random.default_rng(1)
+        drivers = np.repeat([f'D{i:02d}' for i in range(60)], 700)
+        laps = np.tile(np.arange(1, 701), 60)
+        et = laps * 100.0 + np.repeat(np.arange(60) * 0.8, 700) + rng.normal(0, 0.3, len(laps))
+        df = pd.DataFrame({'Driver': drivers, 'Lap': laps, 'ET': et, 'Class': 'GT3'})
+        battles = detect_battles(df)
+        assert not battles.empty
+        assert (battles['Driver'] != battles['Rival']).all()
+        assert (battles['Laps'] >= BATTLE_MIN_LAPS).all()
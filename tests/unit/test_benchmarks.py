@@ -0,0 +1,17 @@
+import plotly.graph_objects as go
+from benchmarks import suite
+from data.parsers import parse_xml_scores
+
+
+class TestChartBuilders:
+    """Testes para a descoberta dos gráficos medidos pela suíte de benchmarks"""
+
+    def test_every_builder_runs_on_sample(self, sample_xml):
+        """Testa se todo gráfico encontrado aceita (dados, pilotos, classes) como a suíte chama"""
+        df, _, _ = parse_xml_scores(sample_xml)
+        builders = suite.chart_builders()
+
+        assert 'update_fuel_chart' in builders
+        assert not any('comparison' in name for name in builders)
+        for name, builder in builders.items():
+            assert isinstance(builder(df, None, None), go.Figure), name
@@ -0,0 +1,110 @@
+import os
+import stat
+import pytest
+import pandas as pd
+from data import cache
+
+
+class TestDatasetCache:
+    """Testes para o cache de datasets no servidor"""
+    
+    def test_key_is_content_hash(self):
+        """Testa se a chave depende apenas do conteúdo"""
+        assert cache.dataset_key('abc') == cache.dataset_key(b'abc')
+        assert cache.dataset_key('abc') != cache.dataset_key('abd')
+    
+    def test_put_and_get(self, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa armazenamento e leitura"""
+        key = cache.put_dataset('k1', sample_dataframe, sample_race_info, sample_incidents)
+        df, race_info, incidents = cache.get_dataset(key)
+        assert df is sample_dataframe
+        assert race_info == sample_race_info
+    
+    def test_unknown_key_returns_none(self):
+        """Testa chave desconhecida"""
+        assert cache.get_dataset('missing') is None
+        assert cache.get_dataset(None) is None
+    
+    def test_shared_through_disk(self, sample_dataframe):
+        """Testa se outro worker (sem memória) encontra o dataset no disco"""
+        cache.put_dataset('k2', sample_dataframe, {}, {})
+        cache.clear_memory()
+        df = cache.get_dataframe('k2')
+        pd.testing.assert_frame_equal(df, sample_dataframe)
+    
+    def test_memory_is_bounded(self, sample_dataframe, monkeypatch):
+        """Testa limite de entradas em memória"""
+        monkeypatch.setattr(cache, 'MEMORY_ENTRIES', 2)
+        for i in range(4):
+            cache.put_dataset(f'key{i}', sample_dataframe, {}, {})
+        assert len(cache._memory) == 2
+    
+    def test_disk_is_bounded(self, sample_dataframe, monkeypatch, tmp_path):
+        """Testa limite de arquivos em disco"""
+        monkeypatch.setattr(cache, 'DISK_ENTRIES', 2)
+        for i in range(4):
+            cache.put_dataset(f'key{i}', sample_dataframe, {}, {})
+        assert len(list(tmp_path.glob('*.pkl'))) == 2
+
+    def test_pinned_is_never_evicted(self, sample_dataframe, monkeypatch, tmp_path):
+        """Testa se o dataset fixado continua disponível após estourar os limites de memória e disco"""
+        monkeypatch.setattr(cache, '_pinned', {})
+        monkeypatch.setattr(cache, 'MEMORY_ENTRIES', 2)
+        monkeypatch.setattr(cache, 'DISK_ENTRIES', 2)
+        cache.put_dataset('initial', sample_dataframe, {}, {}, pin=True)
+        for i in range(4):
+            cache.put_dataset(f'key{i}', sample_dataframe, {}, {})
+        assert cache.get_dataframe('initial') is sample_dataframe
+        assert (tmp_path / 'initial.pkl').exists()
+        assert len(list(tmp_path.glob('*.pkl'))) == 3
+        cache.clear_memory()
+        assert cache.has_dataset('initial')
+
+
+class TestDiskCacheSafety:
+    """Testes para o diretório do cache em disco"""
+    
+    def test_private_directory(self, tmp_path, monkeypatch, sample_dataframe):
+        """Testa se o diretório é criado só para o usuário atual"""
+        directory = tmp_path / 'cache'
+        monkeypatch.setattr(cache, 'CACHE_DIR', str(directory))
+        cache.put_dataset('k1', sample_dataframe, {}, {})
+        assert list(directory.glob('*.pkl'))
+        if hasattr(os, 'getuid'):
+            assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+    
+    def test_open_directory_is_restricted(self, tmp_path):
+        """Testa se um diretório do usuário aberto a outros passa a 0700"""
+        directory = tmp_path / 'open'
+        directory.mkdir(mode=0o777)
+        os.chmod(directory, 0o777)
+        assert cache.private_dir(str(directory))
+        if hasattr(os, 'getuid'):
+            assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+    
+    @pytest.mark.skipif(not hasattr(os, 'getuid'), reason='POSIX owners')
+    def test_foreign_directory_is_not_used(self, tmp_path, monkeypatch, sample_dataframe):
+        """Testa se um diretório de outro usuário não é lido nem escrito"""
+        cache.put_dataset('k1', sample_dataframe, {}, {})
+        cache.clear_memory()
+        monkeypatch.setattr(cache.os, 'getuid', lambda: os.stat(tmp_path).st_uid + 1)
+        assert not cache.disk_enabled()
+        assert cache.get_dataset('k1') is None
+    
+    def test_symlink_is_not_used(self, tmp_path, monkeypatch):
+        """Testa se um link simbólico no lugar do diretório é recusado"""
+        target = tmp_path / 'target'
+        target.mkdir()
+        link = tmp_path / 'link'
+        try:
+            link.symlink_to(target, target_is_directory=True)
+        except OSError:
+            pytest.skip('symlinks not available')
+        assert not cache.private_dir(str(link))
+    
+    def test_memory_only(self, tmp_path, monkeypatch, sample_dataframe):
+        """Testa se com DATASET_CACHE_DISK=False nada é gravado em disco"""
+        monkeypatch.setattr(cache, 'DISK_CACHE', False)
+        cache.put_dataset('k1', sample_dataframe, {}, {})
+        assert not list(tmp_path.glob('*.pkl'))
+        assert cache.get_dataframe('k1') is sample_dataframe
@@ -253,3 +253,69 @@ class TestRenderEventsContent:
             result = 'Has penalties'
         
         assert result == 'No penalties'
+
+
+class TestDatasetVersion:
+    """Testes para as dependências dos callbacks em relação aos dados da corrida"""
+    
+    def test_no_callback_sends_stored_data(self, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se nenhum callback recebe o store completo; mudanças de dados chegam pelo dataset-key"""
+        import presentation.callbacks as callbacks
+        from dash import Dash, html
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        
+        specs = app.server.test_client().get('/_dash-dependencies').get_json()
+        dependencies = [dep['id'] for spec in specs for dep in spec['inputs'] + spec['state']]
+        assert 'stored-data' not in dependencies
+        restores = [spec for spec in specs if spec['output'] in ('laptimes-tabs.value', 'events-tabs.value')]
+        assert all(spec['inputs'][0]['id'] == 'dataset-key' for spec in restores)
+    
+    def test_standings_table_from_key(self, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se a tabela de standings é montada no servidor a partir do dataset-key e da classe"""
+        import presentation.callbacks as callbacks
+        from dash import Dash, html
+        from data.cache import put_dataset
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        key = put_dataset('standings-table-test', sample_dataframe, sample_race_info, sample_incidents)
+        
+        client = app.server.test_client()
+        specs = client.get('/_dash-dependencies').get_json()
+        spec = next(spec for spec in specs if spec['output'] == 'standings-table.children')
+        values = {'standings-lap-selector': 1, 'dataset-key': key, 'class-filter': None}
+        payload = {'output': spec['output'], 'outputs': {'id': 'standings-table', 'property': 'children'},
+                   'changedPropIds': ['standings-lap-selector.value'],
+                   'inputs': [dict(dep, value=values[dep['id']]) for dep in spec['inputs']],
+                   'state': [dict(dep, value=values[dep['id']]) for dep in spec['state']]}
+        response = client.post('/_dash-update-component', json=payload)
+        assert response.status_code == 200
+        assert sample_dataframe['Driver'].iloc[0] in response.get_data(as_text=True)
+    
+    def test_expired_key_shows_notice(self, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se um dataset-key que saiu do cache mostra o aviso de dataset expirado, e não gráficos vazios"""
+        import presentation.callbacks as callbacks
+        from dash import Dash, html
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        
+        client = app.server.test_client()
+        specs = client.get('/_dash-dependencies').get_json()
+        for output, values in [('tabs-content.children', {'tabs': 'tab-fuel'}),
+                               ('standings-table.children', {'standings-lap-selector': 1}),
+                               ('laptimes-content.children', {'laptimes-tabs': 'laptimes-table'})]:
+            spec = next(spec for spec in specs if spec['output'] == output)
+            values = {'dataset-key': 'expired-dataset', **values}
+            payload = {'output': output, 'outputs': dict(zip(('id', 'property'), output.split('.'))),
+                       'changedPropIds': [f"{spec['inputs'][0]['id']}.{spec['inputs'][0]['property']}"],
+                       'inputs': [dict(dep, value=values.get(dep['id'])) for dep in spec['inputs']],
+                       'state': [dict(dep, value=values.get(dep['id'])) for dep in spec['state']]}
+            response = client.post('/_dash-update-component', json=payload)
+            assert response.status_code == 200
+            assert 'dataset-expired' in response.get_data(as_text=True), output
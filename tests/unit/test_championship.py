@@ -0,0 +1,110 @@
+import pytest
+import pandas as pd
+from business.championship import (
+    DEFAULT_POINTS, RESULT_COLUMNS, points_table, race_results, score_results, accumulate, season_standings
+)
+from data.parsers import parse_xml_scores
+from data.synthetic import race_xml
+
+
+def _results(rows):
+    """Resultados de corrida a partir de (piloto, classe, posição na classe)"""
+    return pd.DataFrame([
+        {'Driver': driver, 'Class': car_class, 'Car': f'{driver} car', 'Position': n + 1, 'ClassPosition': position,
+         'Laps': 10, 'LapsLed': 10 if position == 1 else 0, 'BestLap': 100.0, 'Incidents': 1, 'Penalties': 0}
+        for n, (driver, car_class, position) in enumerate(rows)
+    ], columns=RESULT_COLUMNS)
+
+
+class TestPointsTable:
+    """Testes para a tabela de pontos configurável"""
+
+    def test_default(self, monkeypatch):
+        """Testa a tabela padrão sem CHAMPIONSHIP_POINTS"""
+        monkeypatch.delenv('CHAMPIONSHIP_POINTS', raising=False)
+        assert points_table() == DEFAULT_POINTS
+
+    def test_from_environment(self, monkeypatch):
+        """Testa a tabela definida por CHAMPIONSHIP_POINTS"""
+        monkeypatch.setenv('CHAMPIONSHIP_POINTS', '10, 6, 4, 3, 2, 1')
+        assert points_table() == (10, 6, 4, 3, 2, 1)
+
+    def test_fractional_points(self):
+        """Testa pontos fracionários"""
+        assert points_table('12.5,9,7') == (12.5, 9, 7)
+
+    def test_invalid(self):
+        """Testa se uma tabela inválida gera ValueError"""
+        with pytest.raises(ValueError):
+            points_table('25, abc')
+
+
+class TestRaceResults:
+    """Testes para a classificação final de uma corrida"""
+
+    def test_sample_race(self, sample_xml):
+        """Testa a classificação, voltas lideradas e eventos da corrida de teste"""
+        df, _, incidents = parse_xml_scores(sample_xml)
+        results = race_results(df, incidents)
+
+        assert list(results.columns) == RESULT_COLUMNS
+        assert results['Position'].tolist() == list(range(1, len(results) + 1))
+        # 'Driver Two: 5 second penalty'
+        assert results.set_index('Driver').loc['Driver Two', 'Penalties'] == 1
+
+    def test_orders_by_laps_then_time(self):
+        """Testa se a ordem segue voltas completadas e depois o tempo decorrido"""
+        df, _, incidents = parse_xml_scores(race_xml(drivers=12, laps=20, seed=4))
+        results = race_results(df, incidents)
+        last = df.sort_values('Lap').groupby('Driver', observed=True).tail(1).set_index('Driver').loc[results['Driver']]
+
+        assert (last['Lap'].diff().dropna() <= 0).all()
+        assert results.groupby('Class')['ClassPosition'].apply(lambda p: p.tolist() == list(range(1, len(p) + 1))).all()
+        assert results['LapsLed'].sum() == (df[df['Lap'] > 0]['Position'] == 1).sum()
+
+    def test_empty_race(self):
+        """Testa se uma corrida vazia não gera resultados"""
+        assert race_results(pd.DataFrame(), {}).empty
+
+
+class TestSeasonStandings:
+    """Testes para a agregação do campeonato"""
+
+    def test_points_by_class_position(self):
+        """Testa se os pontos seguem a posição na classe"""
+        scored = score_results(_results([('A', 'GT3', 1), ('B', 'Hyper', 1), ('C', 'GT3', 2), ('D', 'GT3', 3)]), (10, 5))
+        assert scored['Points'].tolist() == [10, 10, 5, 0]
+
+    def test_season_totals(self):
+        """Testa pontos, vitórias, média de chegada e ordem da classificação"""
+        races = [_results([('A', 'GT3', 1), ('B', 'GT3', 2)]), _results([('B', 'GT3', 1), ('A', 'GT3', 2)]),
+                 _results([('B', 'GT3', 1), ('C', 'GT3', 2)])]
+        totals = None
+        for results in races:
+            totals = accumulate(totals, results, (25, 18))
+        standings = season_standings(totals).set_index('Driver')
+
+        assert standings.loc['B', 'Rank'] == 1
+        assert standings.loc['B', 'Points'] == 68
+        assert standings.loc['A', 'Wins'] == 1
+        assert standings.loc['A', 'AvgFinish'] == 1.5
+        assert standings.loc['C', 'Races'] == 1
+        assert standings.loc['B', 'Incidents'] == 3
+
+    def test_incremental_matches_full(self):
+        """Testa se somar uma corrida por vez dá o mesmo que agregar a temporada inteira"""
+        races = []
+        for seed in range(4):
+            df, _, incidents = parse_xml_scores(race_xml(drivers=10, laps=10, seed=seed))
+            races.append(race_results(df, incidents))
+        totals = None
+        for results in races:
+            totals = accumulate(totals, results)
+
+        pd.testing.assert_frame_equal(season_standings(totals),
+                                      season_standings(accumulate(None, pd.concat(races, ignore_index=True))))
+
+    def test_empty_season(self):
+        """Testa se uma temporada sem corridas gera classificação vazia"""
+        assert season_standings(accumulate(None, _results([]))).empty
+        assert season_standings(None).empty
@@ -0,0 +1,89 @@
+import json
+import pytest
+import plotly.graph_objects as go
+import plotly.io as pio
+from data.cache import dataset_key, put_dataset, get_dataframe
+from data.parsers import parse_xml_scores
+from presentation import chart_executor
+
+CHARTS = ['update_fuel_chart', 'update_ve_chart']
+
+
+@pytest.fixture
+def cached_race(sample_xml):
+    """Corrida de teste no cache compartilhado (o mesmo lido pelos workers)"""
+    df, race_info, incidents = parse_xml_scores(sample_xml)
+    key = put_dataset(dataset_key(sample_xml), df, race_info, incidents)
+    return key, get_dataframe(key)
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """Liga o pool de gráficos e encerra os workers ao final"""
+    def enable(count):
+        monkeypatch.setattr(chart_executor, 'CHART_WORKERS', count)
+    yield enable
+    chart_executor.shutdown()
+
+
+class TestBuildCharts:
+    """Testes para a construção dos gráficos de uma aba"""
+
+    def test_serial_when_disabled(self, cached_race, workers):
+        """Testa se com CHART_WORKERS=0 os gráficos são construídos na própria requisição"""
+        workers(0)
+        key, df = cached_race
+        figures = chart_executor.build_charts(CHARTS, key, df, None)
+
+        assert all(isinstance(fig, go.Figure) for fig in figures)
+        assert chart_executor._executor is None
+
+    def test_serial_when_data_not_cached(self, cached_race, workers):
+        """Testa se dados que não vêm do cache (ex.: filtro sem pilotos) não usam o pool"""
+        workers(2)
+        key, df = cached_race
+        figures = chart_executor.build_charts(CHARTS, key, df.copy(), None)
+
+        assert all(isinstance(fig, go.Figure) for fig in figures)
+        assert chart_executor._executor is None
+
+    def test_pool_matches_serial(self, cached_race, workers):
+        """Testa se o pool gera as mesmas figuras que a construção serial"""
+        key, df = cached_race
+        drivers = sorted(df['Driver'].unique())[:2]
+        workers(0)
+        serial = [json.loads(pio.to_json(fig)) for fig in chart_executor.build_charts(CHARTS, key, df, drivers)]
+        workers(2)
+        pooled = chart_executor.build_charts(CHARTS, key, df, drivers)
+
+        assert chart_executor._executor is not None
+        assert [json.loads(pio.to_json(fig)) for fig in pooled] == serial
+
+    def test_spawn_without_forkserver(self, cached_race, workers, monkeypatch):
+        """Testa se sem forkserver (ex.: Windows) o pool usa spawn em vez de falhar"""
+        get_context = chart_executor.multiprocessing.get_context
+
+        def no_forkserver(method=None):
+            if method == 'forkserver':
+                raise ValueError('cannot find context for \'forkserver\'')
+            return get_context(method)
+        monkeypatch.setattr(chart_executor.multiprocessing, 'get_context', no_forkserver)
+        key, df = cached_race
+        workers(2)
+        figures = chart_executor.build_charts(CHARTS, key, df, None)
+
+        assert chart_executor._executor._mp_context.get_start_method() == 'spawn'
+        assert [fig['layout']['title'] for fig in figures] == [
+            fig.to_dict()['layout']['title'] for fig in chart_executor.build_charts(CHARTS, key, df.copy(), None)]
+
+    def test_workers_use_parent_cache_dir(self, sample_xml, workers, monkeypatch, tmp_path):
+        """Testa se os workers leem o mesmo diretório de cache do processo que os iniciou"""
+        from data import cache
+        monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+        df, race_info, incidents = parse_xml_scores(f'{sample_xml}\n<!-- workers -->')
+        key = put_dataset('chart-executor-dir', df, race_info, incidents)
+        workers(2)
+        figures = chart_executor.build_charts(CHARTS, key, get_dataframe(key), None)
+
+        assert chart_executor._executor is not None
+        assert all(isinstance(fig, dict) for fig in figures)
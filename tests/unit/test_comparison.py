@@ -0,0 +1,155 @@
+import pytest
+import pandas as pd
+import plotly.graph_objects as go
+from business.comparison import race_tables, combine_races, race_comparison_drivers, LAP_COLUMNS
+from business.analytics import (
+    build_race_laptime_comparison_chart, build_race_fuel_comparison_chart,
+    build_race_degradation_comparison_chart
+)
+from data.parsers import parse_xml_scores
+from data.synthetic import race_xml
+
+
+@pytest.fixture
+def race(sample_xml):
+    """Tabelas de comparação da corrida de teste"""
+    df, _, _ = parse_xml_scores(sample_xml)
+    return df, race_tables(df)
+
+
+class TestRaceTables:
+    """Testes para as tabelas de comparação de uma corrida"""
+
+    def test_only_green_flag_laps(self, race):
+        """Testa se voltas de box, out-laps e a volta 0 ficam de fora"""
+        df, (laps, _) = race
+        assert list(laps.columns) == LAP_COLUMNS[1:]
+        assert (laps['Lap'] > 0).all() and (laps['LapTime'] > 0).all()
+        pit_laps = set(map(tuple, df.loc[df['IsPit'].astype(bool), ['Driver', 'Lap']].to_numpy()))
+        out_laps = {(driver, lap + 1) for driver, lap in pit_laps}
+        assert not set(map(tuple, laps[['Driver', 'Lap']].to_numpy())) & (pit_laps | out_laps)
+
+    def test_empty_race(self):
+        """Testa se uma corrida vazia gera tabelas vazias"""
+        laps, fits = race_tables(pd.DataFrame())
+        assert laps.empty and fits.empty
+
+
+class TestCombineRaces:
+    """Testes para a combinação de várias corridas"""
+
+    def test_adds_race_key_in_order(self, race):
+        """Testa se a coluna Race segue a ordem das corridas e duplica as linhas de cada uma"""
+        _, tables = race
+        laps, fits = combine_races([('Round 2', tables), ('Round 1', tables)])
+
+        assert list(laps['Race'].cat.categories) == ['Round 2', 'Round 1']
+        assert laps.columns[0] == 'Race'
+        assert laps.groupby('Race', observed=True).size().tolist() == [len(tables[0])] * 2
+        assert len(fits) == 2 * len(tables[1])
+
+    def test_repeated_labels_are_numbered(self, race):
+        """Testa se corridas com o mesmo rótulo continuam separadas"""
+        _, tables = race
+        laps, _ = combine_races([('Spa', tables), ('Spa', tables)])
+        assert list(laps['Race'].cat.categories) == ['Spa', 'Spa (2)']
+
+    def test_no_races(self):
+        """Testa se nenhuma corrida gera tabelas vazias"""
+        laps, fits = combine_races([])
+        assert laps.empty and fits.empty
+        assert race_comparison_drivers(laps) == []
+
+
+class TestComparisonCharts:
+    """Testes para os gráficos de comparação entre corridas"""
+
+    def test_one_trace_for_all_races(self, race):
+        """Testa se as distribuições usam um único trace, qualquer que seja o número de corridas"""
+        _, tables = race
+        laps, _ = combine_races([(f'Round {n}', tables) for n in range(10)])
+
+        for builder in (build_race_laptime_comparison_chart, build_race_fuel_comparison_chart):
+            fig = builder(laps)
+            assert len(fig.data) == 1
+            assert len(set(fig.data[0].x)) == 10
+
+    def test_driver_filter(self, race):
+        """Testa se o gráfico mostra só as voltas do piloto escolhido"""
+        _, tables = race
+        laps, _ = combine_races([('Round 1', tables)])
+        driver = race_comparison_drivers(laps)[0]
+
+        fig = build_race_laptime_comparison_chart(laps, driver)
+
+        assert len(fig.data[0].y) == (laps['Driver'] == driver).sum()
+        assert driver in fig.layout.title.text
+
+    def test_degradation_average_per_race(self):
+        """Testa se a média de degradação tem um ponto por corrida e um marcador por stint"""
+        rounds = [(f'Round {seed}', race_tables(parse_xml_scores(race_xml(drivers=6, laps=30, seed=seed))[0]))
+                  for seed in (1, 2)]
+        _, fits = combine_races(rounds)
+
+        fig = build_race_degradation_comparison_chart(fits)
+
+        assert len(fig.data[0].y) == fits['LapSlope'].notna().sum()
+        assert list(fig.data[1].x) == ['Round 1', 'Round 2']
+
+    def test_empty_data(self):
+        """Testa se sem dados os gráficos mostram uma mensagem"""
+        laps, fits = combine_races([])
+        for fig in (build_race_laptime_comparison_chart(laps), build_race_fuel_comparison_chart(laps),
+                    build_race_degradation_comparison_chart(fits)):
+            assert isinstance(fig, go.Figure)
+            assert len(fig.data) == 0
+
+
+class TestComparisonCallbacks:
+    """Testes para os callbacks da aba Compare"""
+
+    @pytest.fixture
+    def client(self, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        from dash import Dash, html
+        import presentation.callbacks as callbacks
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        return app.server.test_client()
+
+    def _call(self, client, output, values):
+        specs = client.get('/_dash-dependencies').get_json()
+        spec = next(spec for spec in specs if spec['output'] == output)
+        items = lambda deps: [dict(dep, value=values.get(f"{dep['id']}.{dep['property']}")) for dep in deps]
+        outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in output[2:-2].split('...')] \
+            if output.startswith('..') else dict(zip(('id', 'property'), output.rsplit('.', 1)))
+        changed = [f"{dep['id']}.{dep['property']}" for dep in spec['inputs']][:1]
+        payload = {'output': output, 'outputs': outputs, 'inputs': items(spec['inputs']),
+                   'state': items(spec.get('state', [])), 'changedPropIds': changed}
+        response = client.post('/_dash-update-component', json=payload)
+        assert response.status_code == 200
+        return response.get_json()['response']
+
+    def test_compares_session_races(self, client, sample_xml):
+        """Testa se as corridas da sessão são comparadas e os pilotos listados"""
+        from data.cache import dataset_key, put_dataset
+        races = []
+        for seed in (1, 2):
+            content = race_xml(drivers=6, laps=30, seed=seed)
+            df, race_info, incidents = parse_xml_scores(content)
+            key = put_dataset(dataset_key(content), df, race_info, incidents)
+            races = self._call(client, 'session-races.data', {
+                'dataset-key.data': key, 'stored-race-info.data': race_info, 'session-races.data': races
+            })['session-races']['data']
+        assert len(races) == 2
+
+        response = self._call(client, '..comparison-charts.children...compare-driver.options..', {
+            'compare-races.value': [race['value'] for race in races], 'compare-races.options': races
+        })
+
+        charts = response['comparison-charts']['children']['props']['children']
+        assert [chart['props']['id'] for chart in charts] == [
+            'race-laptime-comparison-chart', 'race-degradation-comparison-chart', 'race-fuel-comparison-chart'
+        ]
+        assert len(response['compare-driver']['options']) == 6
@@ -1,7 +1,10 @@
 import pytest
 import pandas as pd
 from dash import html
-from presentation.components import create_standings_table
+from presentation.components import (
+    create_standings_table, build_laptimes_view, format_laptimes_rows, create_laptimes_page,
+    create_degradation_table
+)
 
 
 class TestCreateStandingsTable:
@@ -131,3 +134,89 @@ class TestCreateStandingsTable:
         
         result = create_standings_table(10, data)
         assert isinstance(result, html.Table)
+
+
+
+class TestLaptimesTable:
+    """Testes para a tabela de tempos de volta paginada"""
+    
+    def _many_laps(self, laps=250):
+        rows = []
+        for driver, pos in [('D1', 1), ('D2', 2)]:
+            rows.append({'Driver': driver, 'Lap': 0, 'Position': pos, 'ET': 0, 'LapTime': 0, 'IsPit': False,
+                         'FuelLevel': 0, 'VE': 0, 'Car': f'Car {driver}', 'FCompound': '', 'RCompound': ''})
+            for lap in range(1, laps + 1):
+                rows.append({'Driver': driver, 'Lap': lap, 'Position': pos, 'ET': lap * 100.0, 'LapTime': 100.0 + pos,
+                             'IsPit': lap % 50 == 0, 'FuelLevel': 0.5, 'VE': 0, 'Car': f'Car {driver}',
+                             'FCompound': '0,Soft', 'RCompound': '0,Soft'})
+        return pd.DataFrame(rows)
+    
+    def test_view_contains_every_lap(self):
+        """Testa se a visão não trunca voltas"""
+        view = build_laptimes_view(self._many_laps(1500))
+        assert len(view) == 3000
+    
+    def test_view_grouped_by_finishing_order(self):
+        """Testa se a visão agrupa por ordem de chegada"""
+        view = build_laptimes_view(self._many_laps())
+        assert view['Driver'].iloc[0] == 'D1'
+        assert view['Driver'].iloc[-1] == 'D2'
+        assert view['StartPos'].iloc[0] == 1
+    
+    def test_view_sorted_by_lap_time_desc(self):
+        """Testa ordenação por tempo de volta sem agrupamento"""
+        view = build_laptimes_view(self._many_laps(), 'LapTime', ascending=False, group_by_driver=False)
+        assert view['LapTime'].is_monotonic_decreasing
+    
+    def test_view_pit_filters(self):
+        """Testa filtros de voltas de pit"""
+        df = self._many_laps()
+        assert build_laptimes_view(df, lap_type='pit')['IsPit'].all()
+        assert not build_laptimes_view(df, lap_type='no-pit')['IsPit'].any()
+    
+    def test_empty_view(self):
+        """Testa visão vazia"""
+        assert build_laptimes_view(pd.DataFrame()).empty
+    
+    def test_format_rows(self, sample_dataframe):
+        """Testa formatação vetorizada das colunas"""
+        formatted = format_laptimes_rows(sample_dataframe[sample_dataframe['Lap'] > 0])
+        first = formatted.iloc[0]
+        assert first['LapTime'] == '2:00.500'
+        assert first['S1'] == '40.100'
+        assert first['Fuel'] == '95.0%'
+        assert first['VE'] == '10.0%'
+        assert first['TireWear'] == 'FL:98% FR:97% RL:96% RR:95%'
+        assert first['Compounds'] == 'Soft/Soft'
+        assert first['Pit'] == ''
+    
+    def test_page_has_page_size_rows_and_group_headers(self):
+        """Testa se a página contém apenas as linhas pedidas e cabeçalhos de grupo"""
+        view = build_laptimes_view(self._many_laps())
+        table = create_laptimes_page(view, 2, 100)
+        rows = table.children[1].children
+        # Page 3 covers laps 201-250 of D1 and 1-50 of D2, plus one header for each driver
+        assert len(rows) == 102
+    
+    def test_page_out_of_range(self):
+        """Testa página fora do intervalo"""
+        view = build_laptimes_view(self._many_laps(10))
+        assert isinstance(create_laptimes_page(view, 5, 100), html.P)
+
+
+class TestDegradationTable:
+    """Testes para a tabela de taxas de degradação"""
+    
+    def test_empty_rates(self):
+        """Testa sem taxas"""
+        assert isinstance(create_degradation_table(pd.DataFrame()), html.P)
+    
+    def test_sorted_rows(self):
+        """Testa ordenação das linhas"""
+        rates = pd.DataFrame({'Class': ['GT3', 'Hyper'], 'Compound': ['Soft', 'Medium'], 'Stints': [3, 2],
+                              'Laps': [30, 20], 'LapSlope': [0.05, 0.2], 'WearSlope': [0.1, 0.3]})
+        rows = create_degradation_table(rates, 'LapSlope', ascending=False).children[1].children
+        assert rows[0].children[0].children == 'Hyper'
+        assert rows[0].children[4].children == '+0.200s'
+        rows = create_degradation_table(rates, 'Laps', ascending=True).children[1].children
+        assert rows[0].children[0].children == 'Hyper'
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from business.degradation import assign_stints, fit_stint_degradation, degradation_rates
+
+
+def _stints(driver='A', cls='GT3', compound='0,Soft', laps=12, pits=(6,), base=100.0, per_lap=0.2, wear_per_lap=0.02):
+    """Cria voltas de um piloto com perda linear de tempo e desgaste dentro de cada stint"""
+    rows = []
+    stint_lap = 0
+    for lap in range(0, laps + 1):
+        is_pit = lap in pits
+        rows.append({
+            'Driver': driver, 'Class': cls, 'Lap': lap, 'IsPit': is_pit, 'FCompound': compound,
+            'LapTime': 0.0 if lap == 0 else base + per_lap * stint_lap,
+            'TireWear': 0.0 if lap == 0 else 1 - wear_per_lap * (stint_lap + 1)
+        })
+        stint_lap = 0 if is_pit else stint_lap + 1
+    return pd.DataFrame(rows)
+
+
+class TestAssignStints:
+    """Testes para assign_stints"""
+    
+    def test_empty_dataframe(self):
+        """Testa DataFrame vazio"""
+        assert assign_stints(pd.DataFrame()).empty
+    
+    def test_pit_and_out_laps_excluded(self):
+        """Testa se a volta de pit e a volta seguinte são removidas"""
+        laps = assign_stints(_stints())
+        assert 6 not in laps['Lap'].values
+        assert 7 not in laps['Lap'].values
+        assert 0 not in laps['Lap'].values
+    
+    def test_stints_numbered_per_driver(self):
+        """Testa numeração dos stints e voltas dentro do stint"""
+        laps = assign_stints(pd.concat([_stints('A'), _stints('B', pits=(3, 8))]))
+        a = laps[laps['Driver'] == 'A']
+        assert sorted(a['Stint'].unique()) == [1, 2]
+        assert a[a['Stint'] == 2]['StintLap'].tolist() == [0, 1, 2, 3, 4]
+        assert sorted(laps[laps['Driver'] == 'B']['Stint'].unique()) == [1, 2, 3]
+    
+    def test_compound_extracted(self):
+        """Testa extração do composto dianteiro"""
+        assert set(assign_stints(_stints(compound='0,Medium'))['Compound']) == {'Medium'}
+
+
+class TestFitStintDegradation:
+    """Testes para fit_stint_degradation"""
+    
+    def test_empty_laps(self):
+        """Testa sem voltas válidas"""
+        assert fit_stint_degradation(pd.DataFrame()).empty
+    
+    def test_matches_polyfit(self):
+        """Testa se a regressão agrupada coincide com polyfit stint a stint"""
+        df = _stints(laps=20, pits=(9,))
+        rng = np.random.default_rng(1)
+        df['LapTime'] = np.where(df['Lap'] > 0, df['LapTime'] + rng.normal(0, 0.3, len(df)), 0)
+        laps = assign_stints(df)
+        fits = fit_stint_degradation(laps)
+        for fit in fits.to_dict('records'):
+            stint = laps[laps['Stint'] == fit['Stint']]
+            slope, intercept = np.polyfit(stint['TireDeg'], stint['LapTime'], 1)
+            assert abs(fit['WearSlope'] - slope) < 1e-9
+            assert abs(fit['WearIntercept'] - intercept) < 1e-6
+            assert abs(fit['LapSlope'] - np.polyfit(stint['StintLap'], stint['LapTime'], 1)[0]) < 1e-9
+    
+    def test_linear_degradation_recovered(self):
+        """Testa se a perda por volta e por % de desgaste é recuperada"""
+        fits = fit_stint_degradation(assign_stints(_stints(per_lap=0.2, wear_per_lap=0.02)))
+        assert np.allclose(fits['LapSlope'], 0.2)
+        assert np.allclose(fits['WearSlope'], 0.1)
+    
+    def test_short_stints_skipped(self):
+        """Testa se stints com menos voltas que o mínimo são ignorados"""
+        fits = fit_stint_degradation(assign_stints(_stints(pits=(3,))))
+        # Stint 1 has laps 1-2 only
+        assert fits['Stint'].tolist() == [2]
+    
+    def test_many_stints_in_one_pass(self):
+        """Testa muitos pilotos e stints de uma vez"""
+        df = pd.concat([_stints(f'D{i}', laps=60, pits=(15, 30, 45), per_lap=0.01 * i) for i in range(40)])
+        fits = fit_stint_degradation(assign_stints(df))
+        assert len(fits) == 160
+        assert np.allclose(fits.groupby('Driver')['LapSlope'].mean().sort_index(key=lambda d: d.str[1:].astype(int)),
+                           [0.01 * i for i in range(40)])
+
+
+class TestDegradationRates:
+    """Testes para degradation_rates"""
+    
+    def test_empty_fits(self):
+        """Testa sem ajustes"""
+        assert degradation_rates(pd.DataFrame()).empty
+    
+    def test_rates_by_class_and_compound(self):
+        """Testa agregação por classe e composto ponderada por voltas"""
+        df = pd.concat([
+            _stints('A', 'GT3', '0,Soft', per_lap=0.2),
+            _stints('B', 'GT3', '0,Soft', per_lap=0.4),
+            _stints('C', 'Hyper', '0,Medium', per_lap=0.1)
+        ])
+        rates = degradation_rates(fit_stint_degradation(assign_stints(df))).set_index(['Class', 'Compound'])
+        assert rates.loc[('GT3', 'Soft'), 'Stints'] == 4
+        assert abs(rates.loc[('GT3', 'Soft'), 'LapSlope'] - 0.3) < 1e-9
+        assert abs(rates.loc[('Hyper', 'Medium'), 'LapSlope'] - 0.1) < 1e-9
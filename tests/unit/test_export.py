@@ -0,0 +1,81 @@
+import json
+import pytest
+from data.synthetic import race_xml
+from presentation import export
+
+
+@pytest.fixture
+def season(tmp_path):
+    """Diretório com duas corridas sintéticas"""
+    directory = tmp_path / 'season'
+    directory.mkdir()
+    for seed in (1, 2):
+        (directory / f'race{seed}.xml').write_text(race_xml(drivers=6, laps=8, seed=seed), encoding='utf-8')
+    return directory
+
+
+class TestExportRaces:
+    """Testes para a exportação estática de corridas"""
+
+    def test_bundle(self, season, tmp_path):
+        """Testa se gráficos, tabelas e páginas de cada corrida são gravados"""
+        output = tmp_path / 'out'
+        summary = export.export_races(sorted(str(path) for path in season.iterdir()), str(output))
+
+        assert summary == {'races': 2, 'figures': 2 * len(export.export_items()), 'errors': []}
+        assert (output / export.PLOTLY_JS).exists()
+        assert 'race1/index.html' in (output / 'index.html').read_text(encoding='utf-8')
+        race = json.loads((output / 'race1' / 'race.json').read_text(encoding='utf-8'))
+        for chart_id in race['charts']:
+            assert 'data' in json.loads((output / 'race1' / 'charts' / f'{chart_id}.json').read_text(encoding='utf-8'))
+        standings = json.loads((output / 'race1' / 'standings.json').read_text(encoding='utf-8'))
+        assert [row['Position'] for row in standings] == list(range(1, 7))
+        page = (output / 'race1' / 'index.html').read_text(encoding='utf-8')
+        assert f'src="../{export.PLOTLY_JS}"' in page
+        assert page.count('Plotly.newPlot') == len(race['charts'])
+
+    def test_parallel_matches_serial(self, season, tmp_path):
+        """Testa se a exportação em processos gera os mesmos arquivos"""
+        paths = sorted(str(path) for path in season.iterdir())
+        export.export_races(paths, str(tmp_path / 'serial'), workers=1)
+        summary = export.export_races(paths, str(tmp_path / 'parallel'), workers=2)
+
+        assert summary['races'] == 2
+        for name in ('standings.json', 'laptimes.json', 'charts/gap-chart.json'):
+            assert (tmp_path / 'serial' / 'race2' / name).read_text() == (tmp_path / 'parallel' / 'race2' / name).read_text()
+
+    def test_keeps_server_cache(self, season, tmp_path):
+        """Testa se as corridas exportadas não entram no diretório de cache do servidor"""
+        from data import cache
+        server_dir = tmp_path / 'server-cache'
+        cache.CACHE_DIR = str(server_dir)
+        export.export_races(sorted(str(path) for path in season.iterdir()), str(tmp_path / 'out'), workers=2)
+
+        assert cache.CACHE_DIR == str(server_dir)
+        assert not list(server_dir.glob('*.pkl'))
+
+    def test_invalid_file(self, season, tmp_path):
+        """Testa se um arquivo inválido é reportado sem interromper as outras corridas"""
+        (season / 'broken.xml').write_text('<rFactorXML><RaceResults>', encoding='utf-8')
+        summary = export.export_races(sorted(str(path) for path in season.iterdir()), str(tmp_path / 'out'))
+        assert summary['races'] == 2
+        assert [path for path, _ in summary['errors']] == [str(season / 'broken.xml')]
+
+    def test_race_folders(self):
+        """Testa se corridas com o mesmo nome de arquivo ganham pastas distintas"""
+        assert export.race_folders(['a/race 1.xml', 'b/race 1.xml']) == {'a/race 1.xml': 'race_1', 'b/race 1.xml': 'race_1_2'}
+
+
+class TestMain:
+    """Testes para a linha de comando"""
+
+    def test_single_file(self, season, tmp_path, capsys):
+        """Testa a exportação de um arquivo pela linha de comando"""
+        assert export.main([str(season / 'race1.xml'), '-o', str(tmp_path / 'out'), '--workers', '1', '--quiet']) == 0
+        assert '1 races' in capsys.readouterr().out
+        assert (tmp_path / 'out' / 'race1' / 'index.html').exists()
+
+    def test_empty_directory(self, tmp_path):
+        """Testa se um diretório sem resultados é recusado"""
+        with pytest.raises(SystemExit):
+            export.main([str(tmp_path), '-o', str(tmp_path / 'out')])
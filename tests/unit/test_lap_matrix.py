@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+import pandas as pd
+from business.lap_matrix import LapMatrix, get_lap_matrix
+
+
+class TestLapMatrix:
+    """Testes para a matriz pilotos x voltas"""
+    
+    def test_shape_and_indexes(self, sample_dataframe):
+        """Testa índices de pilotos e voltas"""
+        matrix = LapMatrix(sample_dataframe)
+        assert list(matrix.drivers) == ['Driver One', 'Driver Two']
+        assert list(matrix.laps) == [0, 1]
+        assert matrix.values('Position').shape == (2, 2)
+    
+    def test_values_aligned_with_laps(self, sample_dataframe):
+        """Testa se os valores estão na célula (piloto, volta) correta"""
+        matrix = LapMatrix(sample_dataframe)
+        row = matrix.driver_index['Driver Two']
+        assert matrix.values('LapTime')[row, 1] == 121.0
+        assert matrix.values('FuelLevel')[row, 0] == 0
+    
+    def test_missing_laps_are_nan(self):
+        """Testa se voltas ausentes ficam como NaN"""
+        df = pd.DataFrame([
+            {'Driver': 'A', 'Lap': 1, 'Position': 1, 'LapTime': 100},
+            {'Driver': 'A', 'Lap': 3, 'Position': 1, 'LapTime': 101},
+            {'Driver': 'B', 'Lap': 1, 'Position': 2, 'LapTime': 102}
+        ])
+        matrix = LapMatrix(df)
+        assert list(matrix.laps) == [1, 2, 3]
+        assert np.isnan(matrix.values('LapTime')[0, 1])
+        laps, values = matrix.series('LapTime', 0)
+        assert list(laps) == [1, 3]
+        assert list(values) == [100, 101]
+    
+    def test_unknown_field_raises(self, sample_dataframe):
+        """Testa campo inexistente"""
+        with pytest.raises(KeyError):
+            LapMatrix(sample_dataframe).values('GapToLeader')
+    
+    def test_rows_filters(self, sample_dataframe):
+        """Testa tradução dos filtros para linhas de pilotos"""
+        matrix = LapMatrix(sample_dataframe)
+        assert list(matrix.rows()) == [0, 1]
+        assert list(matrix.rows(['Driver Two'])) == [1]
+        assert list(matrix.rows(None, ['GT3'], ['Team A #1'])) == [0]
+        assert list(matrix.rows(None, ['LMP2'])) == []
+    
+    def test_after_pit_mask(self):
+        """Testa máscara da volta seguinte ao pit"""
+        df = pd.DataFrame([
+            {'Driver': 'A', 'Lap': lap, 'Position': 1, 'IsPit': lap == 2} for lap in range(1, 5)
+        ])
+        matrix = LapMatrix(df)
+        assert list(matrix.after_pit()[0]) == [False, False, True, False]
+    
+    def test_ordered_follows_table_order(self):
+        """Testa se a ordem dos pilotos segue a primeira volta válida na tabela"""
+        df = pd.DataFrame([
+            {'Driver': 'A', 'Lap': 0, 'Position': 1, 'LapTime': 0},
+            {'Driver': 'B', 'Lap': 0, 'Position': 2, 'LapTime': 0},
+            {'Driver': 'B', 'Lap': 1, 'Position': 1, 'LapTime': 100},
+            {'Driver': 'A', 'Lap': 1, 'Position': 2, 'LapTime': 101}
+        ])
+        matrix = LapMatrix(df)
+        rows = matrix.ordered(matrix.rows(), matrix.values('LapTime') > 0)
+        assert [matrix.drivers[row] for row in rows] == ['B', 'A']
+    
+    def test_cached_per_dataframe(self, sample_dataframe):
+        """Testa se a matriz é construída uma única vez por DataFrame"""
+        assert get_lap_matrix(sample_dataframe) is get_lap_matrix(sample_dataframe)
+        assert get_lap_matrix(sample_dataframe.copy()) is not get_lap_matrix(sample_dataframe)
+    
+    def test_records_input(self, sample_dataframe):
+        """Testa construção a partir de registros"""
+        matrix = get_lap_matrix(sample_dataframe.to_dict('records'))
+        assert len(matrix.drivers) == 2
@@ -37,6 +37,15 @@ class TestCreateMainLayout:
         has_dropdown = self._find_component_by_type(layout, dcc.Dropdown)
         assert has_dropdown
     
+    @pytest.mark.parametrize('disk', [True, False])
+    def test_storage_notice(self, monkeypatch, disk, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se o aviso sobre armazenamento segue o modo do cache de datasets"""
+        import presentation.layouts as layouts
+        monkeypatch.setattr(layouts, 'disk_enabled', lambda: disk)
+        text = str(create_main_layout(sample_dataframe, sample_race_info, sample_incidents))
+        assert ('server cache' in text) is disk
+        assert ('processed in memory only' in text) is not disk
+    
     def _find_component_by_type(self, component, component_type):
         """Função auxiliar para encontrar componente por tipo"""
         if isinstance(component, component_type):
@@ -165,7 +174,13 @@ class TestCreateTabsSection:
         tab_values = [tab.value for tab in tabs.children]
         assert 'tab-incidents' in tab_values
     
-    def test_has_all_seven_tabs(self):
-        """Testa se tem todas as 7 tabs"""
+    def test_contains_compare_tab(self):
+        """Testa se contém tab de comparação entre corridas"""
+        tabs = create_tabs_section()
+        tab_values = [tab.value for tab in tabs.children]
+        assert 'tab-compare' in tab_values
+    
+    def test_has_all_eight_tabs(self):
+        """Testa se tem todas as 8 tabs"""
         tabs = create_tabs_section()
-        assert len(tabs.children) == 7
+        assert len(tabs.children) == 8
@@ -0,0 +1,330 @@
+import os
+import pytest
+import pandas as pd
+from contextlib import closing
+from dash import Dash, html
+from data import library
+from data.cache import get_dataset
+from data.parsers import parse_xml_scores
+
+
+@pytest.fixture
+def results_dir(tmp_path, sample_xml):
+    """Diretório de resultados com uma corrida de teste"""
+    directory = tmp_path / 'results'
+    directory.mkdir()
+    (directory / 'race.xml').write_text(sample_xml, encoding='utf-8')
+    (directory / 'notes.txt').write_text('not a result file')
+    return directory
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Conexão com um banco da biblioteca vazio"""
+    with closing(library.connect(str(tmp_path / 'library.sqlite3'))) as conn:
+        yield conn
+
+
+class TestScanDirectory:
+    """Testes para a ingestão de um diretório de resultados"""
+
+    def test_ingests_result_files(self, conn, results_dir, sample_xml):
+        """Testa se apenas arquivos de resultado são ingeridos"""
+        summary = library.scan_directory(conn, str(results_dir))
+        df, _, _ = parse_xml_scores(sample_xml)
+        assert summary == {'added': 1, 'skipped': 0, 'laps': int((df['Lap'] > 0).sum()), 'errors': [],
+                           'duplicates': []}
+        assert len(library.list_races(conn)) == 1
+
+    def test_skips_unchanged_files(self, conn, results_dir):
+        """Testa se um novo scan não reprocessa arquivos sem mudanças"""
+        library.scan_directory(conn, str(results_dir))
+        summary = library.scan_directory(conn, str(results_dir))
+        assert summary == {'added': 0, 'skipped': 1, 'laps': 0, 'errors': [], 'duplicates': []}
+
+    def test_moved_file_keeps_race(self, conn, results_dir):
+        """Testa se um arquivo movido mantém a corrida (mesmo hash) com o novo caminho"""
+        library.scan_directory(conn, str(results_dir))
+        race_id = library.list_races(conn)[0]['id']
+        (results_dir / 'season').mkdir()
+        os.replace(results_dir / 'race.xml', results_dir / 'season' / 'race.xml')
+
+        summary = library.scan_directory(conn, str(results_dir))
+
+        races = library.list_races(conn)
+        assert summary['skipped'] == 1
+        assert [race['id'] for race in races] == [race_id]
+        assert races[0]['path'] == os.path.abspath(results_dir / 'season' / 'race.xml')
+
+    def test_copies_are_duplicates(self, conn, results_dir, sample_xml):
+        """Testa se duas cópias da mesma corrida não trocam de caminho a cada scan"""
+        original = os.path.abspath(results_dir / 'race.xml')
+        (results_dir / 'season').mkdir()
+        (results_dir / 'season' / 'race.xml').write_text(sample_xml, encoding='utf-8')
+        library.scan_directory(conn, str(results_dir))
+
+        for _ in range(2):
+            summary = library.scan_directory(conn, str(results_dir))
+            assert summary['duplicates'] == [(os.path.abspath(results_dir / 'season' / 'race.xml'), original)]
+            assert [race['path'] for race in library.list_races(conn)] == [original]
+
+        os.remove(original)
+        library.scan_directory(conn, str(results_dir))
+        assert [race['path'] for race in library.list_races(conn)] == [
+            os.path.abspath(results_dir / 'season' / 'race.xml')]
+
+    def test_reports_invalid_files(self, conn, results_dir, invalid_xml):
+        """Testa se arquivos inválidos são reportados sem interromper o scan"""
+        (results_dir / 'broken.xml').write_text(invalid_xml, encoding='utf-8')
+        summary = library.scan_directory(conn, str(results_dir))
+        assert summary['added'] == 1
+        assert [os.path.basename(path) for path, _ in summary['errors']] == ['broken.xml']
+
+
+class TestParallelScan:
+    """Testes para a ingestão em paralelo e a retomada após interrupção"""
+
+    @pytest.fixture
+    def season_dir(self, tmp_path, sample_xml, invalid_xml):
+        """Temporada com quatro corridas (conteúdos diferentes) e um arquivo inválido"""
+        directory = tmp_path / 'season'
+        directory.mkdir()
+        for n in range(4):
+            (directory / f'round{n}.xml').write_text(f'{sample_xml}\n<!-- round {n} -->', encoding='utf-8')
+        (directory / 'broken.xml').write_text(invalid_xml, encoding='utf-8')
+        return directory
+
+    def test_parallel_matches_serial(self, tmp_path, season_dir):
+        """Testa se o pool de processos ingere o mesmo que a ingestão serial"""
+        with closing(library.connect(str(tmp_path / 'serial.sqlite3'))) as serial, \
+                closing(library.connect(str(tmp_path / 'parallel.sqlite3'))) as parallel:
+            expected = library.scan_directory(serial, str(season_dir))
+            summary = library.scan_directory(parallel, str(season_dir), workers=2)
+
+            assert summary['added'] == expected['added'] == 4
+            assert summary['laps'] == expected['laps']
+            assert [os.path.basename(path) for path, _ in summary['errors']] == ['broken.xml']
+            for race in library.list_races(parallel):
+                race_id = next(r['id'] for r in library.list_races(serial) if r['path'] == race['path'])
+                pd.testing.assert_frame_equal(library.load_race(parallel, race['id'])[1], library.load_race(serial, race_id)[1])
+
+    def test_resumes_after_interruption(self, conn, season_dir):
+        """Testa se um scan interrompido retoma sem reprocessar os arquivos já gravados"""
+        def crash(done, total, summary):
+            if summary['added'] == 2:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            library.scan_directory(conn, str(season_dir), progress=crash)
+        summary = library.scan_directory(conn, str(season_dir))
+
+        assert (summary['added'], summary['skipped']) == (2, 2)
+        assert len(library.list_races(conn)) == 4
+
+    def test_reports_progress(self, conn, season_dir):
+        """Testa se o progresso é reportado para cada arquivo"""
+        calls = []
+        library.scan_directory(conn, str(season_dir), progress=lambda done, total, summary: calls.append((done, total)))
+        assert calls == [(n, 5) for n in range(1, 6)]
+
+
+class TestLoadRace:
+    """Testes para a leitura de corridas da biblioteca"""
+
+    def test_round_trip_matches_parser(self, conn, results_dir, sample_xml):
+        """Testa se a corrida lida do banco é idêntica à saída do parser"""
+        library.scan_directory(conn, str(results_dir))
+        race_id = library.list_races(conn)[0]['id']
+        df, race_info, incidents = parse_xml_scores(sample_xml)
+
+        sha1, loaded_df, loaded_info, loaded_incidents = library.load_race(conn, race_id)
+
+        assert sha1 == library.race_key(conn, race_id)
+        pd.testing.assert_frame_equal(loaded_df, df)
+        assert loaded_info == race_info
+        assert loaded_incidents == incidents
+
+    def test_unknown_race(self, conn):
+        """Testa se uma corrida inexistente retorna None"""
+        assert library.load_race(conn, 999) is None
+        assert library.race_key(conn, 999) is None
+
+    def test_stints(self, conn, results_dir, sample_xml):
+        """Testa se os stints cobrem todas as voltas de cada piloto"""
+        library.scan_directory(conn, str(results_dir))
+        race_id = library.list_races(conn)[0]['id']
+        df, _, _ = parse_xml_scores(sample_xml)
+
+        stints = library.race_stints(conn, race_id)
+
+        laps = df[df['Lap'] > 0].groupby('Driver', observed=True).size()
+        assert stints.groupby('Driver')['Laps'].sum().to_dict() == laps.to_dict()
+
+
+class TestSeasonResults:
+    """Testes para os resultados por corrida gravados na ingestão"""
+
+    def test_results_stored_at_ingest(self, conn, results_dir, sample_xml):
+        """Testa se a classificação final é gravada junto com a corrida"""
+        from business.championship import race_results
+        library.scan_directory(conn, str(results_dir))
+        df, _, incidents = parse_xml_scores(sample_xml)
+
+        results = library.season_results(conn)
+
+        assert results['RaceId'].nunique() == 1
+        pd.testing.assert_frame_equal(results.drop(columns=['RaceId', 'Date']), race_results(df, incidents),
+                                      check_dtype=False)
+
+    def test_only_requested_races(self, conn, results_dir, sample_xml):
+        """Testa se apenas as corridas pedidas são lidas"""
+        (results_dir / 'other.xml').write_text(f'{sample_xml}\n<!-- other -->', encoding='utf-8')
+        library.scan_directory(conn, str(results_dir))
+        race_id = library.list_races(conn)[0]['id']
+
+        assert set(library.season_results(conn, [race_id])['RaceId']) == {race_id}
+        assert {race_id for race_id, _ in library.race_versions(conn)} == {race['id'] for race in library.list_races(conn)}
+
+    def test_migrates_version_1(self, tmp_path, results_dir):
+        """Testa se um banco da versão 1 ganha os resultados sem reprocessar os arquivos"""
+        db_path = str(tmp_path / 'v1.sqlite3')
+        with closing(library.connect(db_path)) as conn:
+            library.scan_directory(conn, str(results_dir))
+            expected = library.season_results(conn)
+            conn.execute('DROP TABLE results')
+            conn.execute('PRAGMA user_version = 1')
+        (results_dir / 'race.xml').unlink()
+
+        with closing(library.connect(db_path)) as conn:
+            pd.testing.assert_frame_equal(library.season_results(conn), expected)
+            assert conn.execute('PRAGMA user_version').fetchone()[0] == library.SCHEMA_VERSION
+
+
+class TestListRaces:
+    """Testes para os filtros da listagem de corridas"""
+
+    def test_filters(self, conn, results_dir, sample_xml):
+        """Testa os filtros por piloto, pista e classe"""
+        library.scan_directory(conn, str(results_dir))
+        df, race_info, _ = parse_xml_scores(sample_xml)
+        driver, car_class = df['Driver'].iloc[0], df['Class'].iloc[0]
+
+        assert len(library.list_races(conn, driver=driver)) == 1
+        assert len(library.list_races(conn, track=race_info['track'])) == 1
+        assert len(library.list_races(conn, car_class=car_class)) == 1
+        assert library.list_races(conn, driver='Nobody') == []
+        assert library.list_races(conn, track='Nowhere') == []
+
+    def test_relative_path(self, tmp_path):
+        """Testa se os caminhos ficam relativos à biblioteca, sem expor diretórios de fora dela"""
+        root = tmp_path / 'library'
+        assert library.relative_path(str(root / 'season' / 'race.xml'), str(root)) == 'season/race.xml'
+        assert library.relative_path(str(tmp_path / 'other' / 'race.xml'), str(root)) == 'race.xml'
+
+
+class TestMain:
+    """Testes para a linha de comando da biblioteca"""
+
+    def test_ingests_directory(self, tmp_path, results_dir, capsys):
+        """Testa se o CLI ingere o diretório e resume o resultado"""
+        db_path = tmp_path / 'cli.sqlite3'
+        assert library.main([str(results_dir), '--db', str(db_path), '--quiet']) == 0
+        assert '1 added, 0 unchanged, 0 errors, 0 duplicates' in capsys.readouterr().out
+        with closing(library.connect(str(db_path))) as conn:
+            assert len(library.list_races(conn)) == 1
+
+
+class TestLibraryCallbacks:
+    """Testes para os callbacks do seletor da biblioteca"""
+
+    @pytest.fixture
+    def client(self, tmp_path, results_dir, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        import presentation.callbacks as callbacks
+        monkeypatch.setattr(library, 'LIBRARY_DIR', str(results_dir))
+        monkeypatch.setattr(library, 'LIBRARY_DB', str(tmp_path / 'app.sqlite3'))
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        return app.server.test_client()
+
+    def _call(self, client, input_id, value):
+        specs = client.get('/_dash-dependencies').get_json()
+        spec = next(spec for spec in specs if spec['inputs'][0]['id'] == input_id)
+        prop = spec['inputs'][0]['property']
+        output = spec['output']
+        if output.startswith('..'):
+            outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in output[2:-2].split('...')]
+        else:
+            outputs = dict(zip(('id', 'property'), output.rsplit('.', 1)))
+        inputs = [dict(dep, value=value if dep['id'] == input_id else None) for dep in spec['inputs']]
+        payload = {'output': output, 'outputs': outputs, 'changedPropIds': [f'{input_id}.{prop}'],
+                   'inputs': inputs, 'state': []}
+        response = client.post('/_dash-update-component', json=payload)
+        assert response.status_code == 200
+        return response.get_json()['response']
+
+    def _rescan(self, client, n_clicks):
+        """Clica em Rescan e atualiza o dropdown com o resumo, como o navegador faz"""
+        response = self._call(client, 'library-refresh', n_clicks)
+        summary = next(value['data'] for output, value in response.items() if output.startswith('library-scan'))
+        return summary, self._call(client, 'library-scan', summary)['library-race']['options']
+
+    def test_rescan_lists_races(self, client):
+        """Testa se o Rescan ingere o diretório e preenche o dropdown"""
+        assert self._call(client, 'library-scan', None)['library-race']['options'] == []
+        summary, options = self._rescan(client, 1)
+        assert summary['added'] == 1
+        assert len(options) == 1
+        assert options[0]['label'].endswith('race.xml')
+
+    def test_rescan_is_background_job_with_manager(self, tmp_path, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        """Testa se com gerenciador o Rescan vira job em background com progresso"""
+        pytest.importorskip('diskcache')
+        pytest.importorskip('multiprocess')
+        pytest.importorskip('psutil')
+        import presentation.callbacks as callbacks
+        from presentation import background
+        monkeypatch.setattr(library, 'LIBRARY_DIR', str(tmp_path))
+        monkeypatch.setattr(background, 'BACKGROUND_CACHE_DIR', str(tmp_path / 'jobs'))
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        specs = app.server.test_client().get('/_dash-dependencies').get_json()
+        rescan = next(spec for spec in specs if spec['inputs'][0]['id'] == 'library-refresh')
+        assert rescan['background']['interval'] > 0
+        assert rescan['running']['running'] == {'library-refresh.disabled': True}
+
+    def test_season_table_adds_new_races(self, client, results_dir, sample_xml, monkeypatch):
+        """Testa se a classificação do campeonato soma só as corridas novas aos totais em cache"""
+        import presentation.callbacks as callbacks
+        from business import championship
+        monkeypatch.setattr(callbacks, '_season_totals', type(callbacks._season_totals)())
+        self._rescan(client, 1)
+        accumulated = []
+        accumulate = championship.accumulate
+        monkeypatch.setattr(championship, 'accumulate', lambda totals, results, points: accumulated.append(
+            results['RaceId'].nunique()) or accumulate(totals, results, points))
+
+        first = self._call(client, 'season-points', '25, 18')
+        (results_dir / 'round2.xml').write_text(f'{sample_xml}\n<!-- round 2 -->', encoding='utf-8')
+        self._rescan(client, 2)
+        second = self._call(client, 'season-points', '25, 18')
+
+        assert accumulated == [1, 1]
+        races = [row['props']['children'][4]['props']['children']
+                 for row in second['season-table']['children']['props']['children'][1]['props']['children']]
+        assert set(races) == {2}
+        assert first['season-class']['options']
+
+    def test_select_loads_race(self, client, sample_xml):
+        """Testa se escolher uma corrida carrega os stores e o cache de datasets"""
+        _, options = self._rescan(client, 1)
+        response = self._call(client, 'library-race', options[0]['value'])
+
+        df, _, _ = parse_xml_scores(sample_xml)
+        key = next(value['data'] for output, value in response.items() if output.startswith('dataset-key'))
+        metadata = next(value['data'] for output, value in response.items() if output.startswith('dataset-meta'))
+        assert not any(output.startswith('stored-data') for output in response)
+        assert metadata['max_lap'] == df['Lap'].max()
+        assert get_dataset(key) is not None
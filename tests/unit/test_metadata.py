@@ -0,0 +1,100 @@
+import json
+import pandas as pd
+import pytest
+from dash import Dash, html
+from data.metadata import dataset_metadata, empty_metadata, max_lap
+from data.parsers import parse_xml_scores
+from data.synthetic import race_xml
+
+
+@pytest.fixture
+def race():
+    """Corrida sintética com duas classes"""
+    df, _, _ = parse_xml_scores(race_xml(drivers=12, laps=10, seed=3))
+    return df
+
+
+class TestDatasetMetadata:
+    """Testes para os metadados de filtro do dataset"""
+
+    def test_distinct_values(self, race):
+        """Testa se os valores distintos vêm ordenados e iguais aos da tabela"""
+        metadata = dataset_metadata(race)
+        assert metadata['drivers'] == sorted(race['Driver'].astype(str).unique())
+        assert metadata['classes'] == sorted(race['Class'].astype(str).unique())
+        assert metadata['teams'] == sorted(race['Car'].astype(str).unique())
+        assert metadata['vehicles'] == sorted(v for v in race['VehName'].astype(str).unique() if v)
+        assert metadata['car_types'] == sorted(v for v in race['CarType'].astype(str).unique() if v)
+
+    def test_laps_and_duration(self, race):
+        """Testa última volta, voltas por piloto e duração"""
+        metadata = dataset_metadata(race)
+        assert metadata['max_lap'] == race['Lap'].max()
+        assert metadata['duration'] == pytest.approx(race['ET'].max())
+        completed = race[race['Lap'] > 0].groupby('Driver', observed=True).size()
+        assert metadata['laps_by_driver'] == {str(d): int(n) for d, n in completed.items()}
+        for car_class, lap in metadata['max_lap_by_class'].items():
+            assert lap == race.loc[race['Class'] == car_class, 'Lap'].max()
+
+    def test_json_and_small(self, race):
+        """Testa se os metadados são JSON e muito menores que as voltas"""
+        metadata = dataset_metadata(race)
+        assert json.loads(json.dumps(metadata)) == metadata
+        assert len(json.dumps(metadata)) * 10 < len(json.dumps(race.astype(object).to_dict('records'), default=str))
+
+    def test_empty(self):
+        """Testa os metadados de uma tabela vazia"""
+        assert dataset_metadata(pd.DataFrame()) == empty_metadata()
+        assert dataset_metadata(None)['drivers'] == []
+
+    def test_max_lap_by_class(self, race):
+        """Testa a última volta com e sem classes selecionadas"""
+        metadata = dataset_metadata(race)
+        assert max_lap(metadata) == metadata['max_lap']
+        car_class = metadata['classes'][0]
+        assert max_lap(metadata, [car_class]) == metadata['max_lap_by_class'][car_class]
+        assert max_lap(metadata, ['Unknown']) == 0
+        assert max_lap(None, [car_class]) == 0
+
+
+class TestUpdateFiltersCallback:
+    """Testes para o callback de opções dos filtros"""
+
+    @pytest.fixture
+    def client(self, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        import presentation.callbacks as callbacks
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        return app.server.test_client()
+
+    def _update_filters(self, client, metadata):
+        specs = client.get('/_dash-dependencies').get_json()
+        spec = next(spec for spec in specs if spec['inputs'][0]['id'] == 'dataset-meta')
+        outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in spec['output'][2:-2].split('...')]
+        payload = {'output': spec['output'], 'outputs': outputs, 'changedPropIds': ['dataset-meta.data'],
+                   'inputs': [{'id': 'dataset-meta', 'property': 'data', 'value': metadata}],
+                   'state': [dict(dep, value=None) for dep in spec['state']]}
+        response = client.post('/_dash-update-component', json=payload)
+        assert response.status_code == 200
+        return response.get_json()['response']
+
+    def test_depends_only_on_metadata(self, client):
+        """Testa se as opções dos filtros dependem só do store de metadados"""
+        specs = client.get('/_dash-dependencies').get_json()
+        spec = next(spec for spec in specs if 'driver-filter.options' in spec['output'])
+        assert [dep['id'] for dep in spec['inputs']] == ['dataset-meta']
+
+    def test_options_from_metadata(self, client, race):
+        """Testa se as opções saem dos metadados"""
+        metadata = dataset_metadata(race)
+        response = self._update_filters(client, metadata)
+        assert [o['value'] for o in response['driver-filter']['options']] == metadata['drivers']
+        assert [o['value'] for o in response['class-filter']['options']] == metadata['classes']
+        assert response['driver-filter']['value'] is None
+
+    def test_empty_metadata(self, client):
+        """Testa se metadados vazios limpam as opções"""
+        response = self._update_filters(client, empty_metadata())
+        assert response['car-filter']['options'] == []
@@ -0,0 +1,116 @@
+import json
+import os
+import pytest
+import dash
+from dash import html, dcc, Input, Output
+from presentation import metrics
+
+
+@pytest.fixture
+def enabled(tmp_path, monkeypatch):
+    """Ativa as métricas com um diretório temporário"""
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_histograms', {})
+    return tmp_path
+
+
+def _app():
+    """Cria um app Dash mínimo com um callback instrumentado"""
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='in', value='a'), html.Div(id='out')])
+    callback = metrics.instrument_callbacks(app)
+    
+    @metrics.data_phase
+    def load(value):
+        metrics.observe_rows(1234)
+        return value * 3
+    
+    @callback(Output('out', 'children'), Input('in', 'value'))
+    def echo(value):
+        metrics.set_view('tab-test')
+        return load(value)
+    
+    return app
+
+
+def _post(client, value):
+    """Dispara o callback pelo endpoint do Dash"""
+    return client.post('/_dash-update-component', json={
+        'output': 'out.children', 'outputs': {'id': 'out', 'property': 'children'},
+        'inputs': [{'id': 'in', 'property': 'value', 'value': value}], 'changedPropIds': ['in.value']
+    })
+
+
+class TestMetricsDisabled:
+    """Testes com as métricas desativadas"""
+    
+    def test_plain_app_callback(self, monkeypatch):
+        """Testa se sem métricas o decorator é o próprio app.callback"""
+        monkeypatch.setattr(metrics, 'ENABLED', False)
+        app = dash.Dash(__name__)
+        assert metrics.instrument_callbacks(app) == app.callback
+        assert app.server.test_client().get('/metrics').status_code != 200
+    
+    def test_helpers_are_noops(self, monkeypatch):
+        """Testa se os auxiliares não registram nada"""
+        monkeypatch.setattr(metrics, 'ENABLED', False)
+        monkeypatch.setattr(metrics, '_histograms', {})
+        assert metrics.data_phase(lambda x: x + 1)(1) == 2
+        metrics.observe_rows(10)
+        metrics.set_view('x')
+        assert metrics._histograms == {}
+
+
+class TestMetricsEnabled:
+    """Testes com as métricas ativadas"""
+    
+    def test_callback_recorded(self, enabled):
+        """Testa se latência, tamanhos e linhas são registrados por callback"""
+        client = _app().server.test_client()
+        assert _post(client, 'ab').status_code == 200
+        
+        text = client.get('/metrics').data.decode()
+        labels = 'callback="echo",trigger="in",view="tab-test"'
+        assert f'rf2_callback_duration_seconds_count{{{labels}}} 1' in text
+        assert f'rf2_callback_data_seconds_count{{{labels}}} 1' in text
+        assert f'rf2_callback_dataset_rows_bucket{{{labels},le="1000"}} 0' in text
+        assert f'rf2_callback_dataset_rows_bucket{{{labels},le="5000"}} 1' in text
+        assert f'rf2_callback_response_bytes_bucket{{{labels},le="+Inf"}} 1' in text
+        assert '# TYPE rf2_callback_request_bytes histogram' in text
+    
+    def test_aggregated_across_workers(self, enabled):
+        """Testa se /metrics soma os arquivos de todos os workers"""
+        client = _app().server.test_client()
+        _post(client, 'a')
+        client.get('/metrics')
+        
+        # Another worker flushed the same series
+        with open(os.path.join(enabled, f'{os.getpid()}.json')) as f:
+            state = json.load(f)
+        with open(os.path.join(enabled, '999999.json'), 'w') as f:
+            json.dump(state, f)
+        
+        text = client.get('/metrics').data.decode()
+        assert 'rf2_callback_duration_seconds_count{callback="echo",trigger="in",view="tab-test"} 2' in text
+    
+    def test_ignores_corrupted_files(self, enabled):
+        """Testa se arquivos inválidos de outros workers são ignorados"""
+        (enabled / 'broken.json').write_text('{not json')
+        assert metrics.collect() == {}
+
+
+class TestPrometheusFormat:
+    """Testes para render_prometheus"""
+    
+    def test_cumulative_buckets(self, enabled):
+        """Testa se os buckets são cumulativos e terminam em +Inf"""
+        labels = {'callback': 'cb', 'trigger': '', 'view': ''}
+        for value in [0.001, 0.2, 20]:
+            metrics.observe('rf2_callback_duration_seconds', value, labels)
+        metrics.flush()
+        text = metrics.render_prometheus(metrics.collect())
+        assert 'rf2_callback_duration_seconds_bucket{callback="cb",trigger="",view="",le="0.005"} 1' in text
+        assert 'rf2_callback_duration_seconds_bucket{callback="cb",trigger="",view="",le="0.25"} 2' in text
+        assert 'rf2_callback_duration_seconds_bucket{callback="cb",trigger="",view="",le="+Inf"} 3' in text
+        assert 'rf2_callback_duration_seconds_count{callback="cb",trigger="",view=""} 3' in text
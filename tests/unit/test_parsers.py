@@ -1,7 +1,7 @@
 import pytest
 import pandas as pd
 import xml.etree.ElementTree as ET
-from data.parsers import parse_xml_scores
+from data.parsers import parse_xml_scores, parse_xml_tree, XMLLimitError
 
 
 class TestParseXmlScores:
@@ -89,6 +89,17 @@ class TestParseXmlScores:
         assert 'GapToClassLeader' in df.columns
         assert 'ClassLeaderET' in df.columns
     
+    
+    def test_calculates_interval_to_car_ahead(self, sample_xml):
+        """Testa cálculo do intervalo para o carro imediatamente à frente"""
+        df, _, _ = parse_xml_scores(sample_xml)
+        
+        assert 'IntervalAhead' in df.columns
+        assert 'ClassIntervalAhead' in df.columns
+        for _, lap_df in df.groupby('Lap'):
+            lap_df = lap_df.sort_values('ET')
+            assert lap_df['IntervalAhead'].iloc[0] == 0
+            assert (lap_df['IntervalAhead'].iloc[1:] == lap_df['ET'].diff().iloc[1:]).all()
     def test_pit_stop_flag_identified(self, sample_xml):
         """Testa identificação de pit stops"""
         df, _, _ = parse_xml_scores(sample_xml)
@@ -190,3 +201,55 @@ class TestParseXmlScores:
         numeric_cols = ['Lap', 'Position', 'ET', 'LapTime', 'FuelUsed', 'FuelLevel']
         for col in numeric_cols:
             assert pd.api.types.is_numeric_dtype(df[col])
+    
+    def test_progress_reported_per_driver(self, sample_xml):
+        """Testa se o progresso é reportado após cada piloto"""
+        calls = []
+        df, _, _ = parse_xml_scores(sample_xml, progress=lambda *counts: calls.append(counts))
+        
+        total = df['Driver'].nunique()
+        assert [c[0] for c in calls] == list(range(1, total + 1))
+        assert all(c[1] == total for c in calls)
+        assert calls[-1][2] == len(df[df['Lap'] > 0])
+    
+    def test_parses_bytes(self, sample_xml):
+        """Testa se o parser aceita bytes (upload decodificado) como texto"""
+        df_bytes, info_bytes, _ = parse_xml_scores(sample_xml.encode('utf-8'))
+        df_text, info_text, _ = parse_xml_scores(sample_xml)
+        
+        pd.testing.assert_frame_equal(df_bytes, df_text)
+        assert info_bytes == info_text
+
+
+class TestXmlLimits:
+    """Testes para os limites de estrutura do XML"""
+    
+    def test_too_deep_rejected(self):
+        """Testa se XML aninhado além do limite é rejeitado"""
+        xml = '<a>' * 10 + '</a>' * 10
+        with pytest.raises(XMLLimitError, match='deeper'):
+            parse_xml_tree(xml, max_depth=5)
+    
+    def test_too_many_elements_rejected(self):
+        """Testa se XML com elementos demais é rejeitado"""
+        xml = '<root>' + '<Lap/>' * 100 + '</root>'
+        with pytest.raises(XMLLimitError, match='more than 50'):
+            parse_xml_tree(xml, max_elements=50)
+    
+    def test_limit_error_is_parse_error(self):
+        """Testa se o erro de limite é tratado como erro de parse"""
+        assert issubclass(XMLLimitError, ET.ParseError)
+    
+    def test_within_limits_returns_root(self, sample_xml):
+        """Testa se XML dentro dos limites retorna a raiz"""
+        root = parse_xml_tree(sample_xml, max_elements=10000, max_depth=8)
+        assert root.tag == ET.fromstring(sample_xml).tag
+    
+    def test_chunked_feed(self, sample_xml, monkeypatch):
+        """Testa se o XML é lido corretamente em vários blocos"""
+        import data.parsers as parsers
+        monkeypatch.setattr(parsers, '_FEED_CHUNK', 64)
+        df_chunked, _, _ = parse_xml_scores(sample_xml)
+        monkeypatch.undo()
+        
+        pd.testing.assert_frame_equal(df_chunked, parse_xml_scores(sample_xml)[0])
@@ -0,0 +1,127 @@
+import cProfile
+import os
+import pstats
+import pytest
+import dash
+from dash import html, dcc, Input, Output
+from presentation import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    """Diretório temporário de perfis com token de administrador"""
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(profiling, 'PROFILE_ALL', False)
+    return tmp_path
+
+
+def _client():
+    """Cria um app Dash mínimo com o profiler instalado"""
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='in', value='a'), html.Div(id='out')])
+    
+    @app.callback(Output('out', 'children'), Input('in', 'value'))
+    def echo(value):
+        return sum(range(1000)) and value
+    
+    profiling.install_profiler(app)
+    return app.server.test_client()
+
+
+def _post(client, token=None):
+    """Dispara o callback, opcionalmente com o header de profiling"""
+    headers = {profiling.PROFILE_HEADER: token} if token else {}
+    return client.post('/_dash-update-component', headers=headers, json={
+        'output': 'out.children', 'outputs': {'id': 'out', 'property': 'children'},
+        'inputs': [{'id': 'in', 'property': 'value', 'value': 'x'}], 'changedPropIds': ['in.value']
+    })
+
+
+def _pstats(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.pstats'))
+
+
+class TestProfiler:
+    """Testes para a captura de perfis de callbacks"""
+    
+    def test_disabled_without_env(self, monkeypatch):
+        """Testa se nada é instalado sem variável de ambiente nem token"""
+        monkeypatch.setattr(profiling, 'PROFILE_ALL', False)
+        monkeypatch.setattr(profiling, 'PROFILE_TOKEN', '')
+        assert profiling.install_profiler(dash.Dash(__name__)) is False
+    
+    def test_profiles_request_with_token(self, profile_dir):
+        """Testa se a requisição com token gera um .pstats com o id do callback"""
+        response = _post(_client(), 'secret')
+        assert response.status_code == 200
+        files = _pstats(profile_dir)
+        assert len(files) == 1
+        assert files[0].endswith('-out.children.pstats')
+        assert response.headers['X-Profile-File'] == files[0]
+        assert pstats.Stats(str(profile_dir / files[0])).total_calls > 0
+    
+    def test_wrong_or_missing_token_not_profiled(self, profile_dir):
+        """Testa se requisições sem o token correto não são perfiladas"""
+        client = _client()
+        assert _post(client).status_code == 200
+        assert _post(client, 'wrong').status_code == 200
+        assert not os.path.exists(profile_dir) or _pstats(profile_dir) == []
+    
+    def test_profile_all(self, profile_dir, monkeypatch):
+        """Testa o modo que perfila todas as requisições"""
+        monkeypatch.setattr(profiling, 'PROFILE_ALL', True)
+        _post(_client())
+        assert len(_pstats(profile_dir)) == 1
+    
+    def test_busy_profiler_skips(self, profile_dir):
+        """Testa se uma requisição concorrente roda sem profiling"""
+        client = _client()
+        profiling._busy.acquire()
+        try:
+            response = _post(client, 'secret')
+        finally:
+            profiling._busy.release()
+        assert response.status_code == 200
+        assert 'X-Profile-File' not in response.headers
+    
+    def test_ring_directory_bounded(self, profile_dir, monkeypatch):
+        """Testa se apenas os perfis mais recentes são mantidos"""
+        monkeypatch.setattr(profiling, 'PROFILE_KEEP', 2)
+        monkeypatch.setattr(profiling, 'PROFILE_COLLAPSED', True)
+        for i in range(4):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            sum(range(100))
+            profiler.disable()
+            profiling.save_profile(profiler, f'cb{i}')
+        files = os.listdir(profile_dir)
+        assert len([f for f in files if f.endswith('.pstats')]) == 2
+        assert len([f for f in files if f.endswith('.collapsed')]) == 2
+
+
+def _leaf():
+    total = 0
+    for i in range(20000):
+        total += i
+    return total
+
+
+def _branch():
+    return _leaf() + _leaf()
+
+
+class TestCollapsedStacks:
+    """Testes para collapsed_stacks"""
+    
+    def test_stacks_follow_call_paths(self):
+        """Testa se as pilhas reconstruídas seguem os caminhos de chamada"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        _branch()
+        profiler.disable()
+        stacks = dict(profiling.collapsed_stacks(pstats.Stats(profiler), min_seconds=0))
+        leaf = [stack for stack in stacks if stack.endswith(f':_leaf:{_leaf.__code__.co_firstlineno}')]
+        assert len(leaf) == 1
+        assert f':_branch:{_branch.__code__.co_firstlineno};' in leaf[0]
+        assert stacks[leaf[0]] > 0
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+import business.analytics as analytics
+from data.parsers import parse_xml_scores
+from data.schema import CATEGORY_COLUMNS, FLOAT32_COLUMNS, apply_schema, map_values, memory_report, smallest_int
+from data.synthetic import race_xml
+
+
+@pytest.fixture
+def race():
+    """Corrida sintética já com o esquema aplicado pelo parser"""
+    df, _, _ = parse_xml_scores(race_xml(drivers=20, laps=30, seed=7))
+    return df
+
+
+def _untyped(df):
+    """Mesma tabela com os tipos originais do parser (object/int64)"""
+    return df.astype({**{column: object for column in CATEGORY_COLUMNS}, 'Lap': 'int64', 'Position': 'int64'})
+
+
+class TestApplySchema:
+    """Testes para os tipos da tabela de voltas"""
+
+    def test_parser_output(self, race):
+        """Testa os tipos da saída do parser"""
+        for column in CATEGORY_COLUMNS:
+            assert isinstance(race[column].dtype, pd.CategoricalDtype)
+        assert race['Lap'].dtype == np.int8
+        assert race['Position'].dtype == np.int8
+        assert race['IsPit'].dtype == bool
+        assert race['FuelLevel'].dtype == np.float64
+
+    def test_lossless(self, race):
+        """Testa se os valores são os mesmos da tabela sem tipos"""
+        untyped = _untyped(race)
+        pd.testing.assert_frame_equal(apply_schema(untyped), race)
+        assert untyped.to_dict('records') == race.to_dict('records')
+
+    def test_float32_opt_in(self, race):
+        """Testa se float32 só é usado quando pedido"""
+        compact = apply_schema(race, float32=True)
+        assert all(compact[column].dtype == np.float32 for column in FLOAT32_COLUMNS)
+        assert compact['ET'].dtype == np.float64
+
+    def test_smallest_int(self):
+        """Testa a escolha do menor inteiro"""
+        assert smallest_int(pd.Series([0, 127])) == np.int8
+        assert smallest_int(pd.Series([0, 400])) == np.int16
+        assert smallest_int(pd.Series([-1, 70000])) == np.int32
+
+    def test_empty(self):
+        """Testa se uma tabela vazia não muda"""
+        assert apply_schema(pd.DataFrame()).empty
+
+    def test_map_values(self, race):
+        """Testa se map de uma coluna categórica retorna valores simples"""
+        mapped = map_values(race['Driver'], {race['Driver'].iloc[0]: 1})
+        assert mapped.dtype == np.float64
+        assert mapped.iloc[0] == 1
+
+
+class TestSameFigures:
+    """Testes para os gráficos com a tabela tipada"""
+
+    @pytest.mark.parametrize('builder', ['update_position_chart', 'update_strategy_gantt_chart', 'update_gap_chart',
+                                         'update_battle_chart', 'update_laptime_chart', 'update_fuel_chart',
+                                         'update_tire_wear_chart', 'update_tire_degradation_chart'])
+    def test_identical(self, race, builder):
+        """Testa se os gráficos são idênticos aos da tabela sem tipos"""
+        drivers = sorted(race['Driver'].astype(str).unique())[:4]
+        for selected in (None, drivers):
+            assert (getattr(analytics, builder)(race, selected, None).to_json()
+                    == getattr(analytics, builder)(_untyped(race), selected, None).to_json())
+
+
+class TestMemoryReport:
+    """Testes para o relatório de memória"""
+
+    def test_saved(self, race):
+        """Testa se a economia é calculada contra os tipos do parser"""
+        report = memory_report(race)
+        untyped = _untyped(race).memory_usage(deep=True, index=False).sum()
+        assert report['baseline_bytes'] == untyped
+        assert report['bytes'] == race.memory_usage(deep=True, index=False).sum()
+        assert report['saved'] > 0.5
+
+    def test_empty(self):
+        """Testa o relatório de uma tabela vazia"""
+        assert memory_report(pd.DataFrame()) == {'bytes': 0, 'baseline_bytes': 0, 'saved': 0.0}
@@ -0,0 +1,57 @@
+import pytest
+import pandas as pd
+from data import parsers, snapshot
+
+
+@pytest.fixture
+def results_file(tmp_path, sample_xml):
+    """Arquivo de resultados em um diretório temporário"""
+    path = tmp_path / 'race.xml'
+    path.write_text(sample_xml, encoding='utf-8')
+    return str(path)
+
+
+class TestSnapshot:
+    """Testes para o snapshot pré-processado dos resultados"""
+    
+    def test_first_load_parses_and_writes_snapshot(self, results_file):
+        """Testa se o primeiro carregamento faz o parse e grava o snapshot"""
+        content, df, race_info, incidents = snapshot.load_results(results_file)
+        assert not df.empty
+        assert content.startswith(b'<')
+        assert snapshot.read_snapshot(snapshot.snapshot_path(results_file), content) is not None
+    
+    def test_snapshot_used_when_fresh(self, results_file, monkeypatch):
+        """Testa se o snapshot válido evita o parse"""
+        _, df, _, _ = snapshot.load_results(results_file)
+        monkeypatch.setattr(parsers, 'parse_xml_scores', lambda content: pytest.fail('parsed again'))
+        _, cached_df, _, _ = snapshot.load_results(results_file)
+        pd.testing.assert_frame_equal(cached_df, df)
+    
+    def test_stale_when_source_changes(self, results_file):
+        """Testa se o snapshot é invalidado quando o arquivo muda"""
+        content, _, _, _ = snapshot.load_results(results_file)
+        assert snapshot.read_snapshot(snapshot.snapshot_path(results_file), content + b' ') is None
+    
+    def test_stale_when_version_changes(self, results_file, monkeypatch):
+        """Testa se o snapshot é invalidado quando a versão muda"""
+        content, _, _, _ = snapshot.load_results(results_file)
+        monkeypatch.setattr(snapshot, 'SNAPSHOT_VERSION', snapshot.SNAPSHOT_VERSION + 1)
+        assert snapshot.read_snapshot(snapshot.snapshot_path(results_file), content) is None
+    
+    def test_corrupted_snapshot_ignored(self, results_file):
+        """Testa se um snapshot corrompido é ignorado e refeito"""
+        with open(snapshot.snapshot_path(results_file), 'wb') as f:
+            f.write(b'not a pickle')
+        _, df, _, _ = snapshot.load_results(results_file)
+        assert not df.empty
+    
+    def test_without_write(self, results_file):
+        """Testa carregamento sem gravar o snapshot (build standalone)"""
+        snapshot.load_results(results_file, write=False)
+        with pytest.raises(FileNotFoundError):
+            open(snapshot.snapshot_path(results_file), 'rb')
+    
+    def test_build_snapshot(self, results_file):
+        """Testa a geração explícita do snapshot"""
+        assert snapshot.build_snapshot(results_file) == snapshot.snapshot_path(results_file)
@@ -0,0 +1,39 @@
+import pandas as pd
+from business.standings import compute_standings
+from data.parsers import parse_xml_scores
+from data.synthetic import race_xml
+
+
+class TestComputeStandings:
+    """Testes para a classificação numa volta"""
+
+    def test_order_by_laps_then_time(self):
+        """Testa se a ordem segue voltas completadas e depois o tempo decorrido"""
+        df, _, _ = parse_xml_scores(race_xml(drivers=10, laps=15, seed=2))
+        standings = compute_standings(df, 10)
+
+        assert standings['OriginalPosition'].tolist() == list(range(1, len(standings) + 1))
+        assert standings['Driver'].is_unique
+        ordered = standings.sort_values(['Lap', 'ET'], ascending=[False, True])
+        assert ordered['Driver'].tolist() == standings['Driver'].tolist()
+        assert standings.iloc[0]['Gap'] == 'Leader'
+
+    def test_start_keeps_grid_order(self):
+        """Testa se na largada (tempos iguais) vale a posição informada pelo jogo"""
+        df, _, _ = parse_xml_scores(race_xml(drivers=10, laps=5, seed=1))
+        standings = compute_standings(df, 0)
+        assert standings['Position'].tolist() == sorted(standings['Position'])
+        assert (standings['Up'] == 0).all()
+
+    def test_counts(self):
+        """Testa pit stops e voltas lideradas até a volta escolhida"""
+        df, _, _ = parse_xml_scores(race_xml(drivers=6, laps=20, seed=5))
+        standings = compute_standings(df, 20).set_index('Driver')
+        upto = df[df['Lap'] <= 20]
+        assert standings['Led'].sum() == ((upto['Position'] == 1) & (upto['Lap'] > 0)).sum()
+        assert standings['Pits'].sum() == upto['IsPit'].astype(bool).sum()
+
+    def test_no_data(self):
+        """Testa se não há classificação sem dados"""
+        assert compute_standings(pd.DataFrame(), 1).empty
+        assert compute_standings(None, 1).empty
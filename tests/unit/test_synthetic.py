@@ -0,0 +1,66 @@
+import pytest
+from data.parsers import parse_xml_scores
+from data.synthetic import iter_race_xml, race_xml, write_race_xml, main
+
+
+class TestSyntheticRace:
+    """Testes para o gerador de corridas sintéticas"""
+    
+    def test_deterministic_for_seed(self):
+        """Testa se a mesma semente gera o mesmo arquivo"""
+        assert race_xml(drivers=6, laps=8, seed=3) == race_xml(drivers=6, laps=8, seed=3)
+        assert race_xml(drivers=6, laps=8, seed=3) != race_xml(drivers=6, laps=8, seed=4)
+    
+    def test_parsed_by_app_parser(self):
+        """Testa se o XML gerado é lido pelo parser da aplicação"""
+        df, race_info, incidents = parse_xml_scores(race_xml(drivers=9, classes=['Hyper', 'LMP2', 'GT3'], laps=20,
+                                                             dnf_rate=0, incident_density=2, seed=1))
+        assert df['Driver'].nunique() == 9
+        assert set(df['Class']) == {'Hyper', 'LMP2', 'GT3'}
+        assert df['Lap'].max() == 20
+        assert race_info['track'] == 'Paul Ricard Circuit'
+        assert len(incidents['incident']) > 0
+    
+    def test_pit_stops_and_stints(self):
+        """Testa se as paradas seguem o tamanho de stint e reabastecem"""
+        df, _, _ = parse_xml_scores(race_xml(drivers=2, laps=30, pit_every=10, dnf_rate=0, seed=2))
+        pits = df[df['IsPit']]
+        assert len(pits) >= 4
+        assert (pits['FuelLevel'] == 1.0).all()
+        assert (pits['FuelUsed'] < 0).all()
+    
+    def test_positions_are_a_permutation(self):
+        """Testa se as posições de cada volta são 1..N"""
+        df, _, _ = parse_xml_scores(race_xml(drivers=8, laps=5, dnf_rate=0, seed=5))
+        for _, lap in df[df['Lap'] > 0].groupby('Lap'):
+            assert sorted(lap['Position']) == list(range(1, len(lap) + 1))
+    
+    def test_missing_attributes(self):
+        """Testa se a taxa de ausência remove atributos e invalida voltas"""
+        xml = race_xml(drivers=4, laps=30, missing_rate=0.3, seed=1)
+        assert '--.----' in xml
+        assert xml.count(' s1="') < xml.count('<Lap ')
+        parse_xml_scores(xml)
+    
+    def test_stream_is_time_ordered(self):
+        """Testa se os eventos do Stream estão em ordem de tempo"""
+        xml = race_xml(drivers=5, laps=6, incident_density=3, track_limits_density=0.5, seed=1)
+        stream = xml[xml.index('<Stream>'):xml.index('</Stream>')]
+        times = [float(line.split('et="')[1].split('"')[0]) for line in stream.splitlines()[1:]]
+        assert times == sorted(times)
+    
+    def test_output_is_streamed(self):
+        """Testa se a saída é produzida em vários pedaços"""
+        chunks = list(iter_race_xml(drivers=20, laps=50, seed=1))
+        assert len(chunks) > 20
+    
+    def test_write_and_cli(self, tmp_path):
+        """Testa a gravação em disco e a linha de comando"""
+        path = tmp_path / 'race.xml'
+        size = write_race_xml(str(path), drivers=3, laps=4, seed=1)
+        assert size == path.stat().st_size
+        
+        cli_path = tmp_path / 'cli.xml'
+        main([str(cli_path), '--preset', 'sprint', '--drivers', '4', '--laps', '3', '--classes', 'GT3'])
+        df, _, _ = parse_xml_scores(cli_path.read_text(encoding='utf-8'))
+        assert set(df['Class']) == {'GT3'}
@@ -0,0 +1,56 @@
+import base64
+import dash
+from dash import html, dcc, Input, Output
+from presentation import upload_limits
+
+
+def _client(monkeypatch, max_request_mb):
+    """Cria um app Dash mínimo com o limite de requisição instalado"""
+    monkeypatch.setattr(upload_limits, 'MAX_REQUEST_MB', max_request_mb)
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='in', value='a'), html.Div(id='out')])
+    
+    @app.callback(Output('out', 'children'), Input('in', 'value'))
+    def echo(value):
+        return value
+    
+    upload_limits.install_request_limit(app)
+    return app.server.test_client()
+
+
+def _post(client, value):
+    """Dispara o callback com o valor informado"""
+    return client.post('/_dash-update-component', json={
+        'output': 'out.children', 'outputs': {'id': 'out', 'property': 'children'},
+        'inputs': [{'id': 'in', 'property': 'value', 'value': value}], 'changedPropIds': ['in.value']
+    })
+
+
+class TestRequestLimit:
+    """Testes para o limite de tamanho das requisições"""
+    
+    def test_small_request_passes(self, monkeypatch):
+        """Testa se requisições dentro do limite chegam ao callback"""
+        response = _post(_client(monkeypatch, 1), 'x' * 1000)
+        assert response.status_code == 200
+    
+    def test_large_request_rejected(self, monkeypatch):
+        """Testa se requisições acima do limite recebem 413 sem executar o callback"""
+        response = _post(_client(monkeypatch, 0.01), 'x' * 20000)
+        assert response.status_code == 413
+        assert b'too large' in response.data
+    
+    def test_limit_sets_max_content_length(self, monkeypatch):
+        """Testa se o limite também vale para corpos sem Content-Length"""
+        client = _client(monkeypatch, 2)
+        assert client.application.config['MAX_CONTENT_LENGTH'] == 2 * 1024 * 1024
+
+
+class TestDecodedSize:
+    """Testes para o tamanho do upload sem decodificar"""
+    
+    def test_matches_decoded_length(self):
+        """Testa se o tamanho calculado é igual ao decodificado, com e sem padding"""
+        for size in (0, 1, 2, 3, 10, 1001):
+            encoded = base64.b64encode(b'x' * size).decode('ascii')
+            assert upload_limits.decoded_size(encoded) == size
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+import pytest
+from dash import Dash, html
+from data import watch
+from data.cache import drop_dataset, get_dataset, has_dataset, put_dataset
+from data.parsers import parse_xml_scores
+
+
+@pytest.fixture
+def watched(tmp_path, sample_xml, monkeypatch):
+    """Arquivo de resultados acompanhado pelo modo watch"""
+    path = tmp_path / 'live.xml'
+    path.write_text(sample_xml, encoding='utf-8')
+    monkeypatch.setattr(watch, 'WATCH_PATH', str(path))
+    monkeypatch.setattr(watch, '_state', {'signature': None, 'key': None, 'versions': []})
+    # Versions are read by calling refresh(), as the watcher thread would
+    monkeypatch.setattr(watch, '_ensure_watcher', lambda: None)
+    watch.refresh()
+    return path
+
+
+class TestWatchedFile:
+    """Testes para a escolha do arquivo acompanhado"""
+
+    def test_file(self, watched):
+        """Testa se um arquivo é acompanhado diretamente"""
+        assert watch.watched_file() == str(watched)
+
+    def test_newest_file_of_directory(self, tmp_path, sample_xml):
+        """Testa se num diretório o resultado mais recente é acompanhado"""
+        for n, name in enumerate(['old.xml', 'new.xml']):
+            (tmp_path / name).write_text(sample_xml, encoding='utf-8')
+            os.utime(tmp_path / name, (1000 + n, 1000 + n))
+        assert watch.watched_file(str(tmp_path)) == str(tmp_path / 'new.xml')
+
+    def test_missing(self, tmp_path):
+        """Testa se um caminho inexistente não tem arquivo"""
+        assert watch.watched_file(str(tmp_path / 'missing.xml')) is None
+        assert watch.refresh(str(tmp_path / 'missing.xml')) is None
+
+
+class TestLatestDataset:
+    """Testes para a leitura da versão mais recente"""
+
+    def test_parses_only_on_change(self, watched, sample_xml, monkeypatch):
+        """Testa se o arquivo só é relido quando muda"""
+        monkeypatch.setattr(watch, '_state', {'signature': None, 'key': None, 'versions': []})
+        reads = []
+        real_open = open
+        monkeypatch.setattr('builtins.open', lambda path, *args, **kwargs: reads.append(path) or real_open(path, *args, **kwargs))
+        key = watch.refresh()
+        assert watch.refresh() == key
+        assert reads.count(str(watched)) == 1
+
+        watched.write_text(f'{sample_xml}\n<!-- lap 2 -->', encoding='utf-8')
+        assert watch.refresh() != key
+        assert get_dataset(watch.latest_dataset()) is not None
+
+    def test_watcher_thread(self, tmp_path, sample_xml, monkeypatch):
+        """Testa se a versão é lida pela thread de acompanhamento e não na chamada"""
+        path = tmp_path / 'live.xml'
+        path.write_text(sample_xml, encoding='utf-8')
+        monkeypatch.setattr(watch, 'WATCH_PATH', str(path))
+        monkeypatch.setattr(watch, 'WATCH_INTERVAL', 0.05)
+        monkeypatch.setattr(watch, '_state', {'signature': None, 'key': None, 'versions': []})
+        monkeypatch.setattr(watch, '_watcher', {'thread': None, 'pid': None})
+        calls = []
+        refresh = watch.refresh
+        monkeypatch.setattr(watch, 'refresh', lambda path=None: calls.append(threading.current_thread().name) or refresh(path))
+
+        deadline = time.monotonic() + 10
+        while watch.latest_dataset() is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert get_dataset(watch.latest_dataset()) is not None
+        assert set(calls) == {'results-watcher'}
+        monkeypatch.setattr(watch, 'WATCH_PATH', '')
+        watch._watcher['thread'].join(timeout=5)
+        assert not watch._watcher['thread'].is_alive()
+
+    def test_version_parsed_elsewhere_is_not_parsed(self, watched, sample_xml, monkeypatch):
+        """Testa se uma versão já no cache (de outro processo) só é lida, sem novo parse"""
+        import data.parsers as parsers
+        from data.cache import dataset_key
+        content = f'{sample_xml}\n<!-- lap 3 -->'
+        df, race_info, incidents = parse_xml_scores(content)
+        put_dataset(dataset_key(content.encode('utf-8')), df, race_info, incidents)
+        watched.write_text(content, encoding='utf-8')
+        monkeypatch.setattr(parsers, 'parse_xml_scores', lambda *args: pytest.fail('parsed again'))
+        assert watch.refresh() == dataset_key(content.encode('utf-8'))
+
+    def test_keeps_only_recent_versions(self, watched, sample_xml):
+        """Testa se versões antigas da corrida ao vivo saem do cache compartilhado"""
+        keys = [watch.latest_dataset()]
+        for lap in range(2, 5):
+            watched.write_text(f'{sample_xml}\n<!-- lap {lap} -->', encoding='utf-8')
+            keys.append(watch.refresh())
+        assert [has_dataset(key) for key in keys] == [False, False, True, True]
+
+    def test_partial_write_keeps_previous(self, watched, sample_xml):
+        """Testa se um arquivo pela metade mantém a versão anterior"""
+        key = watch.latest_dataset()
+        watched.write_text(sample_xml[:len(sample_xml) // 2], encoding='utf-8')
+        assert watch.refresh() == key
+
+
+class TestNewEvents:
+    """Testes para a diferença entre versões"""
+
+    def test_new_events(self):
+        """Testa os eventos adicionados e a troca de corrida"""
+        old = {'chat': [{'et': '1', 'message': 'gg'}], 'incident': []}
+        new = {'chat': [{'et': '1', 'message': 'gg'}, {'et': '2', 'message': 'gl'}], 'incident': []}
+        assert watch.new_events(old, new) == {'chat': [{'et': '2', 'message': 'gl'}], 'incident': []}
+        assert watch.new_events(new, old) is None
+
+
+class TestFollowResults:
+    """Testes para o callback do modo watch"""
+
+    @pytest.fixture
+    def client(self, watched, monkeypatch, sample_dataframe, sample_race_info, sample_incidents):
+        import presentation.callbacks as callbacks
+        monkeypatch.setattr(callbacks, 'background_manager', lambda: None)
+        app = Dash(__name__)
+        app.layout = html.Div()
+        callbacks.register_callbacks(app, sample_dataframe, sample_race_info, sample_incidents)
+        return app.server.test_client()
+
+    def _follow(self, client, key):
+        specs = client.get('/_dash-dependencies').get_json()
+        spec = next(spec for spec in specs if spec['inputs'][0]['id'] == 'watch-interval')
+        outputs = [dict(zip(('id', 'property'), o.rsplit('.', 1))) for o in spec['output'][2:-2].split('...')]
+        payload = {'output': spec['output'], 'outputs': outputs, 'changedPropIds': ['watch-interval.n_intervals'],
+                   'inputs': [{'id': 'watch-interval', 'property': 'n_intervals', 'value': 1}],
+                   'state': [{'id': 'dataset-key', 'property': 'data', 'value': key}]}
+        return client.post('/_dash-update-component', json=payload)
+
+    def _output(self, response, component):
+        return next(value['data'] for output, value in response.get_json()['response'].items() if output.startswith(component))
+
+    def test_sends_key_and_new_events(self, client, sample_xml):
+        """Testa se o cliente recebe a nova versão, sem voltas, e só os eventos novos como Patch"""
+        df, race_info, incidents = parse_xml_scores(sample_xml)
+        old_incidents = {kind: [] for kind in incidents}
+        old_key = put_dataset('watch-test-partial', df[df['Lap'] <= 1], race_info, old_incidents)
+
+        response = self._follow(client, old_key)
+
+        assert not any(output.startswith('stored-data') for output in response.get_json()['response'])
+        events = self._output(response, 'stored-incidents')
+        assert [operation['operation'] for operation in events['operations']] == ['Extend'] * len(incidents)
+        assert self._output(response, 'dataset-key') == watch.latest_dataset()
+        assert self._output(response, 'dataset-meta')['max_lap'] == df['Lap'].max()
+
+    def test_unknown_version_gets_everything(self, client, sample_xml):
+        """Testa se um cliente com versão desconhecida recebe todos os eventos"""
+        _, _, incidents = parse_xml_scores(sample_xml)
+        assert self._output(self._follow(client, 'unknown'), 'stored-incidents') == incidents
+
+    def test_no_update_when_current(self, client):
+        """Testa se nada é enviado quando o cliente já tem a versão mais recente"""
+        assert self._follow(client, watch.latest_dataset()).status_code == 204
+
+    def test_no_update_when_latest_evicted(self, client):
+        """Testa se uma versão que saiu do cache não quebra o callback"""
+        drop_dataset(watch.latest_dataset())
+        assert self._follow(client, 'unknown').status_code == 204